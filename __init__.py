@@ -1,3 +1,4 @@
 from .nano_banana import NODE_CLASS_MAPPINGS, NODE_DISPLAY_NAME_MAPPINGS
+from . import ssy_status  # noqa: F401  在ComfyUI中注册/ssy/status
 
 __all__ = ['NODE_CLASS_MAPPINGS', 'NODE_DISPLAY_NAME_MAPPINGS']
\ No newline at end of file
@@ -0,0 +1,21 @@
+"""让benchmarks下的脚本在ComfyUI之外导入本插件的模块
+
+插件目录名（comfyui-ssy-syncapi）不是合法的Python包名，这里把它注册成
+ssy_syncapi包，子模块之间的相对导入照常工作。
+"""
+import os
+import sys
+import types
+import importlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+PACKAGE = "ssy_syncapi"
+
+
+def load_module(name):
+    """导入插件子模块，例如load_module("ssy_transport")"""
+    if PACKAGE not in sys.modules:
+        package = types.ModuleType(PACKAGE)
+        package.__path__ = [ROOT]
+        sys.modules[PACKAGE] = package
+    return importlib.import_module(f"{PACKAGE}.{name}")
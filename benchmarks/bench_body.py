@@ -0,0 +1,107 @@
+"""请求体内存基准：一次性json序列化 vs 流式请求体
+
+模拟12张参考图的Google请求，发送到一个只读不存的本地接收端，
+用tracemalloc统计从编码参考图到请求发送完毕之间的Python内存峰值：
+
+    python benchmarks/bench_body.py --size 2048 --count 12
+"""
+import json
+import time
+import base64
+import socket
+import argparse
+import threading
+import tracemalloc
+from io import BytesIO
+
+import numpy as np
+import requests
+from PIL import Image
+
+from _bootstrap import load_module
+
+
+class SinkServer:
+    """读取并丢弃请求体的最小HTTP服务端，接收过程不分配与请求体成比例的内存"""
+
+    def __init__(self):
+        self._sock = socket.socket()
+        self._sock.bind(("127.0.0.1", 0))
+        self._sock.listen()
+        self.url = f"http://127.0.0.1:{self._sock.getsockname()[1]}/api/v1/images/generations"
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        buf = bytearray(256 * 1024)
+        view = memoryview(buf)
+        while True:
+            conn, _ = self._sock.accept()
+            with conn:
+                header = b""
+                while b"\r\n\r\n" not in header:
+                    header += conn.recv(4096)
+                head, rest = header.split(b"\r\n\r\n", 1)
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":")[1])
+                remaining = length - len(rest)
+                while remaining > 0:
+                    remaining -= conn.recv_into(view[:min(remaining, len(buf))])
+                conn.sendall(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nConnection: close\r\n\r\n{}")
+
+
+def make_images(size, count):
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:size, 0:size].astype(np.float32) / size
+    base = np.stack([x, y, (x + y) / 2], axis=-1)
+    return [Image.fromarray((np.clip(base + rng.normal(0, 0.02, base.shape), 0, 1) * 255).astype(np.uint8))
+            for _ in range(count)]
+
+
+def legacy_send(url, images):
+    images_data = []
+    for img in images:
+        buf = BytesIO()
+        img.save(buf, format="PNG", compress_level=1)
+        b64_string = base64.b64encode(buf.getvalue()).decode("utf-8")
+        images_data.append({"inline_data": {"mime_type": "image/png", "data": b64_string}})
+    data = {"model": "google/gemini-3-pro-image-preview", "prompt": "bench", "images": images_data}
+    debug_data = data.copy()
+    debug_data["images"] = f"<{len(debug_data['images'])} images>"
+    json.dumps(debug_data, ensure_ascii=False, indent=2)
+    requests.post(url, json=data, timeout=60)
+
+
+def streaming_send(url, images):
+    encode = load_module("ssy_encode")
+    body_module = load_module("ssy_body")
+    payloads = [encode.encode_pil(img, "png") for img in images]
+    data = {"model": "google/gemini-3-pro-image-preview", "prompt": "bench",
+            "images": [{"inline_data": {"mime_type": p.mime, "data": p}} for p in payloads]}
+    json.dumps(body_module.describe_body(data), ensure_ascii=False, indent=2)
+    body = body_module.JSONBody(data)
+    requests.post(url, data=body, headers={"Content-Type": "application/json"}, timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=2048)
+    parser.add_argument("--count", type=int, default=12)
+    args = parser.parse_args()
+
+    load_module("ssy_body")
+    sink = SinkServer()
+    images = make_images(args.size, args.count)
+    for label, send in (("legacy", legacy_send), ("streaming", streaming_send)):
+        tracemalloc.start()
+        start = time.perf_counter()
+        send(sink.url, images)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label:<10} {args.count} x {args.size}px  peak={peak / 1024 / 1024:8.1f}MB  time={elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
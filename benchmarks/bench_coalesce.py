@@ -0,0 +1,66 @@
+"""在模拟路由上验证相同请求的在途合并
+
+多个线程同时发起完全相同的调用（模拟工作流扇出或多人排队同一个图），
+比较关闭/开启coalesce时路由收到的请求数、上传字节数和端到端耗时。
+每个调用方都必须拿到结果；关闭时每次调用各发一个请求，开启时每轮只发一个请求，否则断言失败（非零状态退出）：
+
+    python benchmarks/bench_coalesce.py --callers 8 --latency 0.5 --size 1024
+"""
+import os
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+
+from _bootstrap import load_module
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--callers", type=int, default=8, help="同时发起相同调用的线程数")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.5, help="模拟服务端耗时（秒）")
+    parser.add_argument("--size", type=int, default=1024, help="参考图和返回图像的边长")
+    args = parser.parse_args()
+
+    fake_router = load_module("ssy_fake_router")
+    nodes = load_module("nano_banana")
+    metrics = load_module("ssy_metrics")
+    single_flight = load_module("ssy_coalesce").get_single_flight()
+
+    reference = torch.rand((1, args.size, args.size, 3))
+    for coalesce in (False, True):
+        with fake_router.FakeRouter(image_size=(args.size, args.size), latency=args.latency) as router:
+            os.environ["SSY_API_BASE"] = router.api_base
+            os.environ.setdefault("SSY_API_KEY", "bench")
+            sent_before = sum(entry.get("sent_bytes", 0) for entry in metrics.get_metrics().snapshot().values())
+            coalesced_before = single_flight.stats()["coalesced"]
+
+            def one(_):
+                node = nodes.SSYGoogleGenerator()
+                images, log = node.generate("google/gemini-3-pro-image-preview", "coalesce", input_image=reference,
+                                            use_cache=False, coalesce=coalesce)
+                return "错误" not in log and images.shape[1] == args.size
+
+            start = time.perf_counter()
+            ok = 0
+            with ThreadPoolExecutor(args.callers) as pool:
+                for _ in range(args.rounds):
+                    ok += sum(pool.map(one, range(args.callers)))
+            elapsed = time.perf_counter() - start
+            sent = sum(entry.get("sent_bytes", 0) for entry in metrics.get_metrics().snapshot().values()) - sent_before
+            calls = args.callers * args.rounds
+            requests = router.stats()["requests"]
+            print(f"coalesce={str(coalesce):<5} 调用 {calls}（成功{ok}）  "
+                  f"路由请求数 {requests}  上传 {sent / 1024 / 1024:.1f} MB  "
+                  f"合并 {single_flight.stats()['coalesced'] - coalesced_before}  耗时 {elapsed:.2f}s")
+
+            assert ok == calls, f"{calls - ok}个调用没有拿到结果"
+            # 每轮的调用同时发起且leader要等待latency秒，开启时同一轮的其它调用都应合并进来
+            expected = args.rounds if coalesce else calls
+            assert requests == expected, f"路由请求数{requests}，预期{expected}"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""张量 <-> 图像转换基准：逐步分配中间张量的旧路径 vs 分块融合量化
+
+    python benchmarks/bench_convert.py --size 2048 --batch 8
+"""
+import time
+import argparse
+
+import numpy as np
+import torch
+from PIL import Image
+
+from _bootstrap import load_module
+
+
+def legacy_to_pil(tensor):
+    """原tensor_to_image：.cpu()/.mul()/.clamp()/.byte()各分配一份整图"""
+    tensor = tensor.cpu()
+    if len(tensor.shape) == 4:
+        tensor = tensor.squeeze(0) if tensor.shape[0] == 1 else tensor[0]
+    image_np = tensor.squeeze().mul(255).clamp(0, 255).byte().numpy()
+    return Image.fromarray(image_np, mode="RGB")
+
+
+def legacy_to_tensor(images):
+    arrays = [np.array(img).astype(np.float32) / 255.0 for img in images]
+    return torch.from_numpy(np.stack(arrays))
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=2048)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    convert = load_module("ssy_convert")
+    batch = torch.rand(args.batch, args.size, args.size, 3)
+
+    legacy, legacy_images = timed(lambda: [legacy_to_pil(batch[i:i + 1]) for i in range(args.batch)], args.repeat)
+    fused, images = timed(lambda: convert.batch_to_pil(batch), args.repeat)
+    diff = max(int(np.abs(np.asarray(a, dtype=np.int16) - np.asarray(b, dtype=np.int16)).max())
+               for a, b in zip(legacy_images, images))
+    print(f"tensor->PIL {args.batch}x{args.size}px  旧路径 {legacy * 1000:8.1f}ms  "
+          f"融合量化 {fused * 1000:8.1f}ms  （像素最大差{diff}，旧路径截断、新路径四舍五入）")
+
+    legacy, old = timed(lambda: legacy_to_tensor(images), args.repeat)
+    fused, new = timed(lambda: convert.pil_to_tensor(images), args.repeat)
+    print(f"PIL->tensor {args.batch}x{args.size}px  旧路径 {legacy * 1000:8.1f}ms  "
+          f"预分配写入 {fused * 1000:8.1f}ms  （最大误差{(old - new).abs().max().item():.2e}）")
+
+    rgba = torch.rand(1, 256, 256, 4)
+    restored = convert.pil_to_tensor(convert.tensor_to_pil(rgba), "RGBA")
+    print(f"RGBA往返最大误差 {(restored - rgba).abs().max().item():.4f}（量化误差上限 {0.5 / 255:.4f}）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""响应解码微基准：对比旧的逐张解码+torch.cat与统一解码器的耗时和峰值内存
+
+每种实现在独立子进程中运行，峰值内存取解码前后ru_maxrss的差值：
+
+    python benchmarks/bench_decode.py --size 4096 --count 2
+"""
+import sys
+import time
+import base64
+import argparse
+import resource
+import subprocess
+from io import BytesIO
+
+import numpy as np
+import torch
+from PIL import Image
+
+from _bootstrap import load_module
+
+
+def make_response(size, count):
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, (size, size, 3), dtype=np.uint8)
+    buf = BytesIO()
+    Image.fromarray(pixels).save(buf, format="PNG", compress_level=1)
+    b64 = base64.b64encode(buf.getvalue()).decode("ascii")
+    return {"data": [{"b64_json": b64} for _ in range(count)]}
+
+
+def legacy_decode(result):
+    all_images = []
+    for item in result["data"]:
+        img_data = base64.b64decode(item["b64_json"])
+        img = Image.open(BytesIO(img_data))
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        img_np = np.array(img).astype(np.float32) / 255.0
+        img_tensor = torch.from_numpy(img_np)[None,]
+        all_images.append(img_tensor)
+    return torch.cat(all_images, dim=0)
+
+
+def unified_decode(result):
+    decode = load_module("ssy_decode")
+    images, _, _ = decode.decode_response(result)
+    return images
+
+
+def run_variant(variant, size, count):
+    result = make_response(size, count)
+    decode = {"legacy": legacy_decode, "unified": unified_decode}[variant]
+    if variant == "unified":
+        load_module("ssy_decode")
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    images = decode(result)
+    elapsed = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    output_mb = images.numel() * images.element_size() / 1024 / 1024
+    print(f"{variant:<8} time={elapsed * 1000:8.1f}ms peak_increase={(peak_rss - base_rss) / 1024:8.1f}MB "
+          f"output={output_mb:.1f}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=4096)
+    parser.add_argument("--count", type=int, default=1)
+    parser.add_argument("--variant", choices=["legacy", "unified"])
+    args = parser.parse_args()
+
+    if args.variant:
+        run_variant(args.variant, args.size, args.count)
+        return
+    for variant in ("legacy", "unified"):
+        subprocess.run([sys.executable, __file__, "--variant", variant,
+                        "--size", str(args.size), "--count", str(args.count)], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""结果URL下载基准：逐个下载 vs 并发流式下载（本地模拟路由）
+
+    python benchmarks/bench_download.py --count 10 --download-latency 0.3
+"""
+import os
+import time
+import argparse
+from io import BytesIO
+
+from PIL import Image
+
+from _bootstrap import load_module
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=10)
+    parser.add_argument("--size", type=int, default=1024)
+    parser.add_argument("--download-latency", type=float, default=0.3)
+    parser.add_argument("--truncate", type=int, default=2, help="模拟中断的下载次数")
+    args = parser.parse_args()
+
+    fake_router = load_module("ssy_fake_router")
+    transport = load_module("ssy_transport").get_transport()
+    download = load_module("ssy_download")
+
+    with fake_router.FakeRouter(image_size=(args.size, args.size),
+                                download_latency=args.download_latency) as router:
+        os.environ["SSY_API_BASE"] = router.api_base
+        urls = [f"{router.base_url}/files/{i}.png" for i in range(args.count)]
+
+        start = time.perf_counter()
+        for url in urls:
+            response = transport.get(url, timeout=30)
+            Image.open(BytesIO(response.content)).load()
+        sequential = time.perf_counter() - start
+
+        router.truncate_downloads = args.truncate
+        start = time.perf_counter()
+        results = download.fetch_images(transport, urls)
+        concurrent = time.perf_counter() - start
+
+        failed = [r for r in results if isinstance(r, Exception)]
+        print(f"sequential  {args.count} x {args.size}px: {sequential:.2f}s")
+        print(f"concurrent  {args.count} x {args.size}px: {concurrent:.2f}s "
+              f"（模拟中断{args.truncate}次，失败{len(failed)}个）")
+        assert not failed, failed
+
+
+if __name__ == "__main__":
+    main()
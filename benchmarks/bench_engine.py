@@ -0,0 +1,70 @@
+"""在本地模拟路由上验证请求引擎的限速、在途上限和公平性
+
+模拟路由按模型执行每秒配额（超出返回429），多个"节点"同时提交任务：
+
+    python benchmarks/bench_engine.py --rate 5 --max-in-flight 4
+"""
+import math
+import time
+import argparse
+import threading
+
+from _bootstrap import load_module
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate", type=float, default=5.0, help="每个模型的限速（请求/秒）")
+    parser.add_argument("--burst", type=int, default=1)
+    parser.add_argument("--max-in-flight", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.2, help="模拟服务端耗时（秒）")
+    parser.add_argument("--heavy-jobs", type=int, default=30, help="大批量节点提交的任务数")
+    parser.add_argument("--light-jobs", type=int, default=5, help="其它节点各自提交的任务数")
+    args = parser.parse_args()
+
+    fake_router = load_module("ssy_fake_router")
+    transport = load_module("ssy_transport").get_transport()
+    engine_module = load_module("ssy_engine")
+
+    quota = math.ceil(args.rate) + args.burst
+    with fake_router.FakeRouter(latency=args.latency, quota=quota) as router:
+        engine = engine_module.RequestEngine(max_in_flight=args.max_in_flight,
+                                             rate=args.rate, burst=args.burst)
+        url = f"{router.api_base}/images/generations"
+        finished = []
+        finished_lock = threading.Lock()
+
+        def make_job(client, model):
+            def job():
+                response = transport.post(url, json={"model": model}, timeout=30)
+                with finished_lock:
+                    finished.append((client, response.status_code, time.perf_counter()))
+            return job
+
+        plan = [("heavy", "model-a", args.heavy_jobs),
+                ("light-1", "model-a", args.light_jobs),
+                ("light-2", "model-b", args.light_jobs)]
+        start = time.perf_counter()
+        futures = []
+        for client, model, count in plan:
+            futures += [engine.submit(make_job(client, model), model=model, client=client)
+                        for _ in range(count)]
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - start
+
+        stats = router.stats()
+        print(f"总请求 {len(futures)}，耗时 {elapsed:.2f}s")
+        print(f"路由观测到的最大在途数 {stats['max_in_flight']}（上限 {args.max_in_flight}）")
+        print(f"429次数 {stats['throttled']}（路由配额 {quota}/s/模型）")
+        print(f"各模型请求数 {stats['models']}")
+        for client, _, count in plan:
+            done = [t - start for c, _, t in finished if c == client]
+            print(f"{client:<8} 完成 {len(done)}/{count}，最后完成于 {max(done):.2f}s")
+
+        assert stats["max_in_flight"] <= args.max_in_flight
+        assert stats["throttled"] == 0
+
+
+if __name__ == "__main__":
+    main()
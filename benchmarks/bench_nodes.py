@@ -0,0 +1,181 @@
+"""节点端到端基准：在本地模拟路由上驱动各节点，测量客户端自身的开销
+
+模拟路由在主进程中运行，每个场景（节点 × 分辨率 × 参考图数量）在独立子进程中执行，
+CPU时间和峰值内存只包含客户端（编码、请求体、传输、解析、解码）：
+
+    python benchmarks/bench_nodes.py --sizes 1024,2048,4096 --refs 1,4,12 --repeat 3
+    python benchmarks/bench_nodes.py --save baseline.json
+    python benchmarks/bench_nodes.py --compare baseline.json --tolerance 0.2
+
+分辨率同时用于参考图和返回图像；参考图数量超过模型上限时按上限执行（重复的场景只跑一次）。
+--compare时CPU时间或峰值内存超过基线（1 + tolerance）倍的场景标记为回归，进程以状态码1退出。
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+
+import torch
+
+from _bootstrap import load_module
+
+# 系列 -> (节点类名, 入口方法)
+NODES = {
+    "google": ("SSYGoogleGenerator", "generate"),
+    "doubao": ("SSYDoubaoGenerator", "generate"),
+    "openai": ("SSYOpenAIGenerator", "generate"),
+    "processor": ("SSYBytedanceProcessor", "process"),
+}
+
+# 注册表中的响应格式 -> 模拟路由的响应形状（内联base64 / URL）
+SHAPES = {
+    "gemini": ("gemini", "gemini"),
+    "data_list": ("data_b64", "url"),
+    "volcengine": ("volcengine", "volcengine_url"),
+}
+
+IMAGE_INPUTS = ["input_image"] + [f"input_image{i}" for i in range(1, 12)]
+
+
+def make_reference(size, seed):
+    """渐变加少量噪声的参考图，压缩率接近照片"""
+    generator = torch.Generator().manual_seed(seed)
+    ramp = torch.linspace(0, 1, size)
+    image = torch.stack([ramp[None, :].expand(size, size), ramp[:, None].expand(size, size),
+                         torch.full((size, size), 0.5)], dim=-1)
+    return (image * 0.9 + torch.rand((size, size, 3), generator=generator) * 0.1).unsqueeze(0)
+
+
+def run_worker(family, model, size, refs, repeat):
+    nodes = load_module("nano_banana")
+    metrics = load_module("ssy_metrics")
+    class_name, method = NODES[family]
+    node = getattr(nodes, class_name)()
+    call = getattr(node, method)
+    kwargs = {name: make_reference(size, i) for i, name in enumerate(IMAGE_INPUTS[:refs])}
+    if family == "processor":
+        args = (model,)
+    else:
+        args = (model, "benchmark")
+
+    # 预热一次（建立连接、首次导入的开销），不计入结果
+    call(*args, use_cache=False, **kwargs)
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    sent_before = sum(entry.get("sent_bytes", 0) for entry in metrics.get_metrics().snapshot().values())
+
+    errors = 0
+    images = 0
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = call(*args, use_cache=False, **kwargs)
+        if "错误" in result[1]:
+            errors += 1
+        images += result[0].shape[0]
+    wall = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+
+    sent = sum(entry.get("sent_bytes", 0) for entry in metrics.get_metrics().snapshot().values())
+    print(json.dumps({
+        "node": family, "model": model, "size": size, "refs": refs, "calls": repeat,
+        "wall": wall / repeat, "cpu": cpu / repeat, "images_per_sec": images / wall,
+        "upload_mb": (sent - sent_before) / repeat / 1024 / 1024,
+        # Linux上ru_maxrss单位为KB
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "warm_rss_mb": base_rss / 1024, "errors": errors,
+    }))
+
+
+def scenarios(args, models):
+    seen = set()
+    for size in args.sizes:
+        for family in args.nodes:
+            spec = models.require_model(models.model_names(family)[0])
+            for refs in args.refs:
+                refs = min(refs, spec.max_images)
+                if family == "processor":
+                    refs = 1
+                if (size, family, refs) not in seen:
+                    seen.add((size, family, refs))
+                    yield size, family, spec.name, refs
+
+
+def router_shapes(models, use_urls, shape):
+    if shape:
+        return shape
+    return {name: SHAPES[spec.response_format][1 if use_urls else 0] for name, spec in models.MODELS.items()}
+
+
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["node"], r["size"], r["refs"]): r for r in json.load(f)}
+    regressions = 0
+    for r in results:
+        old = baseline.get((r["node"], r["size"], r["refs"]))
+        if old is None:
+            continue
+        cpu = r["cpu"] / old["cpu"] - 1 if old["cpu"] else 0.0
+        rss = r["peak_rss_mb"] / old["peak_rss_mb"] - 1 if old["peak_rss_mb"] else 0.0
+        flag = "  ⚠ 回归" if cpu > tolerance or rss > tolerance else ""
+        regressions += bool(flag)
+        print(f"{r['node']:<10}{r['size']:>6}{r['refs']:>5}  CPU {cpu:+7.1%}  峰值内存 {rss:+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1024,2048,4096", help="参考图和返回图像的边长，逗号分隔")
+    parser.add_argument("--refs", default="1,4,12", help="参考图数量，逗号分隔")
+    parser.add_argument("--nodes", default=",".join(NODES), help="要测试的节点系列，逗号分隔")
+    parser.add_argument("--repeat", type=int, default=3, help="每个场景计时的调用次数（另有一次预热）")
+    parser.add_argument("--latency", type=float, default=0.0, help="模拟服务端耗时（秒）")
+    parser.add_argument("--noise", action="store_true", help="返回随机像素图像（响应体积接近上限）")
+    parser.add_argument("--urls", action="store_true", help="返回图像URL而不是内联base64")
+    parser.add_argument("--shape", help="所有模型使用同一种响应形状，见ssy_fake_router.FakeRouter")
+    parser.add_argument("--save", help="把结果保存为JSON")
+    parser.add_argument("--compare", help="与保存的基线JSON比较")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--worker", nargs=4, metavar=("FAMILY", "MODEL", "SIZE", "REFS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        family, model, size, refs = args.worker
+        run_worker(family, model, int(size), int(refs), args.repeat)
+        return
+
+    args.sizes = [int(v) for v in args.sizes.split(",")]
+    args.refs = [int(v) for v in args.refs.split(",")]
+    args.nodes = args.nodes.split(",")
+    fake_router = load_module("ssy_fake_router")
+    models = load_module("ssy_models")
+
+    print(f"{'节点':<8}{'边长':>6}{'参考图':>5}{'耗时/次':>10}{'CPU/次':>10}{'图像/秒':>9}"
+          f"{'上传MB':>9}{'峰值内存MB':>12}{'预热后MB':>10}")
+    results = []
+    for size, family, model, refs in scenarios(args, models):
+        with fake_router.FakeRouter(image_size=(size, size), image_noise=args.noise, latency=args.latency,
+                                    response_format=router_shapes(models, args.urls, args.shape)) as router:
+            env = dict(os.environ, SSY_API_BASE=router.api_base, SSY_API_KEY="bench",
+                       SSY_CACHE_DIR="", SSY_ENCODE_CACHE_MB="0", SSY_RETRIES="0")
+            output = subprocess.run(
+                [sys.executable, __file__, "--worker", family, model, str(size), str(refs),
+                 "--repeat", str(args.repeat)],
+                env=env, check=True, capture_output=True, text=True).stdout
+        r = json.loads(output.strip().splitlines()[-1])
+        results.append(r)
+        note = f"  失败{r['errors']}次" if r["errors"] else ""
+        print(f"{family:<10}{size:>6}{refs:>5}{r['wall']:>10.3f}s{r['cpu']:>9.3f}s{r['images_per_sec']:>9.2f}"
+              f"{r['upload_mb']:>9.1f}{r['peak_rss_mb']:>12.0f}{r['warm_rss_mb']:>10.0f}{note}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.compare and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""在本地模拟路由上验证优先级调度：大批量任务排满队列时交互请求的延迟
+
+若干"批量节点"一次提交大量任务，同时一个"交互节点"逐个发起请求（上一个完成后再发下一个），
+比较不区分优先级（全部normal）与分级（交互interactive，批量节点一半normal一半bulk）时
+交互请求的延迟分位数和批量吞吐。分级时normal和bulk占满了保留之外的名额，
+交互请求的排队等待p95超过--max-interactive-wait时断言失败（非零状态退出）：
+
+    python benchmarks/bench_priority.py --bulk-jobs 400 --bulk-clients 4 --interactive-jobs 30
+"""
+import time
+import argparse
+import threading
+
+from _bootstrap import load_module
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument("--reserved", type=int, default=2, help="为interactive保留的在途名额")
+    parser.add_argument("--latency", type=float, default=0.2, help="模拟服务端耗时（秒）")
+    parser.add_argument("--bulk-jobs", type=int, default=400, help="每个批量节点提交的任务数")
+    parser.add_argument("--bulk-clients", type=int, default=4, help="批量节点数")
+    parser.add_argument("--interactive-jobs", type=int, default=30, help="交互节点依次发起的请求数")
+    parser.add_argument("--max-interactive-wait", type=float, default=0.05,
+                        help="分级时交互请求排队等待p95的上限（秒）")
+    args = parser.parse_args()
+
+    fake_router = load_module("ssy_fake_router")
+    transport = load_module("ssy_transport").get_transport()
+    engine_module = load_module("ssy_engine")
+
+    with fake_router.FakeRouter(latency=args.latency) as router:
+        url = f"{router.api_base}/images/generations"
+
+        def job():
+            transport.post(url, json={"model": "bench"}, timeout=30).content
+
+        for label, interactive, bulk in (("不分级", "normal", ("normal",)),
+                                         ("分级", "interactive", ("normal", "bulk"))):
+            engine = engine_module.RequestEngine(max_in_flight=args.max_in_flight, reserved=args.reserved)
+            start = time.perf_counter()
+            bulk_futures = [engine.submit(job, model="bench", client=f"bulk-{i}", priority=bulk[i % len(bulk)])
+                            for _ in range(args.bulk_jobs) for i in range(args.bulk_clients)]
+
+            latencies = []
+
+            def artist():
+                for _ in range(args.interactive_jobs):
+                    began = time.perf_counter()
+                    engine.run(job, model="bench", client="artist", priority=interactive)
+                    latencies.append(time.perf_counter() - began)
+
+            thread = threading.Thread(target=artist)
+            thread.start()
+            thread.join()
+            interactive_done = time.perf_counter() - start
+            completed = sum(future.done() for future in bulk_futures)
+            for future in bulk_futures:
+                future.result()
+            elapsed = time.perf_counter() - start
+            stats = engine.stats()["priorities"]
+            print(f"{label:<6} 交互 p50 {percentile(latencies, 0.5):.2f}s  p95 {percentile(latencies, 0.95):.2f}s  "
+                  f"max {max(latencies):.2f}s | 交互期间批量完成 {completed / interactive_done:.1f}个/秒  "
+                  f"批量总吞吐 {len(bulk_futures) / elapsed:.1f}个/秒 | "
+                  f"排队等待p95 interactive {stats['interactive']['wait_p95']:.2f}s "
+                  f"normal {stats['normal']['wait_p95']:.2f}s bulk {stats['bulk']['wait_p95']:.2f}s")
+
+            if interactive == "interactive":
+                wait_p95 = stats["interactive"]["wait_p95"]
+                assert wait_p95 <= args.max_interactive_wait, \
+                    f"交互请求排队等待p95 {wait_p95:.3f}s超过{args.max_interactive_wait}s，保留名额未生效"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""响应解析内存基准：response.json()+b64decode vs 流式解析
+
+构造一个含多张PNG（base64）的OpenAI格式响应，按256KB分块模拟网络读取，
+用tracemalloc统计从收到响应到得到图像字节之间的Python内存峰值：
+
+    python benchmarks/bench_response.py --size 2048 --count 4
+"""
+import json
+import time
+import base64
+import argparse
+import tracemalloc
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from _bootstrap import load_module
+
+
+def make_response(size, count):
+    rng = np.random.default_rng(0)
+    items = []
+    for _ in range(count):
+        buf = BytesIO()
+        Image.fromarray(rng.integers(0, 256, (size, size, 3), dtype=np.uint8)).save(
+            buf, format="PNG", compress_level=1)
+        items.append({"b64_json": base64.b64encode(buf.getvalue()).decode("ascii")})
+    return json.dumps({"created": 0, "data": items}).encode("utf-8")
+
+
+def iter_chunks(raw, chunk_size=256 * 1024):
+    for start in range(0, len(raw), chunk_size):
+        yield raw[start:start + chunk_size]
+
+
+def legacy_parse(raw):
+    # requests的response.content会先拼出完整响应体，再由json解析出字符串
+    content = b"".join(iter_chunks(raw))
+    result = json.loads(content)
+    return [base64.b64decode(item["b64_json"]) for item in result["data"]]
+
+
+def streaming_parse(raw):
+    response = load_module("ssy_response")
+    result, _, _ = response.parse_stream(iter_chunks(raw, response.CHUNK_SIZE))
+    return [item["b64_json"].buffer for item in result["data"]]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=2048)
+    parser.add_argument("--count", type=int, default=4)
+    args = parser.parse_args()
+
+    load_module("ssy_response")
+    raw = make_response(args.size, args.count)
+    print(f"响应体 {len(raw) / 1024 / 1024:.1f}MB")
+    for label, parse in (("legacy", legacy_parse), ("streaming", streaming_parse)):
+        tracemalloc.start()
+        start = time.perf_counter()
+        images = parse(raw)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del images
+        print(f"{label:<10} {args.count} x {args.size}px  peak={peak / 1024 / 1024:8.1f}MB  time={elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
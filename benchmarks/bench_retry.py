@@ -0,0 +1,92 @@
+"""在注入故障的模拟路由上比较：不重试 / 重试 / 重试+对冲
+
+模拟路由按概率返回503、直接断开连接或额外延迟（长尾），统计失败率（即占位图比例）
+和端到端延迟分位数。重试后的失败率必须低于不重试且不超过--max-failure-rate，
+对冲至少发出--min-hedges次时，其p95不能比只重试差出10%以上，否则断言失败（非零状态退出）：
+
+    python benchmarks/bench_retry.py --requests 200 --error-rate 0.1 --drop-rate 0.05 --slow-rate 0.05
+"""
+import os
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from _bootstrap import load_module
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05, help="正常请求的服务端耗时（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    parser.add_argument("--drop-rate", type=float, default=0.05)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-latency", type=float, default=1.0)
+    parser.add_argument("--max-failure-rate", type=float, default=0.02, help="开启重试后允许的最高失败率")
+    parser.add_argument("--min-hedges", type=int, default=10,
+                        help="对冲次数达到该值才比较p95（样本太少时对冲几乎不触发，p95只有噪声）")
+    args = parser.parse_args()
+
+    fake_router = load_module("ssy_fake_router")
+    engine_module = load_module("ssy_engine")
+    retry = load_module("ssy_retry")
+    nodes = load_module("nano_banana")
+
+    scenarios = [
+        ("不重试", retry.RetryPolicy(max_retries=0)),
+        ("重试", retry.RetryPolicy(max_retries=3, base_delay=0.05, max_delay=1.0)),
+        ("重试+对冲", retry.RetryPolicy(max_retries=3, base_delay=0.05, max_delay=1.0,
+                                       hedge=True, hedge_min_samples=20)),
+    ]
+    summary = {}
+    for label, policy in scenarios:
+        with fake_router.FakeRouter(latency=args.latency, error_rate=args.error_rate,
+                                    drop_rate=args.drop_rate, slow_rate=args.slow_rate,
+                                    slow_latency=args.slow_latency, seed=0) as router:
+            os.environ["SSY_API_BASE"] = router.api_base
+            os.environ["SSY_API_KEY"] = "bench"
+            engine = engine_module.RequestEngine(max_in_flight=args.concurrency * 2)
+            tracker = retry.LatencyTracker()
+            node = nodes.SSYGoogleGenerator()
+            data = {"model": "bench-model", "prompt": "bench"}
+
+            def one(_):
+                start = time.perf_counter()
+                images, _, _ = retry.call_with_retry(
+                    lambda: engine.submit(lambda: node._call_ssy_api(data, "generations"),
+                                          model="bench-model"),
+                    "bench-model", policy=policy, tracker=tracker)
+                return images is not None, time.perf_counter() - start
+
+            with ThreadPoolExecutor(args.concurrency) as pool:
+                results = list(pool.map(one, range(args.requests)))
+            latencies = [elapsed for ok, elapsed in results if ok]
+            failed = sum(1 for ok, _ in results if not ok)
+            stats = tracker.stats()
+            assert len(results) == args.requests and latencies, f"{label}: 没有成功的请求"
+            summary[label] = (failed / len(results), percentile(latencies, 0.95), stats["hedges"])
+            print(f"{label:<8} 失败率 {failed / len(results):6.1%}  "
+                  f"p50 {percentile(latencies, 0.5):.3f}s  p95 {percentile(latencies, 0.95):.3f}s  "
+                  f"p99 {percentile(latencies, 0.99):.3f}s  路由请求数 {router.stats()['requests']}  "
+                  f"重试 {stats['retries']}  对冲 {stats['hedges']}（胜出{stats['hedge_wins']}）")
+
+    baseline = summary["不重试"][0]
+    for label in ("重试", "重试+对冲"):
+        rate = summary[label][0]
+        assert rate <= args.max_failure_rate, f"{label}: 失败率{rate:.1%}超过{args.max_failure_rate:.1%}"
+        if baseline:
+            assert rate < baseline, f"{label}: 失败率{rate:.1%}不低于不重试的{baseline:.1%}"
+    _, hedged_p95, hedges = summary["重试+对冲"]
+    if hedges >= args.min_hedges:
+        assert hedged_p95 <= summary["重试"][1] * 1.1, \
+            f"对冲后p95 {hedged_p95:.3f}s反而比只重试的{summary['重试'][1]:.3f}s差"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""对比每次新建连接与共享传输层的连接数和耗时（本地模拟路由，无需网络）
+
+    python benchmarks/bench_transport.py --requests 200
+"""
+import os
+import time
+import argparse
+
+import requests
+
+from _bootstrap import load_module
+
+
+def run(label, router, post, count):
+    before = router.stats()
+    start = time.perf_counter()
+    for _ in range(count):
+        response = post(f"{router.api_base}/images/generations", json={"model": "bench"}, timeout=10)
+        response.raise_for_status()
+        response.content
+    elapsed = time.perf_counter() - start
+    after = router.stats()
+    print(f"{label:<12} requests={count} connections={after['connections'] - before['connections']} "
+          f"total={elapsed:.3f}s per_request={elapsed / count * 1000:.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=100)
+    args = parser.parse_args()
+
+    fake_router = load_module("ssy_fake_router")
+    transport = load_module("ssy_transport")
+
+    with fake_router.FakeRouter() as router:
+        os.environ["SSY_API_BASE"] = router.api_base
+        run("requests.post", router, requests.post, args.requests)
+        shared = transport.get_transport()
+        run("transport", router, shared.post, args.requests)
+
+
+if __name__ == "__main__":
+    main()
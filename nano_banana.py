@@ -1,53 +1,50 @@
-import os
 import json
-import base64
+import time
+import inspect
 import requests
-from io import BytesIO
 from PIL import Image
 import torch
-import numpy as np
 
-p = os.path.dirname(os.path.realpath(__file__))
-
-def get_config():
-    try:
-        config_path = os.path.join(p, 'config.json')
-        with open(config_path, 'r') as f:  
-            config = json.load(f)
-        return config
-    except:
-        return {}
-
-def save_config(config):
-    config_path = os.path.join(p, 'config.json')
-    with open(config_path, 'w') as f:
-        json.dump(config, f, indent=4)
+from .ssy_config import get_setting
+from .ssy_transport import get_transport, get_api_base
+from .ssy_batch import run_bounded, split_frames, concat_images, expand_prompts
+from .ssy_tiles import tile_boxes, split_tiles, stitch_tiles
+from .ssy_convert import CHANNEL_MODES, tensor_to_pil, pil_to_tensor, split_alpha
+from .ssy_engine import PRIORITIES, get_engine
+from .ssy_cache import get_cache
+from .ssy_coalesce import get_single_flight
+from .ssy_body import JSONBody, request_key, describe_body
+from .ssy_decode import decode_response
+from .ssy_response import CHUNK_SIZE as RESPONSE_CHUNK_SIZE, parse_stream, describe_response
+from .ssy_download import fetch_images
+from .ssy_breaker import get_breakers
+from .ssy_deadline import get_deadline_estimator, size_key
+from .ssy_retry import RETRYABLE_EXCEPTIONS, RetryableError, call_with_retry, raise_if_retryable
+from .ssy_encode import UPLOAD_FORMATS, RESIZE_FILTERS, encode_pil, encode_all, fit_size, get_encode_cache
+from .ssy_models import get_model, require_model, model_names
+from .ssy_metrics import CallTrace, get_metrics, outcome_for
+from .ssy_keys import KEY_SWITCH_STATUS, get_key_pool, mask_key
+from .ssy_progress import (ASYNC_EXECUTION, ProgressReporter, run_in_thread,
+                           SENDING, WAITING, DOWNLOADING, DECODING, DONE)
 
 class SSYAPIBase:
     """SSY Cloud API基础类"""
     
     def __init__(self):
-        env_key = os.environ.get("SSY_API_KEY")
-        placeholders = {"token_here", "place_token_here", "your_api_key",
-                        "api_key_here", "enter_your_key", "<api_key>"}
+        # 节点api_key输入的密钥（可以是逗号分隔的多个），为空时使用SSY_API_KEYS/SSY_API_KEY配置的密钥池
+        self.api_key = ""
 
-        if env_key and env_key.lower().strip() not in placeholders:
-            self.api_key = env_key
-        else:
-            config = get_config()
-            self.api_key = config.get("SSY_API_KEY")
+    @property
+    def key_pool(self):
+        """本次调用使用的密钥池，见ssy_keys"""
+        return get_key_pool(self.api_key)
 
     def tensor_to_image(self, tensor):
-        """Convert tensor to PIL Image"""
-        tensor = tensor.cpu()
-        if len(tensor.shape) == 4:
-            tensor = tensor.squeeze(0) if tensor.shape[0] == 1 else tensor[0]
-        
-        image_np = tensor.squeeze().mul(255).clamp(0, 255).byte().numpy()
-        return Image.fromarray(image_np, mode='RGB')
+        """Convert tensor to PIL Image（批次时取第1帧，1/3/4通道对应L/RGB/RGBA）"""
+        return tensor_to_pil(tensor)
 
-    def create_placeholder_image(self, width=512, height=512):
-        """Create a placeholder image when generation fails"""
+    def create_placeholder_image(self, width=512, height=512, mode="RGB"):
+        """Create a placeholder image when generation fails（mode为RGBA时alpha为不透明）"""
         img = Image.new('RGB', (width, height), color=(100, 100, 100))
         try:
             from PIL import ImageDraw
@@ -56,186 +53,430 @@ class SSYAPIBase:
         except:
             pass
         
-        image_array = np.array(img).astype(np.float32) / 255.0
-        return torch.from_numpy(image_array).unsqueeze(0)
+        return pil_to_tensor(img, mode)
+
+    async def execute_async(self, **kwargs):
+        """异步执行入口
+
+        ComfyUI支持异步节点时作为FUNCTION：同步的SYNC_FUNCTION在线程池中运行，
+        等待远程调用期间其它节点可以继续执行。
+        """
+        return await run_in_thread(getattr(self, self.SYNC_FUNCTION), **kwargs)
+
+    @classmethod
+    def common_inputs(cls, use_cache=False, priority="interactive", coalesce=False):
+        """所有节点共享的可选输入
+
+        Args:
+            use_cache: 结果缓存开关的默认值，确定性模型的节点默认开启
+            coalesce: 在途合并开关的默认值，同样只有确定性模型的节点默认开启
+            priority: 调度优先级的默认值，批量生成节点默认为bulk
+        """
+        return {
+            "batch_mode": ("BOOLEAN", {
+                "default": False,
+                "tooltip": "开启后输入批次的每一帧单独请求，结果按输入顺序拼接"
+            }),
+            "max_concurrency": ("INT", {
+                "default": 4,
+                "min": 1,
+                "max": 32,
+                "tooltip": "批量模式下同时进行的最大请求数"
+            }),
+            "upload_format": (list(UPLOAD_FORMATS), {
+                "default": "png",
+                "tooltip": "参考图上传编码：png快速压缩、webp无损（体积更小）、jpeg高质量（最快最小，有损）"
+            }),
+            "use_cache": ("BOOLEAN", {
+                "default": use_cache,
+                "tooltip": "相同请求（模型、参数、图像）直接返回缓存结果，不再访问网络"
+            }),
+            "coalesce": ("BOOLEAN", {
+                "default": coalesce,
+                "tooltip": "与其它节点同时进行的相同请求只调用一次并共享结果（同一节点内的重复请求仍各自生成）"
+            }),
+            "priority": (list(PRIORITIES), {
+                "default": priority,
+                "tooltip": "请求排队的优先级：interactive用于交互调整（有保留并发），normal/bulk只使用保留之外的容量，bulk用于大批量任务"
+            }),
+            "deadline": ("INT", {
+                "default": 0,
+                "min": 0,
+                "max": 1800,
+                "tooltip": "单次调用（含结果下载和所有重试）的截止时间（秒），0表示按该模型和尺寸的历史延迟自动估算"
+            }),
+        }
+
+    def encode_image(self, tensor, upload_format="png"):
+        """把单帧图像编码为EncodedImage"""
+        return encode_pil(self.tensor_to_image(tensor), upload_format)
+
+    def encode_images(self, tensors, upload_format="png", max_side=None):
+        """并行编码多张图像（未变化的图像复用编码缓存）
+
+        Args:
+            max_side: 模型的有效最大输入边长，更大的图像编码前等比缩小（SSY_PRERESIZE关闭时不缩放）
+
+        Returns:
+            ([EncodedImage]按输入顺序, 编码缓存日志)
+        """
+        if not get_setting("SSY_PRERESIZE", True):
+            max_side = None
+        resample = get_setting("SSY_RESIZE_FILTER", "lanczos")
+        if resample not in RESIZE_FILTERS:
+            resample = "lanczos"
+        payloads, hits = encode_all(self.tensor_to_image, tensors, upload_format,
+                                    max_side=max_side, resample=resample)
+        if not tensors:
+            return payloads, ""
+        stats = get_encode_cache().stats()
+        log = (f"编码缓存: 本次命中{hits}/{len(tensors)}"
+               f"（累计命中{stats['hits']}次/未命中{stats['misses']}次，占用 {stats['bytes'] / 1024 / 1024:.1f} MB）\n")
+        resized = [(tensor.shape[-2], tensor.shape[-3]) for tensor in tensors
+                   if fit_size(tensor.shape[-2], tensor.shape[-3], max_side) != (tensor.shape[-2], tensor.shape[-3])]
+        if resized:
+            width, height = fit_size(*resized[0], max_side)
+            log += (f"预缩放: {len(resized)}张参考图超过模型输入上限{max_side}px，已等比缩小（{resample}），"
+                    f"如{resized[0][0]}x{resized[0][1]} -> {width}x{height}\n")
+        return payloads, log
+
+    def select_frames(self, tensor, batch_mode):
+        """返回要发送的帧列表，以及未开启批量模式时的提示"""
+        frames = split_frames(tensor)
+        if batch_mode or len(frames) == 1:
+            return frames, ""
+        note = f"注意: 输入批次包含{len(frames)}帧，仅使用第1帧（开启batch_mode处理全部帧）\n"
+        return frames[:1], note
+
+    def build_image_requests(self, spec, data, input_images=(), batch_mode=False, upload_format="png"):
+        """按模型的参考图声明把参考图加入请求体，返回([(data, endpoint)], 日志前缀)
+
+        第1张参考图在批量模式下按帧拆分，每一帧各发起一次请求，其余参考图共用；
+        超过模型参考图上限的部分被忽略。
+        """
+        input_images = [img for img in input_images if isinstance(img, torch.Tensor)]
+        note = ""
+        if len(input_images) > spec.max_images:
+            note += f"注意: {spec.name}最多使用{spec.max_images}张参考图，已忽略其余{len(input_images) - spec.max_images}张\n"
+            input_images = input_images[:spec.max_images]
+        frames = []
+        if input_images:
+            frames, frame_note = self.select_frames(input_images[0], batch_mode)
+            note += frame_note
+        shared_images = input_images[1:]
+        # 所有帧和共用参考图一起并行编码
+        started = time.monotonic()
+        encoded, encode_log = self.encode_images(frames + shared_images, upload_format, spec.max_input_side)
+        if encoded:
+            get_metrics().observe("encode", spec.name, spec.endpoint_for(True), time.monotonic() - started)
+        note += encode_log
+        frame_payloads, shared_payloads = encoded[:len(frames)], encoded[len(frames):]
 
-    def call_ssy_api(self, data, endpoint="generations"):
+        request_list = []
+        for payload in frame_payloads or [None]:
+            payloads = ([payload] if payload is not None else []) + shared_payloads
+            frame_data = dict(data)
+            if payloads:
+                self.attach_images(spec, frame_data, payloads)
+            request_list.append((frame_data, spec.endpoint_for(bool(payloads))))
+        return request_list, note
+
+    @staticmethod
+    def attach_images(spec, data, payloads):
+        """按spec.image_mode把编码好的参考图写入请求体"""
+        if spec.image_mode == "inline_data":
+            data["images"] = [{
+                "inline_data": {
+                    "mime_type": payload.mime,
+                    "data": payload
+                }
+            } for payload in payloads]
+        elif spec.image_mode == "data_uri_list":
+            data["image"] = [payload.as_data_uri() for payload in payloads]
+        elif spec.image_mode == "data_uri":
+            data["image"] = payloads[0].as_data_uri()
+        elif spec.image_mode == "binary_base64":
+            data["binary_data_base64"] = list(payloads)
+        else:
+            raise ValueError(f"未知的参考图传递方式: {spec.image_mode}")
+
+    def run_items(self, request_list, max_concurrency=1, options=None):
+        """并发执行多个(data, endpoint)请求，按顺序返回[(图像张量或None, 日志)]
+
+        各请求的阶段汇总成节点进度上报给ComfyUI。
+        每个请求带上自己的序号（coalesce_slot），同一次运行中内容相同的请求不会互相合并。
+        """
+        options = options or {}
+        progress = ProgressReporter(options.get("unique_id"), len(request_list))
+        return run_bounded(
+            lambda i: self.call_ssy_api(*request_list[i], options=dict(options, coalesce_slot=i),
+                                        progress=progress.for_request(i)),
+            range(len(request_list)), max_concurrency)
+
+    def run_requests(self, request_list, max_concurrency=1, note="", options=None, images_per_request=1):
+        """并发执行多个(data, endpoint)请求，结果按顺序拼接成一个IMAGE批次
+
+        单个请求失败时用images_per_request张占位图填充对应位置（与成功请求返回的张数相同），
+        保证输出帧与输入帧一一对应。
+        options为节点的通用调用选项，原样传给call_ssy_api。
+        """
+        results = self.run_items(request_list, max_concurrency, options)
+
+        if len(results) == 1:
+            images, log = results[0]
+            if images is not None:
+                return (images, note + log)
+            return (self.create_placeholder_image(), note + log)
+
+        total = len(results)
+        log = note + f"批量模式: {total}个请求, 并发上限{max_concurrency}\n"
+        outputs = []
+        for i, (images, item_log) in enumerate(results):
+            log += f"===== 第{i + 1}/{total}帧 =====\n{item_log}"
+            outputs.append(images)
+
+        succeeded = [out for out in outputs if out is not None]
+        if not succeeded:
+            return (self.create_placeholder_image(), log + "✗ 所有请求均失败\n")
+
+        height, width = succeeded[0].shape[1:3]
+        mode = CHANNEL_MODES[succeeded[0].shape[-1]]
+        failed = [i + 1 for i, out in enumerate(outputs) if out is None]
+        placeholder = self.create_placeholder_image(width, height, mode).repeat(images_per_request, 1, 1, 1)
+        outputs = [out if out is not None else placeholder for out in outputs]
+        batch, resized = concat_images(outputs)
+        if resized:
+            log += f"注意: 部分结果尺寸不一致，已缩放到{width}x{height}\n"
+        if failed:
+            log += f"✗ 第{failed}帧失败，已用占位图填充\n"
+        log += f"✓ 批量完成: 共输出{batch.shape[0]}张图像\n"
+        return (batch, log)
+
+    def call_ssy_api(self, data, endpoint="generations", options=None, progress=None):
         """调用SSY Cloud API
         
+        请求提交到全局请求引擎排队（按模型限速、限制在途数量），当前线程等待结果。
+        暂时性故障按指数退避重试，开启SSY_HEDGE时慢请求会发出对冲请求；
+        (模型, 端点)的熔断器打开时不发请求直接失败。
+        开启use_cache时先按请求内容查询结果缓存，命中则不访问网络；
+        开启coalesce时，与正在进行的相同请求合并为一次网络调用，共享解码结果；
+        只有优先级和coalesce_slot（在一次运行中的序号）也相同的调用才会合并，
+        交互调用不会跟在排队中的bulk调用后面等待，同一节点内的重复请求也各自生成。
+        
         Args:
             data: 请求数据
             endpoint: API端点，"generations" 或 "edits"
+            options: 节点的通用调用选项（use_cache、coalesce、priority、deadline等），
+                decode_mode为"RGBA"时保留透明通道解码
+            progress: 进度回调progress(stage)，stage为ssy_progress中的阶段常量
+        
+        Returns:
+            ([N,H,W,C]图像张量（RGB为3通道、RGBA为4通道），失败时为None, 日志)
+        """
+        options = options or {}
+        progress = progress or (lambda stage: None)
+        model = data.get("model", "unknown")
+        mode = options.get("decode_mode", "RGB")
+        cache = get_cache() if options.get("use_cache") else None
+        coalesce = options.get("coalesce", False)
+        if cache is not None or coalesce:
+            key = request_key(data, endpoint)
+            if mode != "RGB":
+                # 同一请求的RGB与RGBA结果分开缓存
+                key = f"{key}-{mode}"
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                images, wire_bytes = cached
+                stats = cache.stats()
+                log = f"调用API: {model}\n"
+                log += f"缓存命中: {key[:16]}，节省 {wire_bytes / 1024:.1f} KB"
+                log += f"（累计命中{stats['hits']}次/未命中{stats['misses']}次，节省 {stats['bytes_saved'] / 1024 / 1024:.2f} MB）\n"
+                log += f"✓ 从缓存返回 {images.shape[0]} 张图像\n"
+                progress(DONE)
+                return images, log
+        
+        engine = get_engine()
+        breakers = get_breakers()
+
+        priority = options.get("priority", "normal")
+
+        def network():
+            # 所有重试和对冲共用一个截止时间，从第一次尝试出队执行时开始计时
+            call_deadline, deadline_source = get_deadline_estimator().deadline(
+                model, size_key(data), options.get("deadline", 0), started=False)
+
+            def attempt():
+                call_deadline.start()
+                # 在引擎出队时才检查熔断器，排队期间熔断的任务也会立即失败
+                return breakers.call(model, endpoint, lambda: self._call_ssy_api(
+                    data, endpoint, call_deadline, progress, mode, deadline_source))
+
+            return call_with_retry(lambda: engine.submit(attempt, model=model, client=id(self), priority=priority),
+                                   model, deadline=call_deadline)
+
+        if coalesce:
+            # 相同请求已在途时等待它的结果，不再重复上传、生成和下载
+            flight_key = f"{key}|{priority}|{options.get('coalesce_slot', 0)}"
+            (images, log, wire_bytes), shared = get_single_flight().do(flight_key, network)
+            if shared:
+                progress(DONE)
+                return images, log + f"合并请求: 与进行中的相同请求（{key[:16]}）共享结果，未重复调用\n"
+        else:
+            images, log, wire_bytes = network()
+        progress(DONE)
+        if cache is not None:
+            log += f"缓存未命中: {key[:16]}"
+            if images is not None:
+                cache.put(key, images, wire_bytes)
+                log += f"，结果已写入缓存（{wire_bytes / 1024:.1f} KB）"
+            log += "\n"
+        return images, log
+
+    def _call_ssy_api(self, data, endpoint, deadline=None, progress=None, mode="RGB", deadline_source=""):
+        """实际发送请求并解析响应，在请求引擎的工作线程中执行
+
+        deadline为整个调用共用的Deadline（deadline_source为其来源说明），已过期时直接以超时失败；
+        None表示按历史延迟为这一次尝试估算。
+        progress为进度回调，依次上报发送、等待、下载、解码阶段。
+        mode为解码输出的PIL模式（RGB或RGBA）。
+        各阶段耗时记录到ssy_metrics；成功时日志只有简短摘要，请求体详情只在失败或开启SSY_VERBOSE_LOG时生成。
+        返回(图像张量或None, 日志, 网络传输字节数)，暂时性故障抛出RetryableError由调用方重试。
         """
+        model = data.get("model", "unknown")
+        trace = CallTrace(model, endpoint)
+        sent = 0
         try:
-            url = f"https://router.shengsuanyun.com/api/v1/images/{endpoint}"
+            url = f"{get_api_base()}/images/{endpoint}"
+            transport = get_transport()
+            size = size_key(data)
+            estimator = get_deadline_estimator()
+            call_deadline = deadline
+            if call_deadline is None:
+                call_deadline, deadline_source = estimator.deadline(model, size)
+            progress = progress or (lambda stage: None)
+
+            def on_sent():
+                progress(WAITING)
+                trace.mark("wait")
             
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
+            pool = self.key_pool
+            if not pool:
+                return None, "错误: 未提供API密钥\n", 0
+
+            # 请求体流式序列化，图像base64在发送时分块生成
+            body = JSONBody(data, on_sent=on_sent)
             
-            operation_log = f"调用API: {data.get('model', 'unknown')}\n"
+            operation_log = f"调用API: {model}\n"
             operation_log += f"端点: {url}\n"
-            operation_log += f"请求参数: {list(data.keys())}\n"
-            
-            # 打印完整请求体（隐藏图片数据）
-            debug_data = data.copy()
-            if 'image' in debug_data and isinstance(debug_data['image'], str) and len(debug_data['image']) > 100:
-                debug_data['image'] = f"<base64 data {len(debug_data['image'])} chars>"
-            if 'images' in debug_data:
-                debug_data['images'] = f"<{len(debug_data['images'])} images>"
-            operation_log += f"请求体: {json.dumps(debug_data, ensure_ascii=False, indent=2)}\n"
+            operation_log += f"请求体大小: {len(body) / 1024:.1f} KB\n"
+            operation_log += (f"截止时间: {call_deadline.seconds:.1f}秒（{deadline_source}），"
+                              f"连接超时{call_deadline.connect_timeout:.1f}秒\n")
+
+            def details():
+                # 请求体摘要（图片只显示大小），只在失败或详细日志时生成
+                return (f"请求参数: {list(data.keys())}\n"
+                        f"请求体: {json.dumps(describe_body(data), ensure_ascii=False, indent=2)}\n")
+
+            if get_setting("SSY_VERBOSE_LOG", False):
+                operation_log += details()
+                details = lambda: ""
             
-            # 发送请求
-            response = requests.post(url, headers=headers, json=data, timeout=120)
+            # 发送请求，响应体边接收边解析，图像base64直接解码为字节
+            progress(SENDING)
+            # 从密钥池选密钥发送；429/401/403的密钥已在池中冷却，还有可用密钥时在本次尝试内立即换用，
+            # 不占用重试次数，也不计为熔断失败
+            for _ in range(len(pool)):
+                api_key = pool.acquire()
+                headers = {
+                    "Authorization": f"Bearer {api_key}",
+                    "Content-Type": "application/json",
+                    "Content-Length": str(len(body))
+                }
+                trace.mark("upload")
+                sent += len(body)
+                try:
+                    response = transport.post(url, headers=headers, data=body,
+                                              timeout=call_deadline.timeout(), stream=True)
+                except Exception:
+                    pool.release(api_key)
+                    raise
+                pool.release(api_key, response.status_code, response.headers)
+                if response.status_code not in KEY_SWITCH_STATUS or not pool.available():
+                    break
+                response.close()
+                operation_log += f"密钥{mask_key(api_key)}返回{response.status_code}，换用其它密钥\n"
+                body = JSONBody(data, on_sent=on_sent)
+            trace.mark("read")
             
             # 记录响应状态
             operation_log += f"响应状态码: {response.status_code}\n"
             
             # 尝试解析JSON
             try:
-                result = response.json()
-                operation_log += f"响应键: {list(result.keys())}\n"
-            except:
-                operation_log += f"响应文本: {response.text[:500]}\n"
+                result, wire_bytes, _ = parse_stream(call_deadline.guard(response.iter_content(RESPONSE_CHUNK_SIZE)))
+            except ValueError as e:
+                head = getattr(e, "head", b"").decode("utf-8", "replace")
+                operation_log += details() + f"响应文本: {head[:500]}\n"
+                trace.finish(outcome_for(response), sent, getattr(e, "total", 0))
+                raise_if_retryable(response, operation_log)
                 response.raise_for_status()
-                return [], operation_log
+                return None, operation_log, getattr(e, "total", 0)
+            finally:
+                response.close()
             
             # 检查是否有错误信息
             if "error" in result:
-                operation_log += f"API错误: {result['error']}\n"
-                return [], operation_log
-            
-            all_images = []
-            
-            # 格式1: Google Gemini格式 (candidates)
-            if "candidates" in result:
-                operation_log += "使用Gemini响应格式\n"
-                for candidate in result["candidates"]:
-                    if "content" in candidate and "parts" in candidate["content"]:
-                        for part in candidate["content"]["parts"]:
-                            if "inlineData" in part and "data" in part["inlineData"]:
-                                try:
-                                    img_data = base64.b64decode(part["inlineData"]["data"])
-                                    img = Image.open(BytesIO(img_data))
-                                    if img.mode != "RGB":
-                                        img = img.convert("RGB")
-                                    img_np = np.array(img).astype(np.float32) / 255.0
-                                    img_tensor = torch.from_numpy(img_np)[None,]
-                                    all_images.append(img_tensor)
-                                except Exception as e:
-                                    operation_log += f"解析Gemini图像失败: {str(e)}\n"
-            
-            # 格式2: OpenAI/Doubao格式 (data数组)
-            elif "data" in result and isinstance(result["data"], list):
-                operation_log += "使用OpenAI/Doubao响应格式\n"
-                for item in result["data"]:
-                    try:
-                        # b64_json格式
-                        if "b64_json" in item:
-                            img_data = base64.b64decode(item["b64_json"])
-                            img = Image.open(BytesIO(img_data))
-                            if img.mode != "RGB":
-                                img = img.convert("RGB")
-                            img_np = np.array(img).astype(np.float32) / 255.0
-                            img_tensor = torch.from_numpy(img_np)[None,]
-                            all_images.append(img_tensor)
-                        # URL格式
-                        elif "url" in item:
-                            img_response = requests.get(item["url"], timeout=30)
-                            img = Image.open(BytesIO(img_response.content))
-                            if img.mode != "RGB":
-                                img = img.convert("RGB")
-                            img_np = np.array(img).astype(np.float32) / 255.0
-                            img_tensor = torch.from_numpy(img_np)[None,]
-                            all_images.append(img_tensor)
-                    except Exception as e:
-                        operation_log += f"解析data数组图像失败: {str(e)}\n"
-            
-            # 格式3: 火山引擎格式 (特殊结构)
-            elif "data" in result and isinstance(result["data"], dict):
-                operation_log += "使用火山引擎响应格式\n"
-                try:
-                    data_obj = result["data"]
-                    # 尝试从binary_data_base64获取
-                    if "binary_data_base64" in data_obj and data_obj["binary_data_base64"]:
-                        for b64_str in data_obj["binary_data_base64"]:
-                            img_data = base64.b64decode(b64_str)
-                            img = Image.open(BytesIO(img_data))
-                            if img.mode != "RGB":
-                                img = img.convert("RGB")
-                            img_np = np.array(img).astype(np.float32) / 255.0
-                            img_tensor = torch.from_numpy(img_np)[None,]
-                            all_images.append(img_tensor)
-                    # 尝试从image_urls获取
-                    elif "image_urls" in data_obj and data_obj["image_urls"]:
-                        for url in data_obj["image_urls"]:
-                            img_response = requests.get(url, timeout=30)
-                            img = Image.open(BytesIO(img_response.content))
-                            if img.mode != "RGB":
-                                img = img.convert("RGB")
-                            img_np = np.array(img).astype(np.float32) / 255.0
-                            img_tensor = torch.from_numpy(img_np)[None,]
-                            all_images.append(img_tensor)
-                except Exception as e:
-                    operation_log += f"解析火山引擎格式失败: {str(e)}\n"
-            
-            # 格式4: 直接image字段
-            elif "image" in result:
-                operation_log += "使用image字段响应格式\n"
-                try:
-                    if isinstance(result["image"], str):
-                        img_data = base64.b64decode(result["image"])
-                        img = Image.open(BytesIO(img_data))
-                        if img.mode != "RGB":
-                            img = img.convert("RGB")
-                        img_np = np.array(img).astype(np.float32) / 255.0
-                        img_tensor = torch.from_numpy(img_np)[None,]
-                        all_images.append(img_tensor)
-                except Exception as e:
-                    operation_log += f"解析image字段失败: {str(e)}\n"
+                operation_log += details() + f"API错误: {result['error']}\n"
+                trace.finish(outcome_for(response), sent, wire_bytes)
+                raise_if_retryable(response, operation_log)
+                return None, operation_log, wire_bytes
             
-            # 格式5: results数组 (某些API可能使用)
-            elif "results" in result and isinstance(result["results"], list):
-                operation_log += "使用results数组响应格式\n"
-                for item in result["results"]:
-                    try:
-                        if "image" in item:
-                            img_data = base64.b64decode(item["image"])
-                            img = Image.open(BytesIO(img_data))
-                            if img.mode != "RGB":
-                                img = img.convert("RGB")
-                            img_np = np.array(img).astype(np.float32) / 255.0
-                            img_tensor = torch.from_numpy(img_np)[None,]
-                            all_images.append(img_tensor)
-                        elif "url" in item:
-                            img_response = requests.get(item["url"], timeout=30)
-                            img = Image.open(BytesIO(img_response.content))
-                            if img.mode != "RGB":
-                                img = img.convert("RGB")
-                            img_np = np.array(img).astype(np.float32) / 255.0
-                            img_tensor = torch.from_numpy(img_np)[None,]
-                            all_images.append(img_tensor)
-                    except Exception as e:
-                        operation_log += f"解析results图像失败: {str(e)}\n"
+            def fetch(urls):
+                progress(DOWNLOADING)
+                trace.mark("download")
+                return fetch_images(transport, urls, deadline=call_deadline)
+
+            def on_decode():
+                progress(DECODING)
+                trace.mark("decode")
+
+            # 注册表中的模型直接使用其声明的响应格式，未注册的模型按顺序探测
+            spec = get_model(model)
+            images, decode_log, downloaded = decode_response(
+                result, fetch, mode=mode, on_decode=on_decode,
+                response_format=spec.response_format if spec is not None else None)
+            operation_log += decode_log
+            wire_bytes += downloaded
             
-            if all_images:
-                operation_log += f"✓ 成功解析 {len(all_images)} 张图像\n"
+            if images is not None:
+                trace.finish("ok", sent, wire_bytes)
+                estimator.observe(model, size, trace.elapsed())
+                operation_log += trace.summary()
+                operation_log += f"✓ 成功解析 {images.shape[0]} 张图像\n"
             else:
+                trace.finish("failed", sent, wire_bytes)
+                operation_log += details() + f"响应键: {list(result.keys())}\n"
                 operation_log += "✗ 未能从响应中解析出图像\n"
-                operation_log += f"完整响应结构: {json.dumps(result, ensure_ascii=False, indent=2)[:1000]}\n"
+                operation_log += f"完整响应结构: {json.dumps(describe_response(result), ensure_ascii=False, indent=2)[:1000]}\n"
             
-            return all_images, operation_log
+            return images, operation_log, wire_bytes
             
+        except RetryableError:
+            raise
         except requests.exceptions.RequestException as e:
             operation_log = f"网络请求错误: {str(e)}\n"
-            return [], operation_log
+            if isinstance(e, RETRYABLE_EXCEPTIONS):
+                trace.finish("retryable", sent)
+                raise RetryableError(operation_log)
+            trace.finish("failed", sent)
+            return None, operation_log, 0
         except Exception as e:
+            trace.finish("failed", sent)
             operation_log = f"API调用错误: {str(e)}\n"
             import traceback
             operation_log += f"错误详情: {traceback.format_exc()}\n"
-            return [], operation_log
-
+            return None, operation_log, 0
 
 class SSYGoogleGenerator(SSYAPIBase):
     """Google Gemini系列图像生成器"""
@@ -244,8 +485,8 @@ class SSYGoogleGenerator(SSYAPIBase):
     def INPUT_TYPES(cls):
         return {
             "required": {
-                "model": (["google/gemini-2.5-flash-image-preview", "google/gemini-3-pro-image-preview"], {
-                    "default": "google/gemini-2.5-flash-image-preview"
+                "model": (model_names("google"), {
+                    "default": model_names("google")[0]
                 }),
                 "prompt": ("STRING", {
                     "default": "Generate a high-quality, photorealistic image", 
@@ -279,77 +520,70 @@ class SSYGoogleGenerator(SSYAPIBase):
                 "response_modalities": (["IMAGE", "TEXT_IMAGE"], {
                     "default": "IMAGE"
                 }),
-            }
+                **cls.common_inputs(),
+            },
+            "hidden": {"unique_id": "UNIQUE_ID"},
         }
 
     RETURN_TYPES = ("IMAGE", "STRING")
     RETURN_NAMES = ("images", "log")
-    FUNCTION = "generate"
+    SYNC_FUNCTION = "generate"
+    FUNCTION = "execute_async" if ASYNC_EXECUTION else SYNC_FUNCTION
     CATEGORY = "SSY Cloud同步任务/Google"
+    # 模型注册表中的系列，决定节点的模型列表
+    FAMILY = "google"
 
     def generate(self, model, prompt, input_image=None, input_image1=None, input_image2=None, 
                 input_image3=None, input_image4=None, input_image5=None, input_image6=None,
                 input_image7=None, input_image8=None, input_image9=None, input_image10=None,
                 input_image11=None, api_key="", aspect_ratio="1:1", size="1K", 
-                response_modalities="IMAGE"):
-        if api_key.strip():
-            self.api_key = api_key
-            save_config({"SSY_API_KEY": self.api_key})
-
-        if not self.api_key:
+                response_modalities="IMAGE", batch_mode=False, max_concurrency=4, **options):
+        self.api_key = api_key.strip()
+        if not self.key_pool:
             return (self.create_placeholder_image(), "错误: 未提供API密钥")
 
         try:
-            data = {
-                "model": model,
-                "prompt": prompt,
-                "aspect_ratio": aspect_ratio
-            }
-            
             # 处理多张图像（最多12张）
             all_input_images = [input_image, input_image1, input_image2, input_image3, input_image4,
                               input_image5, input_image6, input_image7, input_image8, input_image9,
                               input_image10, input_image11]
-            
-            images_data = []
-            for img in all_input_images:
-                if img is not None:
-                    if isinstance(img, torch.Tensor):
-                        pil_image = self.tensor_to_image(img[0] if len(img.shape) == 4 else img)
-                        img_byte_arr = BytesIO()
-                        pil_image.save(img_byte_arr, format='PNG')
-                        b64_string = base64.b64encode(img_byte_arr.getvalue()).decode('utf-8')
-                        images_data.append({
-                            "inline_data": {
-                                "mime_type": "image/png",
-                                "data": b64_string
-                            }
-                        })
-            
-            if images_data:
-                data["images"] = images_data
-            
-            # gemini-3-pro独有参数
-            if "gemini-3-pro" in model:
-                data["size"] = size
-            
-            # response_modalities
-            if response_modalities == "IMAGE":
-                data["response_modalities"] = ["IMAGE"]
-            else:
-                data["response_modalities"] = ["TEXT", "IMAGE"]
-            
-            # 豆包系列使用generations端点
-            images, log = self.call_ssy_api(data, endpoint="generations")
-            
-            if images:
-                return (torch.cat(images, dim=0), log)
-            else:
-                return (self.create_placeholder_image(), log)
+            request_list, note = self.build_requests(
+                model, prompt, all_input_images, batch_mode, options.get("upload_format", "png"),
+                aspect_ratio=aspect_ratio, size=size, response_modalities=response_modalities)
+            return self.run_requests(request_list, max_concurrency, note, options)
                 
         except Exception as e:
             return (self.create_placeholder_image(), f"错误: {str(e)}")
 
+    def build_requests(self, model, prompt, input_images=(), batch_mode=False, upload_format="png",
+                       aspect_ratio="1:1", size="1K", response_modalities="IMAGE"):
+        """构建请求列表
+
+        Args:
+            input_images: 参考图列表，第1张在批量模式下按帧拆分，其余共用
+
+        Returns:
+            ([(data, endpoint)], 日志前缀)
+        """
+        spec = require_model(model)
+        data = {
+            "model": model,
+            "prompt": prompt,
+            "aspect_ratio": aspect_ratio
+        }
+        
+        # 只有声明了size的模型（gemini-3-pro）发送size
+        if spec.supports("size"):
+            data["size"] = size
+        
+        # response_modalities
+        if response_modalities == "IMAGE":
+            data["response_modalities"] = ["IMAGE"]
+        else:
+            data["response_modalities"] = ["TEXT", "IMAGE"]
+        
+        return self.build_image_requests(spec, data, input_images, batch_mode, upload_format)
+
 
 class SSYDoubaoGenerator(SSYAPIBase):
     """ByteDance Doubao系列图像生成器 - 简化版"""
@@ -358,13 +592,8 @@ class SSYDoubaoGenerator(SSYAPIBase):
     def INPUT_TYPES(cls):
         return {
             "required": {
-                "model": ([
-                    "bytedance/doubao-seedream-4.5",
-                    "bytedance/doubao-seedream-4.0",
-                    "bytedance/doubao-seedream-3.0-t2i",
-                    "bytedance/doubao-seededit-3-0-i2i"
-                ], {
-                    "default": "bytedance/doubao-seedream-4.5"
+                "model": (model_names("doubao"), {
+                    "default": model_names("doubao")[0]
                 }),
                 "prompt": ("STRING", {
                     "default": "Generate a high-quality image", 
@@ -392,68 +621,61 @@ class SSYDoubaoGenerator(SSYAPIBase):
                 "watermark": ("BOOLEAN", {
                     "default": False
                 }),
-            }
+                **cls.common_inputs(),
+            },
+            "hidden": {"unique_id": "UNIQUE_ID"},
         }
 
     RETURN_TYPES = ("IMAGE", "STRING")
     RETURN_NAMES = ("images", "log")
-    FUNCTION = "generate"
+    SYNC_FUNCTION = "generate"
+    FUNCTION = "execute_async" if ASYNC_EXECUTION else SYNC_FUNCTION
     CATEGORY = "SSY Cloud同步任务/Doubao"
+    # 模型注册表中的系列，决定节点的模型列表
+    FAMILY = "doubao"
 
     def generate(self, model, prompt, input_image=None, input_image1=None, input_image2=None,
                 input_image3=None, input_image4=None, input_image5=None, input_image6=None,
                 input_image7=None, input_image8=None, input_image9=None, api_key="", 
-                size="1024x1024", watermark=False):
-        if api_key.strip():
-            self.api_key = api_key
-            save_config({"SSY_API_KEY": self.api_key})
-
-        if not self.api_key:
+                size="1024x1024", watermark=False, batch_mode=False, max_concurrency=4, **options):
+        self.api_key = api_key.strip()
+        if not self.key_pool:
             return (self.create_placeholder_image(), "错误: 未提供API密钥")
 
         try:
-            # 构建最简请求体
-            data = {
-                "model": model,
-                "prompt": prompt,
-                "size": size,
-                "watermark": watermark
-            }
-            
             # 处理多张图像（最多10张）
             all_input_images = [input_image, input_image1, input_image2, input_image3, input_image4,
                               input_image5, input_image6, input_image7, input_image8, input_image9]
-            
-            images_data = []
-            for img in all_input_images:
-                if img is not None:
-                    if isinstance(img, torch.Tensor):
-                        pil_image = self.tensor_to_image(img[0] if len(img.shape) == 4 else img)
-                        img_byte_arr = BytesIO()
-                        pil_image.save(img_byte_arr, format='PNG')
-                        b64_string = base64.b64encode(img_byte_arr.getvalue()).decode('utf-8')
-                        # 使用data URI格式（根据API文档要求）
-                        images_data.append(f"data:image/png;base64,{b64_string}")
-            
-            if images_data:
-                # 4.0和4.5支持多图数组
-                if "4.0" in model or "4.5" in model:
-                    data["image"] = images_data
-                else:
-                    # 3.0系列只支持单图字符串
-                    data["image"] = images_data[0]
-            
+            request_list, note = self.build_requests(
+                model, prompt, all_input_images, batch_mode, options.get("upload_format", "png"),
+                size=size, watermark=watermark)
             # 豆包系列使用generations端点
-            images, log = self.call_ssy_api(data, endpoint="generations")
-            
-            if images:
-                return (torch.cat(images, dim=0), log)
-            else:
-                return (self.create_placeholder_image(), log)
+            return self.run_requests(request_list, max_concurrency, note, options)
                 
         except Exception as e:
             return (self.create_placeholder_image(), f"错误: {str(e)}")
 
+    def build_requests(self, model, prompt, input_images=(), batch_mode=False, upload_format="png",
+                       size="1024x1024", watermark=False):
+        """构建请求列表
+
+        Args:
+            input_images: 参考图列表，第1张在批量模式下按帧拆分，其余共用
+
+        Returns:
+            ([(data, endpoint)], 日志前缀)
+        """
+        # 构建最简请求体
+        data = {
+            "model": model,
+            "prompt": prompt,
+            "size": size,
+            "watermark": watermark
+        }
+        
+        # 参考图使用data URI格式（根据API文档要求），4.0和4.5为数组，3.0系列为单个字符串
+        return self.build_image_requests(require_model(model), data, input_images, batch_mode, upload_format)
+
 
 class SSYOpenAIGenerator(SSYAPIBase):
     """OpenAI系列图像生成器"""
@@ -462,8 +684,8 @@ class SSYOpenAIGenerator(SSYAPIBase):
     def INPUT_TYPES(cls):
         return {
             "required": {
-                "model": (["openai/gpt-image-1"], {
-                    "default": "openai/gpt-image-1"
+                "model": (model_names("openai"), {
+                    "default": model_names("openai")[0]
                 }),
                 "prompt": ("STRING", {
                     "default": "Generate a high-quality image", 
@@ -503,68 +725,82 @@ class SSYOpenAIGenerator(SSYAPIBase):
                 "moderation": (["auto", "low"], {
                     "default": "auto"
                 }),
-            }
+                **cls.common_inputs(),
+            },
+            "hidden": {"unique_id": "UNIQUE_ID"},
         }
 
-    RETURN_TYPES = ("IMAGE", "STRING")
-    RETURN_NAMES = ("images", "log")
-    FUNCTION = "generate"
+    RETURN_TYPES = ("IMAGE", "STRING", "MASK")
+    RETURN_NAMES = ("images", "log", "mask")
+    SYNC_FUNCTION = "generate"
+    FUNCTION = "execute_async" if ASYNC_EXECUTION else SYNC_FUNCTION
     CATEGORY = "SSY Cloud同步任务/OpenAI"
+    # 模型注册表中的系列，决定节点的模型列表
+    FAMILY = "openai"
 
     def generate(self, model, prompt, input_image=None, api_key="", size="auto", n=1, quality="auto",
-                background="auto", output_format="png", output_compression=100, moderation="auto"):
-        if api_key.strip():
-            self.api_key = api_key
-            save_config({"SSY_API_KEY": self.api_key})
-
-        if not self.api_key:
-            return (self.create_placeholder_image(), "错误: 未提供API密钥")
+                background="auto", output_format="png", output_compression=100, moderation="auto",
+                batch_mode=False, max_concurrency=4, **options):
+        self.api_key = api_key.strip()
+        if not self.key_pool:
+            return self.with_mask(self.create_placeholder_image(), "错误: 未提供API密钥")
 
         try:
-            # 按照API文档构建请求体，两个端点参数完全相同
-            data = {
-                "model": model,
-                "prompt": prompt
-            }
-            
-            # 处理输入图像
-            has_image = False
-            if input_image is not None:
-                if isinstance(input_image, torch.Tensor):
-                    pil_image = self.tensor_to_image(input_image[0] if len(input_image.shape) == 4 else input_image)
-                    img_byte_arr = BytesIO()
-                    pil_image.save(img_byte_arr, format='PNG')
-                    b64_string = base64.b64encode(img_byte_arr.getvalue()).decode('utf-8')
-                    data["image"] = f"data:image/png;base64,{b64_string}"
-                    has_image = True
-            
-            # 添加其他参数（文生图和图生图都支持）
-            if n != 1:
-                data["n"] = n
-            if size != "auto":
-                data["size"] = size
-            if quality != "auto":
-                data["quality"] = quality
-            if output_format != "png":
-                data["output_format"] = output_format
-            if background != "auto":
-                data["background"] = background
-            if moderation != "auto":
-                data["moderation"] = moderation
-            if output_compression != 100:
-                data["output_compression"] = output_compression
-            
-            # 根据是否有图片选择端点：有图用edits，无图用generations
-            endpoint = "edits" if has_image else "generations"
-            images, log = self.call_ssy_api(data, endpoint=endpoint)
-            
-            if images:
-                return (torch.cat(images, dim=0), log)
-            else:
-                return (self.create_placeholder_image(), log)
+            request_list, note = self.build_requests(
+                model, prompt, [input_image], batch_mode, options.get("upload_format", "png"),
+                size=size, n=n, quality=quality, background=background, output_format=output_format,
+                output_compression=output_compression, moderation=moderation)
+            # 透明背景时按RGBA解码一次，之后拆成IMAGE和MASK
+            if background == "transparent":
+                options["decode_mode"] = "RGBA"
+            # 每帧返回n张，失败的帧同样填充n张占位图
+            return self.with_mask(*self.run_requests(request_list, max_concurrency, note, options,
+                                                     images_per_request=n))
                 
         except Exception as e:
-            return (self.create_placeholder_image(), f"错误: {str(e)}")
+            return self.with_mask(self.create_placeholder_image(), f"错误: {str(e)}")
+
+    @staticmethod
+    def with_mask(images, log):
+        """把(图像, 日志)转换为节点输出(IMAGE, 日志, MASK)，MASK为1 - alpha"""
+        rgb, mask = split_alpha(images)
+        return (rgb, log, mask)
+
+    def build_requests(self, model, prompt, input_images=(), batch_mode=False, upload_format="png",
+                       size="auto", n=1, quality="auto", background="auto", output_format="png",
+                       output_compression=100, moderation="auto"):
+        """构建请求列表
+
+        Args:
+            input_images: 参考图列表，只使用第1张，批量模式下按帧拆分
+
+        Returns:
+            ([(data, endpoint)], 日志前缀)
+        """
+        # 按照API文档构建请求体，两个端点参数完全相同
+        data = {
+            "model": model,
+            "prompt": prompt
+        }
+        
+        # 添加其他参数（文生图和图生图都支持）
+        if n != 1:
+            data["n"] = n
+        if size != "auto":
+            data["size"] = size
+        if quality != "auto":
+            data["quality"] = quality
+        if output_format != "png":
+            data["output_format"] = output_format
+        if background != "auto":
+            data["background"] = background
+        if moderation != "auto":
+            data["moderation"] = moderation
+        if output_compression != 100:
+            data["output_compression"] = output_compression
+        
+        # 端点由注册表决定：有图用edits，无图用generations
+        return self.build_image_requests(require_model(model), data, input_images, batch_mode, upload_format)
 
 
 class SSYBytedanceProcessor(SSYAPIBase):
@@ -574,8 +810,8 @@ class SSYBytedanceProcessor(SSYAPIBase):
     def INPUT_TYPES(cls):
         return {
             "required": {
-                "model": (["bytedance/image_enhance", "bytedance/image_upscale"], {
-                    "default": "bytedance/image_enhance"
+                "model": (model_names("processor"), {
+                    "default": model_names("processor")[0]
                 }),
                 "input_image": ("IMAGE", {}),
             },
@@ -600,55 +836,275 @@ class SSYBytedanceProcessor(SSYAPIBase):
                     "default": 0,
                     "tooltip": "0=png格式, 1=jpeg格式"
                 }),
-            }
+                "tiling": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "超大图像切成重叠的块分别处理再拼接，resolution_boundary作用于每一块"
+                }),
+                "tile_size": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 4096,
+                    "step": 64,
+                    "tooltip": "每块的最大边长（像素，不小于256），0表示使用模型默认值"
+                }),
+                "tile_overlap": ("INT", {
+                    "default": 64,
+                    "min": 0,
+                    "max": 512,
+                    "step": 8,
+                    "tooltip": "相邻块的重叠像素（须小于块边长的一半），重叠区域羽化混合以消除接缝"
+                }),
+                **cls.common_inputs(use_cache=True, coalesce=True),
+            },
+            "hidden": {"unique_id": "UNIQUE_ID"},
         }
 
     RETURN_TYPES = ("IMAGE", "STRING")
     RETURN_NAMES = ("images", "log")
-    FUNCTION = "process"
+    SYNC_FUNCTION = "process"
+    FUNCTION = "execute_async" if ASYNC_EXECUTION else SYNC_FUNCTION
     CATEGORY = "SSY Cloud同步任务/Bytedance"
+    # 模型注册表中的系列，决定节点的模型列表
+    FAMILY = "processor"
 
     def process(self, model, input_image, api_key="", model_quality="MQ", 
-               resolution_boundary="1080p", jpg_quality=95, result_format=0):
-        if api_key.strip():
-            self.api_key = api_key
-            save_config({"SSY_API_KEY": self.api_key})
-
-        if not self.api_key:
+               resolution_boundary="1080p", jpg_quality=95, result_format=0,
+               tiling=False, tile_size=0, tile_overlap=64,
+               batch_mode=False, max_concurrency=4, **options):
+        self.api_key = api_key.strip()
+        if not self.key_pool:
             return (self.create_placeholder_image(), "错误: 未提供API密钥")
 
         try:
-            # 处理图像
-            if isinstance(input_image, torch.Tensor):
-                pil_image = self.tensor_to_image(input_image[0] if len(input_image.shape) == 4 else input_image)
-                img_byte_arr = BytesIO()
-                pil_image.save(img_byte_arr, format='PNG')
-                b64_string = base64.b64encode(img_byte_arr.getvalue()).decode('utf-8')
-            
-            data = {
-                "model": model,
-                "binary_data_base64": [b64_string],
-                "resolution_boundary": resolution_boundary,
-                "jpg_quality": jpg_quality,
-                "result_format": result_format,
-                "return_url": True
-            }
-            
-            # upscale模型必须的参数
-            if "upscale" in model:
-                data["model_quality"] = model_quality
-            
-            # 火山引擎使用edits端点
-            images, log = self.call_ssy_api(data, endpoint="edits")
-            
-            if images:
-                return (torch.cat(images, dim=0), log)
-            else:
-                return (self.create_placeholder_image(), log)
+            params = dict(model_quality=model_quality, resolution_boundary=resolution_boundary,
+                          jpg_quality=jpg_quality, result_format=result_format)
+            if tiling:
+                return self.process_tiled(model, input_image, tile_size, tile_overlap, batch_mode,
+                                          max_concurrency, params, options)
+            request_list, note = self.build_requests(
+                model, "", [input_image], batch_mode, options.get("upload_format", "png"), **params)
+            return self.run_requests(request_list, max_concurrency, note, options)
                 
         except Exception as e:
             return (self.create_placeholder_image(), f"错误: {str(e)}")
 
+    def process_tiled(self, model, input_image, tile_size, overlap, batch_mode, max_concurrency,
+                      params, options):
+        """分块处理：每帧切成相同尺寸的重叠块，所有块并发请求，结果按位置拼回整图
+
+        每块是一次计费请求，总块数（帧数 × 每帧块数）超过SSY_MAX_TILES时不发请求直接报错。
+        """
+        spec = require_model(model)
+        if spec.tile_side is None:
+            raise ValueError(f"{model}不支持分块处理")
+        tile = min(tile_size or spec.tile_side, spec.tile_side)
+        frames, note = self.select_frames(input_image, batch_mode)
+        height, width = frames[0].shape[-3:-1]
+        boxes = tile_boxes(height, width, tile, overlap)
+        max_tiles = get_setting("SSY_MAX_TILES", 256)
+        if len(boxes) * len(frames) > max_tiles:
+            raise ValueError(f"分块数{len(boxes)}×{len(frames)}帧超过上限{max_tiles}（SSY_MAX_TILES），"
+                             f"请增大tile_size或减小tile_overlap")
+        if len(boxes) == 1:
+            note += f"分块: 图像{width}x{height}未超过块大小{tile}px，不分块\n"
+        else:
+            note += f"分块: 图像{width}x{height}，每帧{len(boxes)}块（{tile}px，重叠{overlap}px）\n"
+
+        # 所有帧的块尺寸相同，合成一个批次由build_requests按帧拆分并并行编码
+        tiles = torch.cat([split_tiles(frame, boxes) for frame in frames])
+        request_list, encode_log = self.build_requests(
+            model, "", [tiles], True, options.get("upload_format", "png"), **params)
+        note += encode_log
+        results = self.run_items(request_list, max_concurrency, options)
+
+        log = note
+        outputs = []
+        for i in range(len(frames)):
+            frame_results = results[i * len(boxes):(i + 1) * len(boxes)]
+            failed = [j + 1 for j, (images, _) in enumerate(frame_results) if images is None]
+            if failed:
+                # 只附上第一个失败块的日志，避免日志随块数膨胀
+                first = frame_results[failed[0] - 1][1]
+                log += f"✗ 第{i + 1}帧的第{failed}块失败\n{first}"
+                outputs.append(None)
+                continue
+            outputs.append(stitch_tiles([images[:1] for images, _ in frame_results],
+                                        boxes, height, width, overlap))
+        # 各块日志基本相同，只附上第一块的日志
+        log += f"===== 第1块日志 =====\n{results[0][1]}"
+
+        succeeded = [out for out in outputs if out is not None]
+        if not succeeded:
+            return (self.create_placeholder_image(), log + "✗ 所有帧均失败\n")
+        out_h, out_w = succeeded[0].shape[1:3]
+        outputs = [out if out is not None else self.create_placeholder_image(out_w, out_h)
+                   for out in outputs]
+        batch, _ = concat_images(outputs)
+        log += f"✓ 分块处理完成: 输出{batch.shape[0]}张 {out_w}x{out_h} 图像\n"
+        return (batch, log)
+
+    def build_requests(self, model, prompt="", input_images=(), batch_mode=False, upload_format="png",
+                       model_quality="MQ", resolution_boundary="1080p", jpg_quality=95, result_format=0):
+        """构建请求列表
+
+        Args:
+            prompt: 未使用，与生成器的build_requests保持相同签名
+            input_images: 待处理图像列表，只使用第1张，批量模式下按帧拆分
+
+        Returns:
+            ([(data, endpoint)], 日志前缀)
+        """
+        if not any(isinstance(img, torch.Tensor) for img in input_images):
+            raise ValueError("缺少输入图像")
+        spec = require_model(model)
+        data = {
+            "model": model,
+            "resolution_boundary": resolution_boundary,
+            "jpg_quality": jpg_quality,
+            "result_format": result_format,
+            "return_url": True
+        }
+        
+        # upscale模型必须的参数
+        if spec.supports("model_quality"):
+            data["model_quality"] = model_quality
+        
+        # 批量模式下每一帧各发起一次请求，火山引擎使用edits端点
+        return self.build_image_requests(spec, data, input_images, batch_mode, upload_format)
+
+
+class SSYBatchGenerator(SSYAPIBase):
+    """多提示词批量生成器：一个节点并发生成多条提示词的图像"""
+
+    # 可用的生成器，请求体由各生成器的build_requests构建
+    GENERATORS = {generator.FAMILY: generator
+                  for generator in (SSYGoogleGenerator, SSYDoubaoGenerator, SSYOpenAIGenerator)}
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        models = model_names(*cls.GENERATORS)
+        common = cls.common_inputs(priority="bulk")
+        common.pop("batch_mode")
+        return {
+            "required": {
+                "model": (models, {
+                    "default": models[0]
+                }),
+                "prompts": ("STRING", {
+                    "default": "a red apple on a wooden table\na green pear on a marble table",
+                    "multiline": True,
+                    "tooltip": "lines: 每行一条提示词；json: 提示词列表，或带prompt键的对象列表；template: 含{变量名}的模板"
+                }),
+                "prompt_mode": (["lines", "json", "template"], {
+                    "default": "lines"
+                }),
+            },
+            "optional": {
+                "variables": ("STRING", {
+                    "default": "",
+                    "multiline": True,
+                    "tooltip": 'template模式的变量：{"color": ["red", "blue"]}按组合展开，或[{"color": "red"}, ...]逐条代入'
+                }),
+                "params": ("STRING", {
+                    "default": "{}",
+                    "multiline": True,
+                    "tooltip": '所有提示词共用的模型参数（JSON），如{"size": "2K", "aspect_ratio": "16:9"}'
+                }),
+                "on_failure": (["placeholder", "skip"], {
+                    "default": "placeholder",
+                    "tooltip": "失败的提示词用占位图填充（输出与提示词一一对应）或直接跳过"
+                }),
+                "input_image": ("IMAGE", {"tooltip": "所有提示词共用的参考图片"}),
+                "api_key": ("STRING", {
+                    "default": "",
+                    "password": True
+                }),
+                **common,
+            },
+            "hidden": {"unique_id": "UNIQUE_ID"},
+        }
+
+    RETURN_TYPES = ("IMAGE", "STRING", "STRING")
+    RETURN_NAMES = ("images", "log", "status")
+    SYNC_FUNCTION = "generate"
+    FUNCTION = "execute_async" if ASYNC_EXECUTION else SYNC_FUNCTION
+    CATEGORY = "SSY Cloud同步任务/Batch"
+
+    def generate(self, model, prompts, prompt_mode="lines", variables="", params="{}",
+                 on_failure="placeholder", input_image=None, api_key="", max_concurrency=4, **options):
+        self.api_key = api_key.strip()
+        if not self.key_pool:
+            return (self.create_placeholder_image(), "错误: 未提供API密钥", "[]")
+
+        try:
+            items = expand_prompts(prompts, prompt_mode, variables)
+            if not items:
+                return (self.create_placeholder_image(), "错误: 没有有效的提示词", "[]")
+            shared_params = json.loads(params) if params.strip() else {}
+            generator = self.generator_for(model)()
+            # 只接受生成器的模型参数，模型、提示词和参考图由本节点决定
+            accepted = set(inspect.signature(generator.build_requests).parameters) - {
+                "model", "prompt", "input_images", "batch_mode", "upload_format"}
+
+            request_list, note = [], ""
+            for prompt, overrides in items:
+                item_params = {**shared_params, **overrides}
+                unknown = set(item_params) - accepted
+                if unknown:
+                    raise ValueError(f"{model}不支持的参数: {sorted(unknown)}")
+                requests_for_item, item_note = generator.build_requests(
+                    model, prompt, [input_image], False, options.get("upload_format", "png"),
+                    **item_params)
+                request_list.append(requests_for_item[0])
+                note = note or item_note
+            return self.collect(items, self.run_items(request_list, max_concurrency, options),
+                                max_concurrency, on_failure, note)
+
+        except Exception as e:
+            return (self.create_placeholder_image(), f"错误: {str(e)}", "[]")
+
+    def generator_for(self, model):
+        """按模型注册表中的系列返回构建请求的生成器节点类（由调用方实例化，只用于构建请求体）"""
+        generator = self.GENERATORS.get(require_model(model).family)
+        if generator is None:
+            raise ValueError(f"{model}不是生成模型")
+        return generator
+
+    def collect(self, items, results, max_concurrency, on_failure, note=""):
+        """把各提示词的结果按顺序拼成一个IMAGE批次，并生成逐条状态（JSON）"""
+        total = len(items)
+        log = note + f"批量生成: {total}条提示词, 并发上限{max_concurrency}\n"
+        status = []
+        for i, ((prompt, _), (images, item_log)) in enumerate(zip(items, results)):
+            log += f"===== 第{i + 1}/{total}条: {prompt[:60]} =====\n{item_log}"
+            status.append({
+                "index": i,
+                "prompt": prompt,
+                "status": "ok" if images is not None else "failed",
+                "images": images.shape[0] if images is not None else 0,
+            })
+        status_json = json.dumps(status, ensure_ascii=False, indent=2)
+
+        succeeded = [images for images, _ in results if images is not None]
+        if not succeeded:
+            return (self.create_placeholder_image(), log + "✗ 所有提示词均失败\n", status_json)
+
+        height, width = succeeded[0].shape[1:3]
+        failed = [i + 1 for i, (images, _) in enumerate(results) if images is None]
+        if on_failure == "skip":
+            outputs = succeeded
+        else:
+            outputs = [images if images is not None else self.create_placeholder_image(width, height)
+                       for images, _ in results]
+        batch, resized = concat_images(outputs)
+        if resized:
+            log += f"注意: 部分结果尺寸不一致，已缩放到{width}x{height}\n"
+        if failed:
+            action = "已跳过" if on_failure == "skip" else "已用占位图填充"
+            log += f"✗ 第{failed}条失败，{action}\n"
+        log += f"✓ 批量完成: {total - len(failed)}/{total}条成功，共输出{batch.shape[0]}张图像\n"
+        return (batch, log, status_json)
+
 
 # Node registration
 NODE_CLASS_MAPPINGS = {
@@ -656,6 +1112,7 @@ NODE_CLASS_MAPPINGS = {
     "SSYDoubaoGenerator": SSYDoubaoGenerator,
     "SSYOpenAIGenerator": SSYOpenAIGenerator,
     "SSYBytedanceProcessor": SSYBytedanceProcessor,
+    "SSYBatchGenerator": SSYBatchGenerator,
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
@@ -663,4 +1120,5 @@ NODE_DISPLAY_NAME_MAPPINGS = {
     "SSYDoubaoGenerator": "SSY Doubao Generator（同步任务）🎨",
     "SSYOpenAIGenerator": "SSY OpenAI Generator（同步任务）🤖",
     "SSYBytedanceProcessor": "SSY Bytedance Processor（同步任务）🔧",
+    "SSYBatchGenerator": "SSY Batch Generator（同步任务）📋",
 }
@@ -0,0 +1,21 @@
+"""离线批量任务的命令行入口，不需要启动ComfyUI
+
+    python run_jobs.py jobs.jsonl -o output/ --concurrency 16
+
+任务文件格式和检查点说明见ssy_jobs.py。
+"""
+import os
+import sys
+import types
+import importlib
+
+ROOT = os.path.dirname(os.path.realpath(__file__))
+# 插件目录名不是合法的Python包名，注册成ssy_syncapi包后子模块的相对导入照常工作
+PACKAGE = "ssy_syncapi"
+
+
+if __name__ == "__main__":
+    package = types.ModuleType(PACKAGE)
+    package.__path__ = [ROOT]
+    sys.modules[PACKAGE] = package
+    sys.exit(importlib.import_module(f"{PACKAGE}.ssy_jobs").main())
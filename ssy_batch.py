@@ -0,0 +1,96 @@
+"""批量请求的并发执行工具"""
+import json
+import string
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+import torch.nn.functional as F
+
+
+def run_bounded(fn, items, max_workers):
+    """以最多max_workers个并发执行fn(item)，结果按输入顺序返回"""
+    items = list(items)
+    if max_workers <= 1 or len(items) <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items)),
+                            thread_name_prefix="ssy-batch") as pool:
+        return list(pool.map(fn, items))
+
+
+def split_frames(tensor):
+    """把[B,H,W,C]的IMAGE拆成单帧列表，[H,W,C]视为单帧"""
+    if len(tensor.shape) == 4:
+        return [tensor[i] for i in range(tensor.shape[0])]
+    return [tensor]
+
+
+def concat_images(images):
+    """按顺序拼接[N,H,W,C]张量，尺寸不一致的结果缩放到第一张的尺寸"""
+    height, width = images[0].shape[1:3]
+    resized = False
+    aligned = []
+    for img in images:
+        if img.shape[1:3] != (height, width):
+            img = F.interpolate(img.movedim(-1, 1), size=(height, width),
+                                mode="bilinear", align_corners=False).movedim(1, -1)
+            resized = True
+        aligned.append(img)
+    return torch.cat(aligned, dim=0), resized
+
+
+def expand_prompts(text, mode="lines", variables=""):
+    """把提示词输入展开成[(提示词, 参数覆盖dict)]
+
+    Args:
+        text: 提示词输入
+        mode: "lines"每行一条；"json"为字符串列表，或带prompt键的对象列表（其余键覆盖请求参数）；
+            "template"为含{变量名}的模板
+        variables: template模式的变量，JSON对象{"变量名": [取值, ...]}按笛卡尔积展开，
+            或对象列表[{"变量名": 取值}, ...]逐条代入
+
+    Raises:
+        ValueError: JSON格式错误、json模式的某一条缺少prompt（报告条目序号），或模板引用了未提供的变量
+    """
+    if mode == "lines":
+        return [(line.strip(), {}) for line in text.splitlines() if line.strip()]
+
+    if mode == "json":
+        items = json.loads(text)
+        if not isinstance(items, list):
+            raise ValueError("json模式需要提示词列表")
+        prompts = []
+        for i, item in enumerate(items, 1):
+            if isinstance(item, dict):
+                overrides = dict(item)
+                prompt = overrides.pop("prompt", None)
+                if not isinstance(prompt, str) or not prompt.strip():
+                    raise ValueError(f"第{i}条缺少prompt字段（需要非空字符串）: {json.dumps(item, ensure_ascii=False)[:80]}")
+                prompts.append((prompt, overrides))
+            elif isinstance(item, (str, int, float)) and not isinstance(item, bool) and str(item).strip():
+                prompts.append((str(item), {}))
+            else:
+                raise ValueError(f"第{i}条不是提示词字符串或带prompt的对象: {json.dumps(item, ensure_ascii=False)[:80]}")
+        return prompts
+
+    if mode == "template":
+        template = text.strip()
+        spec = json.loads(variables) if variables.strip() else {}
+        if isinstance(spec, dict):
+            names = list(spec)
+            values = [v if isinstance(v, list) else [v] for v in spec.values()]
+            combos = [dict(zip(names, combo)) for combo in itertools.product(*values)]
+        elif isinstance(spec, list):
+            combos = [dict(combo) for combo in spec]
+        else:
+            raise ValueError("variables需要JSON对象或对象列表")
+        fields = {name for _, name, _, _ in string.Formatter().parse(template) if name}
+        prompts = []
+        for combo in combos or [{}]:
+            missing = fields - set(combo)
+            if missing:
+                raise ValueError(f"模板变量未提供: {sorted(missing)}")
+            prompts.append((template.format_map(combo), {}))
+        return prompts
+
+    raise ValueError(f"未知的提示词模式: {mode}")
@@ -0,0 +1,104 @@
+"""流式JSON请求体
+
+请求体中的图像以EncodedImage（编码后的原始字节）保存，序列化时逐块生成：
+普通字段按紧凑JSON输出，图像字段的base64直接从编码字节分块产生，
+整个请求体不会在内存中拼成一个完整的字符串/字节串。
+"""
+import json
+import hashlib
+
+from .ssy_encode import EncodedImage
+
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+def _pieces(obj, sort_keys=False):
+    """按顺序产生请求体片段：bytes或EncodedImage"""
+    if isinstance(obj, EncodedImage):
+        yield obj
+    elif isinstance(obj, dict):
+        yield b"{"
+        items = sorted(obj.items()) if sort_keys else obj.items()
+        for i, (key, value) in enumerate(items):
+            yield (b"," if i else b"") + _encode(str(key)).encode("utf-8") + b":"
+            yield from _pieces(value, sort_keys)
+        yield b"}"
+    elif isinstance(obj, (list, tuple)):
+        yield b"["
+        for i, value in enumerate(obj):
+            if i:
+                yield b","
+            yield from _pieces(value, sort_keys)
+        yield b"]"
+    else:
+        yield _encode(obj).encode("utf-8")
+
+
+class JSONBody:
+    """可重复迭代、长度已知的请求体
+
+    requests据__len__设置Content-Length并逐块发送，不使用chunked编码。
+    on_sent在请求体全部发出后调用。
+    """
+
+    def __init__(self, data, chunk_size=64 * 1024, on_sent=None):
+        self.data = data
+        self.chunk_size = chunk_size
+        self.on_sent = on_sent
+        self._length = None
+
+    def __len__(self):
+        if self._length is None:
+            self._length = sum(piece.base64_length() + 2 if isinstance(piece, EncodedImage) else len(piece)
+                               for piece in _pieces(self.data))
+        return self._length
+
+    def __iter__(self):
+        pending = bytearray()
+        for piece in _pieces(self.data):
+            if isinstance(piece, EncodedImage):
+                pending += b'"'
+                for chunk in piece.iter_base64():
+                    if pending:
+                        yield bytes(pending)
+                        pending.clear()
+                    yield chunk
+                pending += b'"'
+            else:
+                pending += piece
+                if len(pending) >= self.chunk_size:
+                    yield bytes(pending)
+                    pending.clear()
+        if pending:
+            yield bytes(pending)
+        if self.on_sent is not None:
+            # 最后一块交给传输层后回调，用于上报"请求已发送、等待生成"
+            self.on_sent()
+
+    def to_bytes(self):
+        return b"".join(self)
+
+
+def request_key(data, endpoint):
+    """计算请求体的内容哈希，键顺序不影响结果，图像按原始字节参与哈希"""
+    hasher = hashlib.sha256(endpoint.encode("utf-8"))
+    for piece in _pieces(data, sort_keys=True):
+        if isinstance(piece, EncodedImage):
+            hasher.update(f"<{piece.mime}|{piece.data_uri}|{len(piece.data)}>".encode("utf-8"))
+            hasher.update(piece.data)
+        else:
+            hasher.update(piece)
+    return hasher.hexdigest()
+
+
+def describe_body(data):
+    """生成用于日志的请求体摘要，图像和长字符串只保留大小"""
+    if isinstance(data, EncodedImage):
+        return f"<{data.mime} {len(data.data) / 1024:.1f} KB>"
+    if isinstance(data, dict):
+        return {key: describe_body(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [describe_body(value) for value in data]
+    if isinstance(data, str) and len(data) > 200:
+        return f"<base64 data {len(data)} chars>"
+    return data
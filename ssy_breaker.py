@@ -0,0 +1,207 @@
+"""按(模型, 端点)划分的熔断器
+
+路由某个模型故障时，连续失败或滑动窗口内失败率过高会让熔断器打开，
+之后的调用（包括已在引擎中排队的）不再发出请求而是立即失败；
+冷却时间过后进入半开状态，放行少量探测请求，成功则恢复，失败则重新打开。
+
+只有暂时性故障（连接中断、超时、5xx）计为失败；429属于限流，401/403是密钥的问题，
+参数错误等4xx是请求本身的问题，都不影响熔断状态。
+"""
+import time
+import threading
+from collections import deque
+
+from .ssy_config import get_setting
+from .ssy_retry import AttemptError, RetryableError
+from .ssy_keys import KEY_SWITCH_STATUS
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(AttemptError):
+    """熔断器打开时的快速失败"""
+
+    def __init__(self, log, retry_in):
+        super().__init__(log)
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """单个(模型, 端点)的熔断器
+
+    Args:
+        failure_threshold: 连续失败多少次打开
+        failure_rate: 滑动窗口内失败率达到该值时打开
+        min_requests: 窗口内至少有这么多次调用才按失败率判断
+        window: 滑动窗口秒数
+        cooldown: 打开后经过多少秒进入半开状态
+        half_open_probes: 半开状态同时放行的探测请求数
+    """
+
+    def __init__(self, failure_threshold=5, failure_rate=0.5, min_requests=10,
+                 window=60.0, cooldown=30.0, half_open_probes=1):
+        self.failure_threshold = failure_threshold
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.window = window
+        self.cooldown = cooldown
+        self.half_open_probes = max(1, half_open_probes)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.consecutive_failures = 0
+        self.rejected = 0
+        self.trips = 0
+        self._outcomes = deque()  # (时间, 是否成功)
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def _trim(self, now):
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            self._outcomes.popleft()
+
+    def _should_open(self):
+        if self.consecutive_failures >= self.failure_threshold:
+            return True
+        if len(self._outcomes) < self.min_requests:
+            return False
+        failures = sum(1 for _, ok in self._outcomes if not ok)
+        return failures / len(self._outcomes) >= self.failure_rate
+
+    def _open(self, now):
+        self.state = OPEN
+        self.opened_at = now
+        self.trips += 1
+        self._probes = 0
+
+    def allow(self):
+        """返回(是否放行, 距离下次探测的秒数)"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                remaining = self.opened_at + self.cooldown - now
+                if remaining > 0:
+                    self.rejected += 1
+                    return False, remaining
+                self.state = HALF_OPEN
+                self._probes = 0
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_probes:
+                    self.rejected += 1
+                    return False, 0.0
+                self._probes += 1
+            return True, 0.0
+
+    def record(self, success):
+        """记录一次放行调用的结果"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+                if success:
+                    self.state = CLOSED
+                    self.consecutive_failures = 0
+                    self._outcomes.clear()
+                else:
+                    self._open(now)
+                return
+            self._outcomes.append((now, success))
+            self._trim(now)
+            self.consecutive_failures = 0 if success else self.consecutive_failures + 1
+            if self.state == CLOSED and not success and self._should_open():
+                self._open(now)
+
+    def release(self):
+        """放行后没有得到可判断的结果（如429），归还半开状态的探测名额"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+
+    def status(self):
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            status = {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "window_requests": len(self._outcomes),
+                "window_failures": failures,
+                "trips": self.trips,
+                "rejected": self.rejected,
+            }
+            if self.state == OPEN:
+                status["retry_in"] = round(max(0.0, self.opened_at + self.cooldown - now), 1)
+            return status
+
+
+class BreakerRegistry:
+    """(模型, 端点) -> CircuitBreaker"""
+
+    def __init__(self, enabled=True, **breaker_args):
+        self.enabled = enabled
+        self.breaker_args = breaker_args
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, model, endpoint):
+        key = (model, endpoint)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(key)
+                if breaker is None:
+                    breaker = self._breakers[key] = CircuitBreaker(**self.breaker_args)
+        return breaker
+
+    def call(self, model, endpoint, fn):
+        """经过熔断器执行fn，熔断时抛出CircuitOpenError"""
+        if not self.enabled:
+            return fn()
+        breaker = self.get(model, endpoint)
+        allowed, retry_in = breaker.allow()
+        if not allowed:
+            log = f"⚡ 熔断: {model} / {endpoint} 近期连续失败，已暂停请求"
+            log += f"，{retry_in:.0f}秒后探测恢复\n" if retry_in > 0 else "，正在探测恢复\n"
+            raise CircuitOpenError(log, retry_in)
+        try:
+            result = fn()
+        except RetryableError as e:
+            if e.status in KEY_SWITCH_STATUS:
+                breaker.release()
+            else:
+                breaker.record(False)
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        breaker.record(True)
+        return result
+
+    def status(self):
+        with self._lock:
+            items = list(self._breakers.items())
+        return {f"{model}|{endpoint}": breaker.status() for (model, endpoint), breaker in items}
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_breakers():
+    """返回进程级共享的熔断器表（首次调用时按配置创建）"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = BreakerRegistry(
+                    enabled=get_setting("SSY_BREAKER", True),
+                    failure_threshold=get_setting("SSY_BREAKER_FAILURES", 5),
+                    failure_rate=get_setting("SSY_BREAKER_FAILURE_RATE", 0.5),
+                    min_requests=get_setting("SSY_BREAKER_MIN_REQUESTS", 10),
+                    window=get_setting("SSY_BREAKER_WINDOW", 60.0),
+                    cooldown=get_setting("SSY_BREAKER_COOLDOWN", 30.0),
+                    half_open_probes=get_setting("SSY_BREAKER_HALF_OPEN_PROBES", 1),
+                )
+    return _registry
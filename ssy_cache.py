@@ -0,0 +1,182 @@
+"""确定性调用的结果缓存
+
+以规范化请求体（模型、参数、图像数据）的sha256为键，缓存解码后的图像：
+- 内存LRU层：按字节预算淘汰
+- 磁盘层：超过TTL失效，总大小超出上限时淘汰最久未使用的条目
+
+图像以uint8保存（来源本就是8位图像），命中时再转换为float32张量。
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import torch
+
+from .ssy_config import get_setting, p
+
+
+def to_uint8(images):
+    """[N,H,W,C] float32张量 -> uint8数组"""
+    return images.mul(255).round_().clamp_(0, 255).to(torch.uint8).cpu().numpy()
+
+
+def from_uint8(array):
+    """uint8数组 -> [N,H,W,C] float32张量"""
+    return torch.from_numpy(array).to(torch.float32).div_(255.0)
+
+
+class ResultCache:
+    """两级结果缓存
+
+    Args:
+        memory_bytes: 内存层字节预算
+        disk_dir: 磁盘层目录，None表示不使用磁盘层
+        disk_bytes: 磁盘层字节上限
+        ttl: 条目有效期（秒），0表示永不过期
+    """
+
+    def __init__(self, memory_bytes=256 * 1024 * 1024, disk_dir=None,
+                 disk_bytes=2 * 1024 * 1024 * 1024, ttl=7 * 24 * 3600):
+        self.memory_bytes = memory_bytes
+        self.disk_dir = disk_dir
+        self.disk_bytes = disk_bytes
+        self.ttl = ttl
+        self._memory = OrderedDict()  # key -> (created, array, wire_bytes)
+        self._memory_used = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _expired(self, created):
+        return self.ttl > 0 and time.time() - created > self.ttl
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.npz")
+
+    def get(self, key):
+        """返回(图像张量, 节省的网络字节数)，未命中返回None"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if self._expired(entry[0]):
+                    self._drop_memory(key)
+                    entry = None
+                else:
+                    self._memory.move_to_end(key)
+
+        if entry is None and self.disk_dir:
+            entry = self._load_disk(key)
+            if entry is not None:
+                self._put_memory(key, entry)
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.bytes_saved += entry[2]
+        return from_uint8(entry[1]), entry[2]
+
+    def put(self, key, images, wire_bytes=0):
+        """写入解码后的[N,H,W,C]图像及本次请求的网络传输字节数"""
+        entry = (time.time(), to_uint8(images), int(wire_bytes))
+        self._put_memory(key, entry)
+        if self.disk_dir:
+            self._save_disk(key, entry)
+
+    def _drop_memory(self, key):
+        _, array, _ = self._memory.pop(key)
+        self._memory_used -= array.nbytes
+
+    def _put_memory(self, key, entry):
+        size = entry[1].nbytes
+        if size > self.memory_bytes:
+            return
+        with self._lock:
+            if key in self._memory:
+                self._drop_memory(key)
+            self._memory[key] = entry
+            self._memory_used += size
+            while self._memory_used > self.memory_bytes:
+                self._drop_memory(next(iter(self._memory)))
+
+    def _load_disk(self, key):
+        path = self._disk_path(key)
+        try:
+            created = os.path.getmtime(path)
+            if self._expired(created):
+                os.remove(path)
+                return None
+            with np.load(path) as archive:
+                entry = (created, archive["images"], int(archive["wire_bytes"]))
+            # 更新访问时间，供按最久未使用淘汰
+            os.utime(path, (time.time(), created))
+            return entry
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save_disk(self, key, entry):
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(f, images=entry[1], wire_bytes=np.int64(entry[2]))
+            os.replace(tmp_path, path)
+            self._evict_disk()
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _evict_disk(self):
+        files = []
+        total = 0
+        for entry in os.scandir(self.disk_dir):
+            if not entry.name.endswith(".npz"):
+                continue
+            stat = entry.stat()
+            if self._expired(stat.st_mtime):
+                os.remove(entry.path)
+                continue
+            files.append((stat.st_atime, stat.st_size, entry.path))
+            total += stat.st_size
+        files.sort()
+        for _, size, path in files:
+            if total <= self.disk_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bytes_saved": self.bytes_saved,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_used,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """返回进程级共享的结果缓存（首次调用时按配置创建）"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                disk_dir = get_setting("SSY_CACHE_DIR", os.path.join(p, "cache"))
+                _cache = ResultCache(
+                    memory_bytes=get_setting("SSY_CACHE_MEMORY_MB", 256) * 1024 * 1024,
+                    disk_dir=disk_dir or None,
+                    disk_bytes=get_setting("SSY_CACHE_DISK_MB", 2048) * 1024 * 1024,
+                    ttl=get_setting("SSY_CACHE_TTL", 7 * 24 * 3600),
+                )
+    return _cache
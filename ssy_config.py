@@ -0,0 +1,69 @@
+import os
+import json
+import threading
+
+p = os.path.dirname(os.path.realpath(__file__))
+CONFIG_PATH = os.path.join(p, 'config.json')
+
+# config.json的内存缓存，按文件修改时间和大小判断是否需要重新读取
+_cache = {"stamp": None, "config": {}}
+_lock = threading.Lock()
+
+
+def _stamp():
+    try:
+        stat = os.stat(CONFIG_PATH)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def get_config():
+    """返回config.json内容的副本；文件未变化时不读盘，只做一次stat"""
+    stamp = _stamp()
+    with _lock:
+        if stamp != _cache["stamp"]:
+            try:
+                with open(CONFIG_PATH, 'r') as f:
+                    config = json.load(f)
+            except:
+                config = {}
+            _cache["stamp"], _cache["config"] = stamp, config
+        return dict(_cache["config"])
+
+def save_config(config):
+    """原子地写入config.json（先写临时文件再替换），并发读取不会看到写了一半的文件"""
+    tmp = f"{CONFIG_PATH}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with _lock:
+        with open(tmp, 'w') as f:
+            json.dump(config, f, indent=4)
+        os.replace(tmp, CONFIG_PATH)
+        _cache["stamp"], _cache["config"] = _stamp(), dict(config)
+
+def set_config_value(key, value):
+    """只更新config.json中的单个键，保留其余配置项"""
+    config = get_config()
+    config[key] = value
+    save_config(config)
+
+def get_setting(name, default=None):
+    """读取运行时设置：环境变量优先，其次config.json，最后使用默认值
+
+    返回值按default的类型转换（bool/int/float/str），dict/list类型的环境变量按JSON解析。
+    """
+    value = os.environ.get(name)
+    if value is None:
+        value = get_config().get(name)
+    if value is None:
+        return default
+    if default is None:
+        return value
+    try:
+        if isinstance(default, (dict, list)):
+            return json.loads(value) if isinstance(value, str) else type(default)(value)
+        if isinstance(default, bool):
+            if isinstance(value, str):
+                return value.strip().lower() in ("1", "true", "yes", "on")
+            return bool(value)
+        return type(default)(value)
+    except (TypeError, ValueError):
+        return default
@@ -0,0 +1,113 @@
+"""张量与图像的互相转换
+
+ComfyUI的IMAGE是[B,H,W,C]的float32张量（0~1）。转换时：
+- float32 -> uint8：按块把乘255、四舍五入、截断融合在一个复用的float32缓冲区里完成，
+  直接写入uint8输出，不再为.cpu()/.mul()/.clamp()/.byte()各分配一份整图大小的中间张量；
+  整个批次一次转换，GPU张量先在设备上量化，只拷贝uint8回内存
+- uint8 -> float32：写入预分配的float32张量后原地除以255
+- 支持1、3、4通道（L、RGB、RGBA），透明通道原样保留，可一次拆分成IMAGE和MASK
+"""
+import threading
+
+import numpy as np
+import torch
+from PIL import Image
+
+# 通道数 <-> PIL模式
+CHANNEL_MODES = {1: "L", 3: "RGB", 4: "RGBA"}
+MODE_CHANNELS = {mode: channels for channels, mode in CHANNEL_MODES.items()}
+
+# 每块量化的元素数，复用的float32缓冲区为其4倍字节（4 MB）
+CHUNK_ELEMENTS = 1 << 20
+
+_local = threading.local()
+
+
+def _scratch(size):
+    buf = getattr(_local, "scratch", None)
+    if buf is None:
+        buf = _local.scratch = torch.empty(CHUNK_ELEMENTS, dtype=torch.float32)
+    return buf[:size]
+
+
+def quantize(tensor, out=None):
+    """把0~1的float张量转换为同形状的uint8 numpy数组（四舍五入）
+
+    Args:
+        tensor: 任意形状的浮点张量，通常是[B,H,W,C]或[H,W,C]
+        out: 可选的uint8输出数组（形状相同），用于复用输出缓冲区
+    """
+    tensor = tensor.detach()
+    if out is None:
+        out = np.empty(tuple(tensor.shape), dtype=np.uint8)
+    if tensor.device.type != "cpu":
+        # 在设备上量化，只把uint8拷回内存，传输量是float32的1/4
+        quantized = tensor.mul(255.0).add_(0.5).clamp_(0, 255).to(torch.uint8)
+        torch.from_numpy(out).copy_(quantized.cpu())
+        return out
+    flat = tensor.reshape(-1)
+    target = torch.from_numpy(out).view(-1)
+    for start in range(0, flat.numel(), CHUNK_ELEMENTS):
+        chunk = flat[start:start + CHUNK_ELEMENTS]
+        scratch = _scratch(chunk.numel())
+        torch.mul(chunk, 255.0, out=scratch)
+        scratch.add_(0.5).clamp_(0, 255)
+        # float -> uint8的copy_向零截断，加0.5后即四舍五入
+        target[start:start + chunk.numel()].copy_(scratch)
+    return out
+
+
+def _to_pil(array):
+    channels = array.shape[-1] if array.ndim == 3 else 1
+    if channels not in CHANNEL_MODES:
+        raise ValueError(f"不支持{channels}通道的图像")
+    if array.ndim == 3 and channels == 1:
+        array = array[..., 0]
+    return Image.fromarray(array, mode=CHANNEL_MODES[channels])
+
+
+def tensor_to_pil(tensor):
+    """把单帧（[H,W,C]或[1,H,W,C]，批次时取第1帧）转换为PIL图像，模式按通道数决定"""
+    if tensor.ndim == 4:
+        tensor = tensor[0]
+    return _to_pil(quantize(tensor))
+
+
+def batch_to_pil(tensor):
+    """把[B,H,W,C]批次一次量化后转换为PIL图像列表"""
+    if tensor.ndim == 3:
+        tensor = tensor.unsqueeze(0)
+    return [_to_pil(frame) for frame in quantize(tensor)]
+
+
+def dequantize_into(out, pixels):
+    """把uint8像素写入float32张量（未除以255），out为张量或其切片"""
+    if pixels.ndim == 2:
+        pixels = pixels[..., None]
+    np.copyto(out.numpy(), pixels, casting="unsafe")
+
+
+def pil_to_tensor(images, mode="RGB"):
+    """把一张或多张同尺寸PIL图像转换为[N,H,W,C]的float32张量（0~1）"""
+    if isinstance(images, Image.Image):
+        images = [images]
+    width, height = images[0].size
+    out = torch.empty((len(images), height, width, MODE_CHANNELS[mode]), dtype=torch.float32)
+    for i, img in enumerate(images):
+        if img.mode != mode:
+            img = img.convert(mode)
+        dequantize_into(out[i], np.asarray(img))
+    return out.div_(255.0)
+
+
+def split_alpha(images):
+    """把[B,H,W,4]拆成IMAGE [B,H,W,3]和MASK [B,H,W]，不重新解码
+
+    MASK沿用ComfyUI LoadImage的约定：1 - alpha（透明处为1）。
+    没有透明通道时返回原图和全0 MASK。
+    """
+    if images.shape[-1] != 4:
+        return images, torch.zeros(images.shape[:-1], dtype=torch.float32)
+    rgb = images[..., :3].contiguous()
+    mask = 1.0 - images[..., 3]
+    return rgb, mask
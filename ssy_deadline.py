@@ -0,0 +1,146 @@
+"""调用截止时间
+
+- 连接超时与读取超时分开：连接阶段很快失败，不再和渲染耗时共用同一个120秒
+- 每次调用有一个整体截止时间，按(模型, 尺寸)的历史延迟估算：
+  p99延迟乘以系数，再限制在[最小值, 最大值]内；样本不足时使用默认值
+- 截止时间贯穿API请求、响应读取、结果URL下载以及所有重试和对冲，超时以requests的Timeout抛出，
+  交给重试/熔断逻辑处理；过期后不再重试
+"""
+import time
+import threading
+
+import requests
+
+from .ssy_config import get_setting
+from .ssy_retry import LatencyHistogram
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """超过调用截止时间"""
+
+
+class Deadline:
+    """一次调用的整体截止时间
+
+    Args:
+        seconds: 从开始计时起允许的总秒数
+        connect_timeout: 建立连接的超时秒数
+        started: 是否在创建时就开始计时；为False时由第一次尝试出队执行时调用start()，
+            在请求引擎中排队的时间不计入
+    """
+
+    def __init__(self, seconds, connect_timeout=10.0, started=True):
+        self.seconds = seconds
+        self.connect_timeout = connect_timeout
+        self.expires = time.monotonic() + seconds if started else None
+
+    def start(self):
+        """开始计时，已经开始时不变（重试和对冲沿用第一次尝试的截止时间）"""
+        if self.expires is None:
+            self.expires = time.monotonic() + self.seconds
+
+    def remaining(self):
+        if self.expires is None:
+            return self.seconds
+        return self.expires - time.monotonic()
+
+    def check(self):
+        if self.remaining() <= 0:
+            raise DeadlineExceeded(f"超过调用截止时间（{self.seconds:.0f}秒）")
+
+    def timeout(self):
+        """返回requests使用的(连接超时, 读取超时)，读取超时不超过剩余时间"""
+        self.check()
+        remaining = self.remaining()
+        return min(self.connect_timeout, remaining), remaining
+
+    def guard(self, chunks):
+        """逐块读取时检查截止时间，服务端持续缓慢发送时也能按时结束"""
+        for chunk in chunks:
+            self.check()
+            yield chunk
+
+
+def size_key(data):
+    """请求体中决定生成耗时的尺寸参数"""
+    return str(data.get("size") or data.get("resolution_boundary") or "")
+
+
+class DeadlineEstimator:
+    """按(模型, 尺寸)的历史延迟估算截止时间
+
+    Args:
+        default: 样本不足时的截止秒数
+        minimum: 截止时间下限
+        maximum: 截止时间上限
+        factor: p99延迟的倍数
+        quantile: 参考的延迟分位数
+        min_samples: 至少有这么多成功样本才使用估算值
+        connect_timeout: 连接超时秒数
+    """
+
+    def __init__(self, default=120.0, minimum=20.0, maximum=600.0, factor=3.0,
+                 quantile=0.99, min_samples=10, connect_timeout=10.0):
+        self.default = default
+        self.minimum = minimum
+        self.maximum = maximum
+        self.factor = factor
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.connect_timeout = connect_timeout
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, model, size, seconds):
+        """记录一次成功调用的耗时"""
+        with self._lock:
+            histogram = self._histograms.get((model, size))
+            if histogram is None:
+                histogram = self._histograms[(model, size)] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def estimate(self, model, size):
+        """返回(截止秒数, 说明)"""
+        with self._lock:
+            histogram = self._histograms.get((model, size))
+            if histogram is None or histogram.total < self.min_samples:
+                return self.default, "默认值"
+            latency = histogram.quantile(self.quantile)
+        seconds = min(self.maximum, max(self.minimum, latency * self.factor))
+        return seconds, f"p{self.quantile * 100:.0f}={latency:.1f}s×{self.factor:g}"
+
+    def deadline(self, model, size, override=0, started=True):
+        """创建一次调用的Deadline，override>0时使用节点指定的秒数，返回(Deadline, 说明)"""
+        if override and override > 0:
+            seconds, source = float(override), "节点指定"
+        else:
+            seconds, source = self.estimate(model, size)
+        return Deadline(seconds, min(self.connect_timeout, seconds), started), source
+
+    def stats(self):
+        with self._lock:
+            keys = list(self._histograms)
+        return {f"{model}|{size}": {"deadline": round(self.estimate(model, size)[0], 1)}
+                for model, size in keys}
+
+
+_estimator = None
+_estimator_lock = threading.Lock()
+
+
+def get_deadline_estimator():
+    """返回进程级共享的截止时间估算器（首次调用时按配置创建）"""
+    global _estimator
+    if _estimator is None:
+        with _estimator_lock:
+            if _estimator is None:
+                _estimator = DeadlineEstimator(
+                    default=get_setting("SSY_DEADLINE_DEFAULT", 120.0),
+                    minimum=get_setting("SSY_DEADLINE_MIN", 20.0),
+                    maximum=get_setting("SSY_DEADLINE_MAX", 600.0),
+                    factor=get_setting("SSY_DEADLINE_FACTOR", 3.0),
+                    quantile=get_setting("SSY_DEADLINE_QUANTILE", 0.99),
+                    min_samples=get_setting("SSY_DEADLINE_MIN_SAMPLES", 10),
+                    connect_timeout=get_setting("SSY_CONNECT_TIMEOUT", 10.0),
+                )
+    return _estimator
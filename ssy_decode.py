@@ -0,0 +1,210 @@
+"""响应解码
+
+各种响应格式只负责从JSON中提取图像来源（base64字符串或URL），
+统一的解码流程负责把所有图像直接写入一个预分配的[N,H,W,3] float32张量：
+
+    base64/URL -> 字节 -> PIL(只读文件头) -> uint8视图 -> 写入输出张量 -> 原地除以255
+
+不再为每张图生成float64/float32中间数组，也不需要事后torch.cat。
+由ssy_response流式解析的响应中，base64字段已经是解码好的StreamedImage，直接打开其缓冲区。
+"""
+import base64
+from io import BytesIO
+
+import numpy as np
+import torch
+from PIL import Image
+
+from .ssy_response import StreamedImage
+from .ssy_convert import dequantize_into
+
+# 按注册顺序探测，第一个匹配的格式生效
+RESPONSE_FORMATS = []
+# 按名称索引，模型注册表声明了响应格式时直接使用
+_FORMATS_BY_NAME = {}
+
+
+def register_format(name, label):
+    """注册响应格式
+
+    被装饰的函数接收解析后的响应dict，不匹配时返回None，
+    匹配时返回来源列表[(kind, value)]，kind为"b64"或"url"，
+    "b64"的value可以是base64字符串或流式解码得到的StreamedImage。
+    """
+    def decorator(fn):
+        RESPONSE_FORMATS.append((name, label, fn))
+        _FORMATS_BY_NAME[name] = (label, fn)
+        return fn
+    return decorator
+
+
+@register_format("gemini", "Gemini")
+def _gemini_sources(result):
+    if "candidates" not in result:
+        return None
+    sources = []
+    for candidate in result["candidates"]:
+        if "content" in candidate and "parts" in candidate["content"]:
+            for part in candidate["content"]["parts"]:
+                if "inlineData" in part and "data" in part["inlineData"]:
+                    sources.append(("b64", part["inlineData"]["data"]))
+    return sources
+
+
+@register_format("data_list", "OpenAI/Doubao")
+def _data_list_sources(result):
+    if not ("data" in result and isinstance(result["data"], list)):
+        return None
+    sources = []
+    for item in result["data"]:
+        if "b64_json" in item:
+            sources.append(("b64", item["b64_json"]))
+        elif "url" in item:
+            sources.append(("url", item["url"]))
+    return sources
+
+
+@register_format("volcengine", "火山引擎")
+def _volcengine_sources(result):
+    if not ("data" in result and isinstance(result["data"], dict)):
+        return None
+    data_obj = result["data"]
+    if data_obj.get("binary_data_base64"):
+        return [("b64", b64_str) for b64_str in data_obj["binary_data_base64"]]
+    if data_obj.get("image_urls"):
+        return [("url", url) for url in data_obj["image_urls"]]
+    return []
+
+
+@register_format("image", "image字段")
+def _image_sources(result):
+    if "image" not in result:
+        return None
+    if isinstance(result["image"], str):
+        return [("b64", result["image"])]
+    return []
+
+
+@register_format("results", "results数组")
+def _results_sources(result):
+    if not ("results" in result and isinstance(result["results"], list)):
+        return None
+    sources = []
+    for item in result["results"]:
+        if "image" in item:
+            sources.append(("b64", item["image"]))
+        elif "url" in item:
+            sources.append(("url", item["url"]))
+    return sources
+
+
+def find_sources(result, response_format=None):
+    """返回(格式标签, 来源列表)，没有匹配的格式时返回(None, [])
+
+    指定response_format时直接使用该格式，不匹配（例如错误响应）时才按注册顺序探测。
+    """
+    if response_format is not None:
+        label, extract = _FORMATS_BY_NAME[response_format]
+        sources = extract(result)
+        if sources is not None:
+            return label, sources
+    for _, label, extract in RESPONSE_FORMATS:
+        sources = extract(result)
+        if sources is not None:
+            return label, sources
+    return None, []
+
+
+def _open_inline(value):
+    """打开内联图像，Image.open只读取文件头，像素在decode_into中写入时才解码"""
+    if isinstance(value, StreamedImage):
+        if value.error is not None:
+            raise value.error
+        value.buffer.seek(0)
+        return Image.open(value.buffer)
+    return Image.open(BytesIO(base64.b64decode(value)))
+
+
+def decode_into(images, mode="RGB"):
+    """把已打开（尚未解码像素）的PIL图像逐张写入一个预分配的[N,H,W,C] float32张量
+
+    像素在写入时才解码，同一时刻只存在一张图像的uint8数据。
+    尺寸与第一张不同的图像缩放到第一张的尺寸。
+
+    Returns:
+        (张量, 是否发生缩放, [(序号, 异常)])，解码失败的图像不出现在输出中
+    """
+    width, height = images[0].size
+    channels = len(mode)
+    out = torch.empty((len(images), height, width, channels), dtype=torch.float32)
+    resized = False
+    failed = []
+    for i, img in enumerate(images):
+        images[i] = None
+        try:
+            if img.mode != mode:
+                img = img.convert(mode)
+            if img.size != (width, height):
+                img = img.resize((width, height), Image.LANCZOS)
+                resized = True
+            # 写入时完成uint8->float32转换，不产生float中间数组
+            dequantize_into(out[i], np.asarray(img))
+        except Exception as e:
+            failed.append((i, e))
+    if failed:
+        keep = [i for i in range(out.shape[0]) if i not in {index for index, _ in failed}]
+        out = out[keep]
+    out.div_(255.0)
+    return out, resized, failed
+
+
+def decode_response(result, fetch_images=None, mode="RGB", on_decode=None, response_format=None):
+    """解析响应中的全部图像
+
+    Args:
+        result: 解析后的响应JSON
+        fetch_images: 批量下载URL的函数，[url] -> [(已解码的PIL图像, 字节数) 或 异常]，
+            所有URL一次性交给它并发下载
+        mode: 输出的PIL模式
+        on_decode: 开始写入输出张量前的回调，用于上报进度
+        response_format: 模型注册表声明的响应格式名，None时按注册顺序探测
+
+    Returns:
+        (图像张量或None, 日志, 下载字节数)
+    """
+    label, sources = find_sources(result, response_format)
+    if label is None:
+        return None, "", 0
+
+    log = f"使用{label}响应格式\n"
+    downloaded = 0
+    urls = [value for kind, value in sources if kind == "url"]
+    fetched = iter(fetch_images(urls) if urls else [])
+    opened = []
+    for kind, value in sources:
+        try:
+            if kind == "url":
+                item = next(fetched)
+                if isinstance(item, Exception):
+                    raise item
+                img, size = item
+                downloaded += size
+            else:
+                img = _open_inline(value)
+            opened.append(img)
+        except Exception as e:
+            log += f"解析{label}图像失败: {str(e)}\n"
+
+    if not opened:
+        return None, log, downloaded
+
+    if on_decode is not None:
+        on_decode()
+    images, resized, failed = decode_into(opened, mode)
+    for _, e in failed:
+        log += f"解析{label}图像失败: {str(e)}\n"
+    if resized:
+        log += f"注意: 部分图像尺寸不一致，已缩放到{images.shape[2]}x{images.shape[1]}\n"
+    if images.shape[0] == 0:
+        return None, log, downloaded
+    return images, log, downloaded
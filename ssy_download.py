@@ -0,0 +1,181 @@
+"""结果图像URL的并发下载
+
+多个URL在有上限的线程池中同时下载，总耗时接近最慢的单个下载：
+- 每个下载线程把响应流式读入线程自有、可复用的缓冲区，不再为每张图分配完整的.content
+- 读取不完整（连接中断、字节数少于Content-Length）时重试，服务端支持Range时从断点续传
+- 字节到齐后立即在下载线程中解码，与其它仍在下载的图像重叠进行
+- 传入调用的Deadline时，连接/读取超时和重试都受同一个截止时间约束
+"""
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from urllib3.exceptions import HTTPError as URLLibError
+from PIL import Image
+
+from .ssy_config import get_setting
+
+CHUNK_SIZE = 256 * 1024
+
+_local = threading.local()
+
+
+class IncompleteRead(IOError):
+    """收到的字节数少于Content-Length"""
+
+
+class _BufferReader(io.RawIOBase):
+    """基于memoryview的只读文件对象，Image.open读取时不复制整个缓冲区"""
+
+    def __init__(self, view):
+        self._view = view
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = min(len(b), len(self._view) - self._pos)
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+
+def _thread_buffer(size):
+    """返回当前线程的可复用缓冲区，容量不足时换成更大的缓冲区"""
+    buf = getattr(_local, "buffer", None)
+    if buf is None or len(buf) < size:
+        buf = bytearray(max(size, CHUNK_SIZE))
+        _local.buffer = buf
+    return buf
+
+
+def _grow(buf, size, keep):
+    """确保缓冲区容量不小于size，保留前keep个字节"""
+    if size <= len(buf):
+        return buf
+    new_buf = _thread_buffer(size)
+    new_buf[:keep] = memoryview(buf)[:keep]
+    return new_buf
+
+
+def _read_into(response, buf, pos, deadline=None):
+    """把响应体从pos开始读入buf，返回(缓冲区, 结束位置)"""
+    raw = getattr(response, "raw", None)
+    if raw is not None and hasattr(raw, "readinto"):
+        while True:
+            if deadline is not None:
+                deadline.check()
+            if pos + CHUNK_SIZE > len(buf):
+                buf = _grow(buf, max(pos + CHUNK_SIZE, len(buf) * 2), pos)
+            n = raw.readinto(memoryview(buf)[pos:pos + CHUNK_SIZE])
+            if not n:
+                return buf, pos
+            pos += n
+
+    chunks = response.iter_content(CHUNK_SIZE)
+    if deadline is not None:
+        chunks = deadline.guard(chunks)
+    for chunk in chunks:
+        end = pos + len(chunk)
+        if end > len(buf):
+            buf = _grow(buf, max(end, len(buf) * 2), pos)
+        buf[pos:end] = chunk
+        pos = end
+    return buf, pos
+
+
+def download_image(transport, url, timeout=30, retries=2, deadline=None):
+    """流式下载并立即解码一张图像，返回(已解码的PIL图像, 下载字节数)
+
+    deadline不为None时忽略timeout，每次尝试按剩余时间设置超时，过期后不再重试。
+    """
+    pos = 0
+    expected = None
+    buf = _thread_buffer(CHUNK_SIZE)
+    for attempt in range(retries + 1):
+        headers = {"Accept-Encoding": "identity"}
+        if pos:
+            headers["Range"] = f"bytes={pos}-"
+        try:
+            request_timeout = deadline.timeout() if deadline is not None else timeout
+            response = transport.get(url, headers=headers, stream=True, timeout=request_timeout)
+            try:
+                response.raise_for_status()
+                if pos and response.status_code != 206:
+                    # 服务端不支持断点续传，从头开始
+                    pos = 0
+                length = response.headers.get("Content-Length")
+                expected = pos + int(length) if length else None
+                if expected:
+                    buf = _grow(buf, expected, pos)
+                buf, pos = _read_into(response, buf, pos, deadline)
+            finally:
+                response.close()
+            if expected is not None and pos < expected:
+                raise IncompleteRead(f"只收到 {pos}/{expected} 字节")
+            break
+        except (IncompleteRead, URLLibError, requests.exceptions.ChunkedEncodingError,
+                requests.exceptions.ConnectionError):
+            if attempt == retries:
+                raise
+
+    img = Image.open(_BufferReader(memoryview(buf)[:pos]))
+    img.load()
+    return img, pos
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=get_setting("SSY_DOWNLOAD_WORKERS", 8),
+                                               thread_name_prefix="ssy-download")
+    return _executor
+
+
+def fetch_images(transport, urls, timeout=30, deadline=None):
+    """并发下载多个URL，按输入顺序返回[(PIL图像, 字节数) 或 异常]
+
+    deadline为所属API调用的Deadline，所有下载共享同一个截止时间。
+    """
+    if not urls:
+        return []
+    retries = get_setting("SSY_DOWNLOAD_RETRIES", 2)
+    if len(urls) == 1:
+        # 单个URL直接在当前线程下载
+        try:
+            return [download_image(transport, urls[0], timeout, retries, deadline)]
+        except Exception as e:
+            return [e]
+
+    executor = _get_executor()
+    futures = [executor.submit(download_image, transport, url, timeout, retries, deadline)
+               for url in urls]
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            results.append(e)
+    return results
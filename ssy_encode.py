@@ -0,0 +1,261 @@
+"""输入图像编码
+
+参考图上传前的编码：
+- 可选格式：快速压缩PNG、无损WebP、高质量JPEG
+- 超过模型有效输入分辨率的参考图先按比例缩小再编码（模型反正会缩小），上传体积和编码耗时随之下降
+- 每个线程复用自己的BytesIO
+- 多张参考图在线程池中并行编码（PIL编码时释放GIL）
+- 编码结果按张量身份缓存（所属张量对象及其版本号），参考图不变、只改提示词时无需重新编码
+- 只保存编码后的原始字节（EncodedImage），base64在发送请求体时分块生成
+"""
+import base64
+import hashlib
+import weakref
+import itertools
+import threading
+from io import BytesIO
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from .ssy_config import get_setting
+
+# 格式 -> (PIL格式, MIME类型, 保存参数)
+UPLOAD_FORMATS = {
+    "png": ("PNG", "image/png", {"compress_level": 1}),
+    "webp": ("WEBP", "image/webp", {"lossless": True, "quality": 0, "method": 0}),
+    "jpeg": ("JPEG", "image/jpeg", {"quality": 95, "subsampling": 0}),
+}
+
+# 预缩放使用的重采样滤镜
+RESIZE_FILTERS = {
+    "lanczos": Image.LANCZOS,
+    "bicubic": Image.BICUBIC,
+    "bilinear": Image.BILINEAR,
+    "box": Image.BOX,
+}
+
+_local = threading.local()
+
+
+class EncodedImage:
+    """编码后的图像字节
+
+    放进请求体中代替base64字符串，由ssy_body在序列化时分块输出base64，
+    data_uri为True时输出"data:<mime>;base64,..."格式。
+    """
+
+    __slots__ = ("data", "mime", "data_uri")
+
+    def __init__(self, data, mime, data_uri=False):
+        self.data = data
+        self.mime = mime
+        self.data_uri = data_uri
+
+    @property
+    def prefix(self):
+        return f"data:{self.mime};base64," if self.data_uri else ""
+
+    def as_data_uri(self):
+        return EncodedImage(self.data, self.mime, data_uri=True)
+
+    def base64_length(self):
+        """序列化后的字符数（不含引号）"""
+        return len(self.prefix) + (len(self.data) + 2) // 3 * 4
+
+    def iter_base64(self, chunk_size=3 * 64 * 1024):
+        """分块输出base64（ASCII字节），块大小为3的倍数以保证拼接结果正确"""
+        if self.data_uri:
+            yield self.prefix.encode("ascii")
+        with memoryview(self.data) as view:
+            for start in range(0, len(view), chunk_size):
+                yield base64.b64encode(view[start:start + chunk_size])
+
+    def __str__(self):
+        return self.prefix + base64.b64encode(self.data).decode("ascii")
+
+
+def _thread_buffer():
+    buf = getattr(_local, "buffer", None)
+    if buf is None:
+        buf = _local.buffer = BytesIO()
+    buf.seek(0)
+    return buf
+
+
+def encode_pil(pil_image, upload_format="png"):
+    """把PIL图像编码为EncodedImage"""
+    pil_format, mime, params = UPLOAD_FORMATS[upload_format]
+    if pil_format == "JPEG" and pil_image.mode not in ("RGB", "L"):
+        pil_image = pil_image.convert("RGB")
+    buf = _thread_buffer()
+    pil_image.save(buf, format=pil_format, **params)
+    size = buf.tell()
+    with buf.getbuffer() as view, view[:size] as payload:
+        data = bytes(payload)
+    return EncodedImage(data, mime)
+
+
+def fit_size(width, height, max_side):
+    """长边不超过max_side的等比尺寸，无需缩小时原样返回"""
+    if not max_side or max(width, height) <= max_side:
+        return width, height
+    scale = max_side / max(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def fit_within(pil_image, max_side, resample="lanczos"):
+    """把PIL图像等比缩小到长边不超过max_side"""
+    size = fit_size(pil_image.width, pil_image.height, max_side)
+    if size == pil_image.size:
+        return pil_image
+    return pil_image.resize(size, RESIZE_FILTERS[resample])
+
+
+# id(张量对象) -> (弱引用, 身份编号)；对象被回收时由弱引用回调移除，编号不会被新对象复用
+_identities = {}
+_identity_counter = itertools.count()
+_identity_lock = threading.Lock()
+
+
+def _identity(root):
+    """张量对象的身份编号，不支持弱引用时返回None"""
+    key = id(root)
+    with _identity_lock:
+        entry = _identities.get(key)
+        if entry is not None and entry[0]() is root:
+            return entry[1]
+
+        def forget(ref):
+            with _identity_lock:
+                if _identities.get(key, (None,))[0] is ref:
+                    del _identities[key]
+
+        try:
+            ref = weakref.ref(root, forget)
+        except TypeError:
+            return None
+        token = next(_identity_counter)
+        _identities[key] = (ref, token)
+        return token
+
+
+def tensor_fingerprint(tensor):
+    """张量的缓存键，内容不变时相同、内容可能变化时一定不同
+
+    视图（如split_frames拆出的单帧）归到它所属的张量对象上：由该对象的身份编号、偏移、形状、步长、
+    dtype和版本号（原地修改会递增，视图与原张量共用）组成。对象被回收后编号作废，
+    新张量即使复用了同一块内存也不会命中旧的编码结果。无法确认身份时对完整数据做哈希。
+    """
+    root = tensor._base if tensor._base is not None else tensor
+    token = _identity(root)
+    layout = (tuple(tensor.shape), tuple(tensor.stride()), str(tensor.dtype), str(tensor.device))
+    if token is not None:
+        return ("id", token, tensor.storage_offset()) + layout + (tensor._version,)
+    data = tensor.detach().contiguous().cpu().numpy().tobytes()
+    return ("hash", hashlib.blake2b(data, digest_size=16).hexdigest()) + layout
+
+
+class EncodeCache:
+    """编码结果的LRU缓存，按编码后字节数限制内存占用"""
+
+    def __init__(self, max_bytes=128 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._used = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = len(value.data)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = value
+            self._used += size
+            while self._used > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._used -= len(evicted.data)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "entries": len(self._entries), "bytes": self._used}
+
+
+_encode_cache = None
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_encode_cache():
+    """返回进程级共享的编码缓存"""
+    global _encode_cache
+    if _encode_cache is None:
+        with _executor_lock:
+            if _encode_cache is None:
+                _encode_cache = EncodeCache(get_setting("SSY_ENCODE_CACHE_MB", 128) * 1024 * 1024)
+    return _encode_cache
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=get_setting("SSY_ENCODE_WORKERS", 4),
+                                               thread_name_prefix="ssy-encode")
+    return _executor
+
+
+def encode_all(to_pil, tensors, upload_format="png", use_cache=True, max_side=None, resample="lanczos"):
+    """并行编码多张图像
+
+    Args:
+        to_pil: 张量 -> PIL图像的转换函数
+        tensors: 单帧图像张量列表
+        upload_format: UPLOAD_FORMATS中的格式名
+        use_cache: 是否使用编码缓存
+        max_side: 编码前把长边缩小到不超过该值，None表示不缩放
+        resample: RESIZE_FILTERS中的滤镜名
+
+    Returns:
+        ([EncodedImage]按输入顺序, 缓存命中数)
+    """
+    cache = get_encode_cache() if use_cache else None
+    results = [None] * len(tensors)
+    keys = [None] * len(tensors)
+    pending = []
+    for i, tensor in enumerate(tensors):
+        if cache is not None:
+            keys[i] = (upload_format, max_side, resample) + tensor_fingerprint(tensor)
+            results[i] = cache.get(keys[i])
+        if results[i] is None:
+            pending.append(i)
+
+    def encode(i):
+        return encode_pil(fit_within(to_pil(tensors[i]), max_side, resample), upload_format)
+
+    if len(pending) <= 1:
+        encoded = [encode(i) for i in pending]
+    else:
+        encoded = list(_get_executor().map(encode, pending))
+    for i, value in zip(pending, encoded):
+        results[i] = value
+        if cache is not None:
+            cache.put(keys[i], value)
+    return results, len(tensors) - len(pending)
@@ -0,0 +1,310 @@
+"""全局请求引擎
+
+所有节点的API调用都提交到同一个后台asyncio事件循环：
+- 每个模型一个令牌桶限速，避免超过路由配额触发429
+- 全局限制同时在途的请求数
+- 优先级类别（interactive / normal / bulk）之间按权重公平排队（WFQ），
+  并为interactive保留若干在途名额，normal和bulk合计只能使用其余容量
+- 队首任务等待超过老化时间的类别优先出队，低优先级不会被饿死
+- 同一类别内按节点轮询出队，一个节点排了大量任务时不会饿死其它节点
+
+节点的同步generate/process方法通过run()提交任务并等待结果。
+"""
+import time
+import asyncio
+import threading
+from collections import deque, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .ssy_config import get_setting
+from .ssy_retry import LatencyHistogram
+
+# 优先级类别，按默认权重从高到低
+PRIORITIES = ("interactive", "normal", "bulk")
+DEFAULT_WEIGHTS = {"interactive": 8, "normal": 4, "bulk": 1}
+
+
+class TokenBucket:
+    """令牌桶：平均每秒rate个请求，最多允许burst个突发"""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self):
+        """有令牌时取走一个并返回True，rate<=0表示不限速"""
+        if self.rate <= 0:
+            return True
+        self._refill(time.monotonic())
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+    def wait_time(self):
+        """距离下一个令牌可用还需等待的秒数"""
+        if self.rate <= 0:
+            return 0.0
+        self._refill(time.monotonic())
+        return max(0.0, (1.0 - self.tokens) / self.rate)
+
+
+class _Job:
+    __slots__ = ("fn", "model", "client", "priority", "future", "submitted")
+
+    def __init__(self, fn, model, client, priority):
+        self.fn = fn
+        self.model = model
+        self.client = client
+        self.priority = priority
+        self.future = Future()
+        self.submitted = time.monotonic()
+
+
+class _PriorityClass:
+    """一个优先级类别的队列与统计"""
+
+    def __init__(self, name, weight):
+        self.name = name
+        self.weight = max(1e-3, float(weight))
+        self.queues = OrderedDict()  # client -> deque[_Job]，按插入顺序轮询
+        self.vtime = 0.0             # WFQ虚拟时间，每出队一个任务前进1/weight
+        self.in_flight = 0
+        self.completed = 0
+        self.last_served = 0.0
+        self.waits = LatencyHistogram(min_value=0.001, factor=1.25, buckets=64)
+
+    def queued(self):
+        return sum(len(q) for q in self.queues.values())
+
+    def oldest(self):
+        """队首任务中最早的提交时间，队列为空时返回None"""
+        heads = [q[0].submitted for q in self.queues.values()]
+        return min(heads) if heads else None
+
+
+class RequestEngine:
+    """在后台线程中运行的请求调度器
+
+    Args:
+        max_in_flight: 全局同时在途的最大请求数
+        rate: 每个模型的默认限速（请求/秒），0表示不限速
+        burst: 每个模型的令牌桶容量
+        model_rates: 按模型覆盖限速，{model: rate}或{model: [rate, burst]}
+        weights: 各优先级类别的WFQ权重，{类别: 权重}，未列出的类别使用DEFAULT_WEIGHTS
+        reserved: 为interactive保留的在途名额，normal与bulk合计最多同时占用max_in_flight - reserved个
+        aging: 队首任务等待超过该秒数的类别优先出队，0表示不老化
+    """
+
+    def __init__(self, max_in_flight=8, rate=0.0, burst=1, model_rates=None,
+                 weights=None, reserved=2, aging=30.0):
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.rate = rate
+        self.burst = burst
+        self.model_rates = dict(model_rates or {})
+        weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self._classes = {name: _PriorityClass(name, weights[name]) for name in PRIORITIES}
+        # 至少给非interactive类别留一个名额
+        self.reserved = min(max(0, int(reserved)), self.max_in_flight - 1)
+        self.aging = aging
+        self._vclock = 0.0
+        self._buckets = {}
+        self._in_flight = 0
+        self._completed = 0
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight,
+                                            thread_name_prefix="ssy-engine")
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name="ssy-engine", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._loop.create_task(self._dispatch())
+        self._ready.set()
+        self._loop.run_forever()
+
+    def _bucket(self, model):
+        bucket = self._buckets.get(model)
+        if bucket is None:
+            setting = self.model_rates.get(model, self.rate)
+            if isinstance(setting, (list, tuple)):
+                rate, burst = setting
+            else:
+                rate, burst = setting, self.burst
+            bucket = self._buckets[model] = TokenBucket(rate, burst)
+        return bucket
+
+    def _enqueue(self, job):
+        cls = self._classes[job.priority]
+        if not cls.queues:
+            # 空闲后重新排队的类别从当前虚拟时钟开始，不能用空闲期间积累的额度插队
+            cls.vtime = max(cls.vtime, self._vclock)
+        cls.queues.setdefault(job.client, deque()).append(job)
+        self._wakeup.set()
+
+    def _class_order(self, now):
+        """出队顺序：饥饿的类别按等待时间从长到短，其余按WFQ虚拟时间从小到大
+
+        队首任务已等待aging秒、且该类别aging秒内没有出队过的类别视为饥饿，
+        优先出队一个任务后重新计时，因此老化只保证每个类别至少每aging秒出队一次，不会反过来压住高优先级。
+        """
+        active = [cls for cls in self._classes.values() if cls.queues]
+        if self.aging > 0:
+            overdue = [cls for cls in active if now - max(cls.oldest(), cls.last_served) >= self.aging]
+            if overdue:
+                overdue.sort(key=lambda cls: max(cls.oldest(), cls.last_served))
+                return overdue + sorted((cls for cls in active if cls not in overdue),
+                                        key=lambda cls: cls.vtime)
+        return sorted(active, key=lambda cls: cls.vtime)
+
+    def _next_ready_job(self):
+        """按类别顺序、类别内按节点轮询，取出第一个所属模型有令牌的任务
+
+        normal与bulk合计已占满max_in_flight - reserved个名额时跳过它们，剩余名额只留给interactive。
+        没有可执行任务时返回(None, 等待秒数)，等待秒数为None表示等到有任务入队或完成。
+        """
+        wait = None
+        shared = sum(cls.in_flight for cls in self._classes.values() if cls.name != "interactive")
+        shared_full = shared >= self.max_in_flight - self.reserved
+        for cls in self._class_order(time.monotonic()):
+            if shared_full and cls.name != "interactive":
+                continue
+            for client in list(cls.queues):
+                queue = cls.queues[client]
+                bucket = self._bucket(queue[0].model)
+                if bucket.try_acquire():
+                    job = queue.popleft()
+                    # 被服务的节点移到轮询末尾
+                    del cls.queues[client]
+                    if queue:
+                        cls.queues[client] = queue
+                    self._vclock = max(self._vclock, cls.vtime)
+                    cls.vtime += 1.0 / cls.weight
+                    cls.last_served = time.monotonic()
+                    return job, None
+                delay = bucket.wait_time()
+                wait = delay if wait is None else min(wait, delay)
+        return None, wait
+
+    async def _dispatch(self):
+        while True:
+            await self._slots.acquire()
+            job = None
+            while job is None:
+                job, wait = self._next_ready_job()
+                if job is None:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                    except asyncio.TimeoutError:
+                        pass
+            cls = self._classes[job.priority]
+            cls.waits.observe(time.monotonic() - job.submitted)
+            cls.in_flight += 1
+            self._in_flight += 1
+            self._loop.create_task(self._execute(job))
+
+    async def _execute(self, job):
+        cls = self._classes[job.priority]
+        try:
+            if job.future.set_running_or_notify_cancel():
+                try:
+                    result = await self._loop.run_in_executor(self._executor, job.fn)
+                    job.future.set_result(result)
+                except BaseException as e:
+                    job.future.set_exception(e)
+        finally:
+            cls.in_flight -= 1
+            cls.completed += 1
+            self._in_flight -= 1
+            self._completed += 1
+            self._slots.release()
+            # normal/bulk可能正因名额占满而等待
+            self._wakeup.set()
+
+    def submit(self, fn, model="default", client=None, priority="normal"):
+        """提交一个同步调用，返回concurrent.futures.Future
+
+        priority为PRIORITIES之一，未知的值按normal处理。
+        """
+        job = _Job(fn, model, client, priority if priority in self._classes else "normal")
+        self._loop.call_soon_threadsafe(self._enqueue, job)
+        return job.future
+
+    def run(self, fn, model="default", client=None, priority="normal"):
+        """提交并阻塞等待结果"""
+        return self.submit(fn, model, client, priority).result()
+
+    def stats(self):
+        """队列与在途统计
+
+        队列只由事件循环线程修改，快照也在事件循环中生成，其它线程（如/ssy/status）调用时等待其结果。
+        """
+        if threading.current_thread() is self._thread:
+            return self._snapshot()
+        future = Future()
+
+        def snapshot():
+            try:
+                future.set_result(self._snapshot())
+            except BaseException as e:
+                future.set_exception(e)
+
+        self._loop.call_soon_threadsafe(snapshot)
+        return future.result()
+
+    def _snapshot(self):
+        now = time.monotonic()
+        classes = {}
+        for name, cls in self._classes.items():
+            oldest = cls.oldest()
+            classes[name] = {
+                "weight": cls.weight,
+                "queued": cls.queued(),
+                "in_flight": cls.in_flight,
+                "completed": cls.completed,
+                "oldest_wait": round(now - oldest, 3) if oldest is not None else 0.0,
+                "wait_p50": round(cls.waits.quantile(0.5) or 0.0, 4),
+                "wait_p95": round(cls.waits.quantile(0.95) or 0.0, 4),
+            }
+        return {
+            "in_flight": self._in_flight,
+            "queued": sum(entry["queued"] for entry in classes.values()),
+            "completed": self._completed,
+            "max_in_flight": self.max_in_flight,
+            "reserved": self.reserved,
+            "priorities": classes,
+        }
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """返回进程级共享的请求引擎（首次调用时按配置创建）"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = RequestEngine(
+                    max_in_flight=get_setting("SSY_MAX_IN_FLIGHT", 8),
+                    rate=get_setting("SSY_RATE_LIMIT", 0.0),
+                    burst=get_setting("SSY_RATE_BURST", 1),
+                    model_rates=get_setting("SSY_MODEL_RATE_LIMITS", {}),
+                    weights=get_setting("SSY_PRIORITY_WEIGHTS", {}),
+                    reserved=get_setting("SSY_INTERACTIVE_RESERVED", 2),
+                    aging=get_setting("SSY_PRIORITY_AGING", 30.0),
+                )
+    return _engine
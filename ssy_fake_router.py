@@ -0,0 +1,329 @@
+"""本地模拟的SSY路由服务，用于无网络环境下的验证与基准测试
+
+只依赖标准库和Pillow，可以单独导入:
+
+    with FakeRouter() as router:
+        os.environ["SSY_API_BASE"] = router.api_base
+        ...
+        print(router.stats())
+"""
+import sys
+import json
+import time
+import random
+import base64
+import threading
+from collections import deque, defaultdict
+from io import BytesIO
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image
+
+
+def make_png(width=64, height=64, color=(200, 120, 40), transparent=False, noise=False):
+    """纯色PNG，transparent时为RGBA且左半边完全透明
+
+    noise时为随机像素（几乎不可压缩），响应体积接近真实生成结果的上限。
+    """
+    buf = BytesIO()
+    if noise:
+        img = Image.frombytes("RGB", (width, height), random.Random(0).randbytes(width * height * 3))
+        if transparent:
+            img.putalpha(255)
+    elif transparent:
+        img = Image.new("RGBA", (width, height), color=color + (255,))
+    else:
+        img = Image.new("RGB", (width, height), color=color)
+    if transparent:
+        img.paste((0, 0, 0, 0), (0, 0, width // 2, height))
+    img.save(buf, format="PNG", compress_level=1)
+    return buf.getvalue()
+
+
+class _RouterHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        router = self.server.router
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b""
+        router._record_request(self.path, body)
+
+        if not self.path.startswith("/api/v1/images/"):
+            self._send(404, b'{"error": "not found"}')
+            return
+
+        try:
+            request = json.loads(body)
+        except ValueError:
+            request = {}
+        model = request.get("model", "unknown")
+        key = self.headers.get("Authorization", "")[len("Bearer "):]
+        if key in router.invalid_keys:
+            self._send(401, b'{"error": {"message": "invalid api key", "code": 401}}')
+            return
+        if not router._admit(model, key):
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        fault = router._draw_fault()
+        if fault == "drop":
+            # 不返回任何响应直接断开，客户端看到连接中断
+            self.close_connection = True
+            return
+        if fault == "error":
+            body = json.dumps({"error": {"message": "injected fault", "code": router.error_status}}).encode("utf-8")
+            self.send_response(router.error_status)
+            if router.retry_after is not None:
+                self.send_header("Retry-After", str(router.retry_after))
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        router._enter()
+        try:
+            if router.latency:
+                time.sleep(router.latency)
+            if fault == "slow":
+                time.sleep(router.slow_latency)
+            result = router.build_response(request)
+            self._send(200, json.dumps(result).encode("utf-8"))
+        finally:
+            router._leave()
+
+    def do_GET(self):
+        router = self.server.router
+        router._record_request(self.path, b"")
+        if not self.path.startswith("/files/"):
+            self._send(404, b'{"error": "not found"}')
+            return
+
+        if router.download_latency:
+            time.sleep(router.download_latency)
+        body = router.image_bytes
+        start = 0
+        range_header = self.headers.get("Range", "")
+        if range_header.startswith("bytes="):
+            start = int(range_header[6:].split("-")[0])
+        status = 206 if start else 200
+        self.send_response(status)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(len(body) - start))
+        if start:
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+        self.end_headers()
+        if router._take_truncation():
+            # 只发送一半数据后断开连接，模拟下载中断
+            self.wfile.write(body[start:start + (len(body) - start) // 2])
+            self.close_connection = True
+            return
+        self.wfile.write(body[start:])
+
+
+class _RouterServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def process_request(self, request, client_address):
+        # 每个新TCP连接调用一次，用于统计连接复用情况
+        self.router._record_connection()
+        super().process_request(request, client_address)
+
+    def handle_error(self, request, client_address):
+        # 客户端超时放弃后服务端写回响应会失败，属于预期情况，不打印堆栈
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FakeRouter:
+    """在127.0.0.1上运行的模拟路由
+
+    Args:
+        port: 监听端口，0表示随机分配
+        image_size: 返回图像的(宽, 高)
+        latency: 每个生成请求的模拟服务端耗时（秒）
+        quota: 每个模型（或每个密钥）每秒允许的请求数，超出返回429，0表示不限制
+        quota_by: "model"按模型计配额，"key"按Authorization中的密钥计配额
+        invalid_keys: 返回401的密钥
+        image_noise: 返回随机像素的图像而不是纯色图像，用于按真实体积测试响应处理
+        response_format: 响应形状，可以是下列名称之一，或{模型名: 名称}的字典（未列出的模型用"gemini"）：
+            "gemini"（candidates内联base64）、"data_b64"（data[].b64_json）、"url"（data[].url）、
+            "volcengine"（data.binary_data_base64）、"volcengine_url"（data.image_urls）、
+            "image"（image字段）、"results"（results[].image）、"results_url"（results[].url）；
+            URL形状的图像从/files/下载
+        download_latency: 每个图像下载的模拟耗时（秒）
+        truncate_downloads: 前若干次下载只发送一半数据后断开
+        error_rate: 生成请求返回error_status的概率
+        error_status: 注入错误的HTTP状态码
+        retry_after: 注入错误时附带的Retry-After秒数，None表示不附带
+        drop_rate: 生成请求不响应直接断开连接的概率
+        slow_rate: 生成请求额外耗时slow_latency秒的概率，用于模拟长尾延迟
+        slow_latency: 慢请求的额外耗时（秒）
+        seed: 故障注入的随机种子
+    """
+
+    def __init__(self, port=0, image_size=(64, 64), image_noise=False, latency=0.0, quota=0,
+                 quota_by="model", invalid_keys=(),
+                 response_format="gemini", download_latency=0.0, truncate_downloads=0,
+                 error_rate=0.0, error_status=503, retry_after=None, drop_rate=0.0,
+                 slow_rate=0.0, slow_latency=0.0, seed=None):
+        self.image_bytes = make_png(*image_size, noise=image_noise)
+        self.transparent_bytes = make_png(*image_size, transparent=True, noise=image_noise)
+        self.latency = latency
+        self.quota = quota
+        self.quota_by = quota_by
+        self.invalid_keys = set(invalid_keys)
+        self.response_format = response_format
+        self.download_latency = download_latency
+        self.truncate_downloads = truncate_downloads
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.drop_rate = drop_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.faults = defaultdict(int)
+        self._random = random.Random(seed)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.throttled = 0
+        self.model_counts = defaultdict(int)
+        self._windows = defaultdict(deque)
+        self._lock = threading.Lock()
+        self._server = _RouterServer(("127.0.0.1", port), _RouterHandler)
+        self._server.router = self
+        self._thread = None
+        self.connections = 0
+        self.requests = 0
+        self.paths = []
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_base(self):
+        return f"{self.base_url}/api/v1"
+
+    def _record_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def _record_request(self, path, body):
+        with self._lock:
+            self.requests += 1
+            self.paths.append(path)
+
+    def build_response(self, request):
+        """按response_format构造生成接口的响应"""
+        count = int(request.get("n", 1))
+        shape = self.response_format
+        if isinstance(shape, dict):
+            shape = shape.get(request.get("model"), "gemini")
+        urls = [f"{self.base_url}/files/{i}.png" for i in range(count)]
+        if shape == "url":
+            return {"data": [{"url": url} for url in urls]}
+        if shape == "volcengine_url":
+            return {"data": {"image_urls": urls}}
+        if shape == "results_url":
+            return {"results": [{"url": url} for url in urls]}
+        # 请求透明背景时返回带透明通道的PNG
+        image = self.transparent_bytes if request.get("background") == "transparent" else self.image_bytes
+        b64 = base64.b64encode(image).decode("ascii")
+        if shape == "data_b64":
+            return {"data": [{"b64_json": b64} for _ in range(count)]}
+        if shape == "volcengine":
+            return {"data": {"binary_data_base64": [b64] * count}}
+        if shape == "image":
+            return {"image": b64}
+        if shape == "results":
+            return {"results": [{"image": b64} for _ in range(count)]}
+        parts = [{"inlineData": {"mimeType": "image/png", "data": b64}} for _ in range(count)]
+        return {"candidates": [{"content": {"parts": parts}}]}
+
+    def _take_truncation(self):
+        with self._lock:
+            if self.truncate_downloads > 0:
+                self.truncate_downloads -= 1
+                return True
+            return False
+
+    def _draw_fault(self):
+        """按配置的概率抽取本次请求要注入的故障，None表示正常响应"""
+        with self._lock:
+            roll = self._random.random()
+            for fault, rate in (("error", self.error_rate), ("drop", self.drop_rate),
+                                ("slow", self.slow_rate)):
+                if roll < rate:
+                    self.faults[fault] += 1
+                    return fault
+                roll -= rate
+            return None
+
+    def _admit(self, model, key=""):
+        """按模型（quota_by为"key"时按密钥）的1秒滑动窗口检查配额"""
+        with self._lock:
+            self.model_counts[model] += 1
+            if not self.quota:
+                return True
+            now = time.monotonic()
+            window = self._windows[key if self.quota_by == "key" else model]
+            while window and now - window[0] >= 1.0:
+                window.popleft()
+            if len(window) >= self.quota:
+                self.throttled += 1
+                return False
+            window.append(now)
+            return True
+
+    def _enter(self):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def _leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "connections": self.connections,
+                "requests": self.requests,
+                "max_in_flight": self.max_in_flight,
+                "throttled": self.throttled,
+                "models": dict(self.model_counts),
+                "faults": dict(self.faults),
+            }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,294 @@
+"""离线批量任务：在ComfyUI之外按JSONL任务文件批量调用SSY API
+
+任务文件每行一个JSON对象，两种写法：
+
+- 节点参数：{"id": "sku-001", "model": "google/gemini-3-pro-image-preview", "prompt": "...",
+  "images": ["ref.png"], "size": "2K"}，除id/model/prompt/images外的键作为模型参数，
+  由对应节点的build_requests构建请求体，与节点发出的请求完全一致
+- 原始请求体：{"id": "sku-002", "data": {...}, "endpoint": "generations"}，原样发送
+
+结果图像一完成就写入输出目录，每个完成的任务追加一行到检查点文件；
+中断后用相同参数重新运行会跳过已成功的任务，失败的任务会重新执行。
+
+命令行入口见run_jobs.py：
+
+    python run_jobs.py jobs.jsonl -o output/ --concurrency 16
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from PIL import Image
+
+from .nano_banana import NODE_CLASS_MAPPINGS, SSYAPIBase
+from .ssy_models import require_model
+from .ssy_convert import pil_to_tensor, batch_to_pil
+from .ssy_retry import get_latency_tracker
+from .ssy_metrics import SPANS, SPAN_LABELS, get_metrics
+from .ssy_engine import PRIORITIES
+
+CHECKPOINT_NAME = "checkpoint.jsonl"
+# 节点参数写法中不作为模型参数的键
+JOB_KEYS = {"id", "model", "prompt", "images"}
+SAVE_FORMATS = {"png": ("PNG", {"compress_level": 4}), "jpeg": ("JPEG", {"quality": 95}),
+                "webp": ("WEBP", {"lossless": True})}
+
+
+def node_for_model(model):
+    """返回该模型所属系列的节点类（按模型注册表）"""
+    family = require_model(model).family
+    for node_class in NODE_CLASS_MAPPINGS.values():
+        if getattr(node_class, "FAMILY", None) == family:
+            return node_class
+    raise ValueError(f"没有支持{model}的节点")
+
+
+def load_image(path):
+    """把图片文件读成[1,H,W,3]的IMAGE张量"""
+    with Image.open(path) as img:
+        return pil_to_tensor(img)
+
+
+def job_id(job, line_no):
+    """任务id（用作输出文件名），未指定时使用行号"""
+    raw = str(job.get("id") or f"{line_no:06d}")
+    return re.sub(r"[^\w.-]", "_", raw)
+
+
+def read_jobs(path):
+    """逐行读取任务文件，产出(行号, 任务dict或None, 解析错误)，空行和#注释行跳过"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                yield line_no, json.loads(line), None
+            except ValueError as e:
+                yield line_no, None, f"JSON解析失败: {e}"
+
+
+def read_checkpoint(path):
+    """返回检查点中已成功的{(行号, 任务id)}"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # 中断时可能留下半行
+                continue
+            if record.get("status") == "ok":
+                done.add((record["line"], record["id"]))
+    return done
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class JobRunner:
+    """按任务文件并发执行请求、写出结果并记录检查点
+
+    Args:
+        output_dir: 输出目录（图像和检查点）
+        concurrency: 同时执行的任务数
+        options: 传给call_ssy_api的调用选项（use_cache、coalesce、priority、deadline、upload_format）
+        save_format: 输出图像格式，见SAVE_FORMATS
+        api_key: API密钥（可以是逗号分隔的多个），为空时使用SSY_API_KEYS/SSY_API_KEY配置的密钥池
+    """
+
+    def __init__(self, output_dir, concurrency=8, options=None, save_format="png", api_key=""):
+        self.output_dir = output_dir
+        self.concurrency = max(1, concurrency)
+        self.options = options or {}
+        self.save_format = save_format
+        self.client = SSYAPIBase()
+        if api_key:
+            self.client.api_key = api_key
+        self.checkpoint_path = os.path.join(output_dir, CHECKPOINT_NAME)
+        self._checkpoint_lock = threading.Lock()
+        self._nodes = {}
+        self.latencies = []
+        self.counts = {"ok": 0, "failed": 0, "skipped": 0, "images": 0}
+
+    def build(self, job):
+        """把一行任务转成[(data, endpoint)]"""
+        if "data" in job:
+            return [(job["data"], job.get("endpoint", "generations"))]
+        model = job["model"]
+        node_class = node_for_model(model)
+        node = self._nodes.get(node_class)
+        if node is None:
+            node = self._nodes[node_class] = node_class()
+        params = {key: value for key, value in job.items() if key not in JOB_KEYS}
+        input_images = [load_image(path) for path in job.get("images", [])]
+        request_list, _ = node.build_requests(
+            model, job.get("prompt", ""), input_images, False,
+            self.options.get("upload_format", "png"), **params)
+        return request_list
+
+    def run_job(self, line_no, job, error=None):
+        """执行一个任务并写出结果，返回检查点记录"""
+        started = time.monotonic()
+        record = {"line": line_no, "id": job_id(job or {}, line_no)}
+        files = []
+        try:
+            if error:
+                raise ValueError(error)
+            for data, endpoint in self.build(job):
+                options = self.options
+                if data.get("background") == "transparent":
+                    # 透明背景的结果按RGBA解码，保存时保留透明通道
+                    options = dict(options, decode_mode="RGBA")
+                images, log = self.client.call_ssy_api(data, endpoint, options=options)
+                if images is None:
+                    # 优先报告具体的错误行，其次是日志最后一行
+                    lines = [line for line in log.splitlines() if line.strip()]
+                    errors = [line for line in lines if "错误" in line]
+                    raise RuntimeError((errors or lines or ["请求失败"])[-1])
+                files += self.save(record["id"], images, len(files))
+            record.update(status="ok", files=files)
+        except Exception as e:
+            record.update(status="failed", error=str(e)[:500], files=files)
+        record["seconds"] = round(time.monotonic() - started, 3)
+        self.write_checkpoint(record)
+        return record
+
+    def save(self, name, images, offset=0):
+        """把[N,H,W,3]张量逐张写入输出目录，返回文件名列表"""
+        fmt, kwargs = SAVE_FORMATS[self.save_format]
+        frames = batch_to_pil(images)
+        files = []
+        for i, frame in enumerate(frames, offset):
+            filename = f"{name}.{self.save_format}" if i == 0 and len(frames) == 1 \
+                else f"{name}_{i}.{self.save_format}"
+            if fmt == "JPEG" and frame.mode == "RGBA":
+                frame = frame.convert("RGB")
+            frame.save(os.path.join(self.output_dir, filename), fmt, **kwargs)
+            files.append(filename)
+        return files
+
+    def write_checkpoint(self, record):
+        with self._checkpoint_lock:
+            with open(self.checkpoint_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+
+    def run(self, jobs_path, report_every=10.0, out=sys.stderr):
+        """执行任务文件，返回统计字典；Ctrl-C时停止提交新任务，等在途任务写完检查点后返回"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        done = read_checkpoint(self.checkpoint_path)
+        started = last_report = time.monotonic()
+        pending = set()
+        interrupted = False
+
+        def collect(futures):
+            for future in futures:
+                record = future.result()
+                if record["status"] == "ok":
+                    self.counts["ok"] += 1
+                    self.counts["images"] += len(record["files"])
+                    self.latencies.append(record["seconds"])
+                else:
+                    self.counts["failed"] += 1
+                    print(f"✗ 第{record['line']}行 {record['id']}: {record['error']}", file=out)
+
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix="ssy-job") as pool:
+            try:
+                for line_no, job, error in read_jobs(jobs_path):
+                    if job is not None and (line_no, job_id(job, line_no)) in done:
+                        self.counts["skipped"] += 1
+                        continue
+                    # 在途任务数不超过并发数，任务文件按需读取，不会一次性载入内存
+                    while len(pending) >= self.concurrency:
+                        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(finished)
+                    pending.add(pool.submit(self.run_job, line_no, job, error))
+                    if time.monotonic() - last_report >= report_every:
+                        last_report = time.monotonic()
+                        print(self.progress_line(started), file=out)
+            except KeyboardInterrupt:
+                interrupted = True
+                print(f"中断: 等待{len(pending)}个在途任务完成后退出", file=out)
+            collect(wait(pending)[0])
+
+        stats = self.stats(started)
+        stats["interrupted"] = interrupted
+        return stats
+
+    def progress_line(self, started):
+        elapsed = time.monotonic() - started
+        finished = self.counts["ok"] + self.counts["failed"]
+        return (f"进度: 成功{self.counts['ok']} 失败{self.counts['failed']} 跳过{self.counts['skipped']}，"
+                f"{finished / max(elapsed, 1e-9):.2f} 任务/秒")
+
+    def stats(self, started):
+        elapsed = time.monotonic() - started
+        finished = self.counts["ok"] + self.counts["failed"]
+        stats = dict(self.counts, elapsed=round(elapsed, 2),
+                     jobs_per_second=round(finished / max(elapsed, 1e-9), 3),
+                     images_per_second=round(self.counts["images"] / max(elapsed, 1e-9), 3),
+                     retry=get_latency_tracker().stats(), metrics=get_metrics().snapshot())
+        if self.latencies:
+            stats["latency"] = {name: round(percentile(self.latencies, q), 3)
+                                for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99), ("max", 1.0))}
+        return stats
+
+
+def format_stats(stats):
+    """把统计字典格式化成结束时打印的摘要"""
+    lines = [
+        f"任务: 成功{stats['ok']} 失败{stats['failed']} 跳过{stats['skipped']}（检查点中已完成）",
+        f"耗时: {stats['elapsed']:.1f}秒，吞吐 {stats['jobs_per_second']:.2f} 任务/秒，"
+        f"{stats['images_per_second']:.2f} 图像/秒（共{stats['images']}张）",
+    ]
+    if "latency" in stats:
+        latency = stats["latency"]
+        lines.append(f"单任务延迟: p50 {latency['p50']:.2f}s  p95 {latency['p95']:.2f}s  "
+                     f"p99 {latency['p99']:.2f}s  最大 {latency['max']:.2f}s")
+    for key, entry in sorted(stats.get("metrics", {}).items()):
+        spans = entry["spans"]
+        parts = [f"{SPAN_LABELS[name]}{spans[name]['mean']:.2f}s" for name in SPANS if name in spans]
+        if parts:
+            lines.append(f"阶段耗时（均值）{key}: {' '.join(parts)}")
+    retry = stats["retry"]
+    lines.append(f"重试 {retry['retries']}次，放弃 {retry['gave_up']}次，对冲 {retry['hedges']}次")
+    if stats.get("interrupted"):
+        lines.append("运行被中断：用相同参数重新运行即可从检查点继续")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="按JSONL任务文件批量调用SSY API，结果写入输出目录")
+    parser.add_argument("jobs", help="任务文件（JSONL，每行一个任务）")
+    parser.add_argument("-o", "--output", default="ssy_output", help="输出目录，检查点也写在这里")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="同时执行的任务数")
+    parser.add_argument("--format", choices=sorted(SAVE_FORMATS), default="png", help="输出图像格式")
+    parser.add_argument("--upload-format", default="png", help="参考图上传编码（png/webp/jpeg）")
+    parser.add_argument("--deadline", type=int, default=0, help="单次调用截止秒数，0为自动估算")
+    parser.add_argument("--use-cache", action="store_true", help="启用结果缓存")
+    parser.add_argument("--priority", choices=PRIORITIES, default="bulk",
+                        help="请求排队优先级（默认bulk，只使用交互保留之外的并发，排队权重最低）")
+    parser.add_argument("--coalesce", action="store_true", help="同时进行的相同请求合并为一次调用（默认每行各自生成）")
+    parser.add_argument("--api-key", default="", help="API密钥（多个用逗号分隔），默认读取SSY_API_KEYS/SSY_API_KEY或config.json")
+    parser.add_argument("--report-every", type=float, default=10.0, help="进度输出间隔（秒）")
+    args = parser.parse_args(argv)
+
+    runner = JobRunner(args.output, args.concurrency, save_format=args.format, api_key=args.api_key,
+                       options={"upload_format": args.upload_format, "deadline": args.deadline,
+                                "use_cache": args.use_cache, "coalesce": args.coalesce,
+                                "priority": args.priority})
+    if not runner.client.key_pool:
+        parser.error("未提供API密钥（--api-key、SSY_API_KEYS/SSY_API_KEY或config.json）")
+    stats = runner.run(args.jobs, args.report_every)
+    print(format_stats(stats))
+    return 1 if stats["failed"] or stats["interrupted"] else 0
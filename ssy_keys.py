@@ -0,0 +1,235 @@
+"""API密钥池
+
+可以配置多个API密钥（SSY_API_KEYS，逗号或换行分隔，也可以是JSON数组；SSY_API_KEY作为补充），
+每次发送请求时从池中选一个密钥：
+- least_in_flight：选在途请求最少的密钥，相同时选最久未使用的（默认）
+- quota：选响应头X-RateLimit-Remaining报告的剩余配额最多的密钥，未知配额视为充足
+
+返回429的密钥按Retry-After（没有时按SSY_KEY_COOLDOWN）暂停使用，
+返回401/403的密钥暂停SSY_KEY_AUTH_COOLDOWN；所有密钥都在暂停中时使用最早恢复的一个。
+
+密钥来源（环境变量、config.json）在每次取池时检查，config.json由ssy_config按修改时间缓存，
+未变化时不读盘；密钥列表变化时保留仍存在的密钥的状态。
+写入config.json只通过save_api_keys显式进行，调用节点不会修改配置文件。
+"""
+import json
+import time
+import threading
+from collections import OrderedDict
+
+from .ssy_config import get_setting, get_config, save_config
+from .ssy_retry import parse_retry_after
+
+PLACEHOLDERS = {"token_here", "place_token_here", "your_api_key",
+                "api_key_here", "enter_your_key", "<api_key>"}
+STRATEGIES = ("least_in_flight", "quota")
+AUTH_STATUS = (401, 403)
+# 这些状态码只说明当前密钥不可用，换用其它密钥即可
+KEY_SWITCH_STATUS = (429,) + AUTH_STATUS
+
+
+def parse_keys(value):
+    """把密钥配置解析为去重后的列表：接受列表、JSON数组字符串或逗号/换行/空白分隔的字符串"""
+    if isinstance(value, str):
+        text = value.strip()
+        if text.startswith("["):
+            try:
+                value = json.loads(text)
+            except ValueError:
+                value = text.replace(",", " ").split()
+        else:
+            value = text.replace(",", " ").split()
+    keys = []
+    for key in value or ():
+        key = str(key).strip()
+        if key and key.lower() not in PLACEHOLDERS and key not in keys:
+            keys.append(key)
+    return keys
+
+
+def mask_key(key):
+    """日志和状态接口中显示的密钥，只保留首尾各4个字符"""
+    return f"{key[:4]}…{key[-4:]}" if len(key) > 12 else "…"
+
+
+class _KeyState:
+    __slots__ = ("key", "in_flight", "calls", "last_used", "benched_until", "bench_reason",
+                 "remaining", "throttled", "rejected")
+
+    def __init__(self, key):
+        self.key = key
+        self.in_flight = 0
+        self.calls = 0
+        self.last_used = 0.0
+        self.benched_until = 0.0
+        self.bench_reason = ""
+        self.remaining = None
+        self.throttled = 0
+        self.rejected = 0
+
+
+class KeyPool:
+    """多个API密钥的负载均衡与冷却
+
+    Args:
+        keys: 密钥列表
+        strategy: 选择策略，见STRATEGIES
+        cooldown: 429且没有Retry-After时的暂停秒数
+        auth_cooldown: 401/403时的暂停秒数
+    """
+
+    def __init__(self, keys=(), strategy="least_in_flight", cooldown=60.0, auth_cooldown=600.0):
+        self.strategy = strategy if strategy in STRATEGIES else "least_in_flight"
+        self.cooldown = cooldown
+        self.auth_cooldown = auth_cooldown
+        self._lock = threading.Lock()
+        self._states = {}
+        self.update(keys)
+
+    def __len__(self):
+        return len(self._states)
+
+    @property
+    def keys(self):
+        return tuple(self._states)
+
+    def update(self, keys):
+        """替换密钥列表，仍存在的密钥保留其状态"""
+        with self._lock:
+            self._states = {key: self._states.get(key) or _KeyState(key) for key in keys}
+
+    def _rank(self, state):
+        if self.strategy == "quota":
+            remaining = float("inf") if state.remaining is None else state.remaining
+            return (-remaining, state.in_flight, state.last_used)
+        return (state.in_flight, state.last_used)
+
+    def acquire(self):
+        """选一个密钥并计入在途，之后必须调用release；池为空时返回None"""
+        now = time.monotonic()
+        with self._lock:
+            if not self._states:
+                return None
+            states = self._states.values()
+            ready = [state for state in states if state.benched_until <= now]
+            if ready:
+                state = min(ready, key=self._rank)
+            else:
+                state = min(states, key=lambda s: s.benched_until)
+            state.in_flight += 1
+            state.calls += 1
+            state.last_used = now
+            return state.key
+
+    def release(self, key, status=None, headers=None):
+        """请求结束后归还密钥，按状态码和响应头更新配额与冷却；status为None表示没有收到响应"""
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                return
+            state.in_flight = max(0, state.in_flight - 1)
+            if headers is not None:
+                remaining = headers.get("X-RateLimit-Remaining")
+                if remaining is not None and remaining.strip().isdigit():
+                    state.remaining = int(remaining)
+            if status == 429:
+                state.throttled += 1
+                delay = parse_retry_after(headers.get("Retry-After")) if headers is not None else None
+                self._bench(state, delay if delay is not None else self.cooldown, "429")
+            elif status in AUTH_STATUS:
+                state.rejected += 1
+                self._bench(state, self.auth_cooldown, str(status))
+            elif status is not None and status < 400:
+                state.benched_until = 0.0
+                state.bench_reason = ""
+
+    @staticmethod
+    def _bench(state, seconds, reason):
+        state.benched_until = max(state.benched_until, time.monotonic() + seconds)
+        state.bench_reason = reason
+
+    def available(self):
+        """当前未在冷却中的密钥数"""
+        now = time.monotonic()
+        with self._lock:
+            return sum(1 for state in self._states.values() if state.benched_until <= now)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "strategy": self.strategy,
+                "keys": [{
+                    "key": mask_key(state.key),
+                    "in_flight": state.in_flight,
+                    "calls": state.calls,
+                    "remaining": state.remaining,
+                    "throttled": state.throttled,
+                    "rejected": state.rejected,
+                    "benched_for": round(max(0.0, state.benched_until - now), 1),
+                    "bench_reason": state.bench_reason if state.benched_until > now else "",
+                } for state in self._states.values()],
+            }
+
+
+def configured_keys():
+    """按SSY_API_KEYS、SSY_API_KEY的顺序合并配置的密钥（各自环境变量优先于config.json）"""
+    return parse_keys(parse_keys(get_setting("SSY_API_KEYS")) + parse_keys(get_setting("SSY_API_KEY")))
+
+
+def _new_pool(keys):
+    return KeyPool(keys, strategy=get_setting("SSY_KEY_STRATEGY", "least_in_flight"),
+                   cooldown=get_setting("SSY_KEY_COOLDOWN", 60.0),
+                   auth_cooldown=get_setting("SSY_KEY_AUTH_COOLDOWN", 600.0))
+
+
+# 按节点api_key输入内容缓存的密钥池数量上限，超出时淘汰最久未使用的
+MAX_OVERRIDE_POOLS = 32
+
+_pool = None
+_override_pools = OrderedDict()
+_pool_lock = threading.Lock()
+
+
+def get_key_pool(override=""):
+    """返回进程级共享的密钥池
+
+    override为节点api_key输入的内容（可以包含多个密钥），非空时返回只包含这些密钥的池，
+    同样按内容缓存以保留冷却状态（最多MAX_OVERRIDE_POOLS个，LRU淘汰）；
+    为空时返回按配置构建的池，配置变化时更新其密钥列表。
+    """
+    global _pool
+    if override and override.strip():
+        with _pool_lock:
+            pool = _override_pools.get(override)
+            if pool is None:
+                pool = _override_pools[override] = _new_pool(parse_keys(override))
+                while len(_override_pools) > MAX_OVERRIDE_POOLS:
+                    _override_pools.popitem(last=False)
+            else:
+                _override_pools.move_to_end(override)
+        return pool
+    keys = tuple(configured_keys())
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = _new_pool(keys)
+    if _pool.keys != keys:
+        _pool.update(keys)
+    return _pool
+
+
+def save_api_keys(keys):
+    """显式把密钥写入config.json：一个密钥写SSY_API_KEY，多个写SSY_API_KEYS（并移除SSY_API_KEY）"""
+    keys = parse_keys(keys)
+    if not keys:
+        raise ValueError("没有有效的API密钥")
+    config = get_config()
+    if len(keys) == 1:
+        config["SSY_API_KEY"] = keys[0]
+        config.pop("SSY_API_KEYS", None)
+    else:
+        config["SSY_API_KEYS"] = keys
+        config.pop("SSY_API_KEY", None)
+    save_config(config)
+    return len(keys)
@@ -0,0 +1,188 @@
+"""调用指标与分段计时
+
+- CallTrace记录一次API调用各阶段的耗时：上传请求体、等待服务端、读取响应、下载结果URL、解码
+  （参考图编码在构建请求时单独记录）
+- Metrics按(模型, 端点)汇总调用计数、字节数和各阶段的延迟直方图，
+  可导出为JSON（/ssy/status）或Prometheus文本格式（GET /ssy/metrics、SSY_METRICS_FILE定期写文件）
+
+记录只做计数和直方图分桶，不拼接字符串；人类可读的日志只在节点输出时由CallTrace.summary()生成。
+"""
+import os
+import time
+import threading
+
+from .ssy_config import get_setting
+from .ssy_retry import RETRYABLE_STATUS, LatencyHistogram
+
+# 阶段名，按一次调用中出现的顺序
+SPANS = ("encode", "upload", "wait", "read", "download", "decode")
+SPAN_LABELS = {"encode": "编码", "upload": "上传", "wait": "等待", "read": "读取",
+               "download": "下载", "decode": "解码"}
+
+
+def _histogram():
+    # 1ms起按1.25倍增长，覆盖到约30分钟
+    return LatencyHistogram(min_value=0.001, factor=1.25, buckets=64, max_count=10000)
+
+
+class CallTrace:
+    """一次API调用的分段计时
+
+    mark(name)结束当前阶段并开始下一阶段，finish()结束最后一个阶段并提交到Metrics。
+    """
+
+    __slots__ = ("model", "endpoint", "started", "spans", "_current", "_since", "_finished")
+
+    def __init__(self, model, endpoint):
+        self.model = model
+        self.endpoint = endpoint
+        self.started = time.monotonic()
+        self.spans = {}
+        self._current = None
+        self._since = self.started
+        self._finished = False
+
+    def mark(self, name):
+        now = time.monotonic()
+        if self._current is not None:
+            self.spans[self._current] = self.spans.get(self._current, 0.0) + now - self._since
+        self._current = name
+        self._since = now
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def finish(self, outcome, sent=0, received=0, metrics=None):
+        """结束计时并记录结果：outcome为ok / failed / retryable，重复调用时只记录第一次"""
+        if self._finished:
+            return
+        self._finished = True
+        self.mark(None)
+        (metrics or get_metrics()).record(self, outcome, sent, received)
+
+    def summary(self):
+        """一行耗时摘要，例如“耗时: 上传0.12s 等待3.40s 解码0.05s，共3.60s”"""
+        parts = [f"{SPAN_LABELS[name]}{self.spans[name]:.2f}s" for name in SPANS if name in self.spans]
+        return f"耗时: {' '.join(parts)}，共{self.elapsed():.2f}s\n"
+
+
+def outcome_for(response):
+    """按响应状态码判断失败的调用是否为暂时性故障"""
+    return "retryable" if response.status_code in RETRYABLE_STATUS else "failed"
+
+
+class Metrics:
+    """按(模型, 端点)汇总的计数与阶段延迟"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._spans = {}
+
+    def _count(self, name, labels, amount):
+        key = (name, labels)
+        self._counters[key] = self._counters.get(key, 0) + amount
+
+    def _observe(self, span, model, endpoint, seconds):
+        key = (span, model, endpoint)
+        entry = self._spans.get(key)
+        if entry is None:
+            entry = self._spans[key] = [_histogram(), 0.0, 0]
+        entry[0].observe(seconds)
+        entry[1] += seconds
+        entry[2] += 1
+
+    def record(self, trace, outcome, sent=0, received=0):
+        with self._lock:
+            labels = (trace.model, trace.endpoint)
+            self._count("calls", labels + (outcome,), 1)
+            self._count("sent_bytes", labels, sent)
+            self._count("received_bytes", labels, received)
+            for span, seconds in trace.spans.items():
+                self._observe(span, trace.model, trace.endpoint, seconds)
+            self._observe("total", trace.model, trace.endpoint, trace.elapsed())
+
+    def observe(self, span, model, endpoint, seconds):
+        """记录调用之外的阶段耗时（如参考图编码）"""
+        with self._lock:
+            self._observe(span, model, endpoint, seconds)
+
+    def snapshot(self):
+        """可直接JSON序列化的汇总"""
+        with self._lock:
+            counters = dict(self._counters)
+            spans = {key: (entry[0].quantile(0.5), entry[0].quantile(0.95), entry[0].quantile(0.99),
+                           entry[1], entry[2])
+                     for key, entry in self._spans.items()}
+        result = {}
+        for (name, labels), value in counters.items():
+            entry = result.setdefault(f"{labels[0]}|{labels[1]}", {"calls": {}, "spans": {}})
+            if name == "calls":
+                entry["calls"][labels[2]] = value
+            else:
+                entry[name] = value
+        for (span, model, endpoint), (p50, p95, p99, total, count) in spans.items():
+            entry = result.setdefault(f"{model}|{endpoint}", {"calls": {}, "spans": {}})
+            entry["spans"][span] = {"count": count, "mean": round(total / count, 4),
+                                    "p50": round(p50, 4), "p95": round(p95, 4), "p99": round(p99, 4)}
+        return result
+
+    def prometheus(self):
+        """Prometheus文本格式"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            spans = sorted((key, (entry[0].quantile(0.5), entry[0].quantile(0.95), entry[0].quantile(0.99),
+                                  entry[1], entry[2]))
+                           for key, entry in self._spans.items())
+        lines = ["# TYPE ssy_calls_total counter",
+                 "# TYPE ssy_sent_bytes_total counter",
+                 "# TYPE ssy_received_bytes_total counter"]
+        for (name, labels), value in counters:
+            label = f'model="{labels[0]}",endpoint="{labels[1]}"'
+            if name == "calls":
+                lines.append(f'ssy_calls_total{{{label},outcome="{labels[2]}"}} {value}')
+            else:
+                lines.append(f"ssy_{name}_total{{{label}}} {value}")
+        lines.append("# TYPE ssy_span_seconds summary")
+        for (span, model, endpoint), (p50, p95, p99, total, count) in spans:
+            label = f'span="{span}",model="{model}",endpoint="{endpoint}"'
+            for q, value in (("0.5", p50), ("0.95", p95), ("0.99", p99)):
+                lines.append(f'ssy_span_seconds{{{label},quantile="{q}"}} {value:.6f}')
+            lines.append(f"ssy_span_seconds_sum{{{label}}} {total:.6f}")
+            lines.append(f"ssy_span_seconds_count{{{label}}} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """把Prometheus文本原子地写入文件（node_exporter textfile collector可直接读取）"""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+
+
+def _export_loop(metrics, path, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            metrics.write(path)
+        except OSError:
+            pass
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """返回进程级共享的Metrics，配置了SSY_METRICS_FILE时启动定期写文件的后台线程"""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                metrics = Metrics()
+                path = get_setting("SSY_METRICS_FILE", "")
+                if path:
+                    threading.Thread(target=_export_loop, name="ssy-metrics", daemon=True,
+                                     args=(metrics, path, get_setting("SSY_METRICS_INTERVAL", 15.0))).start()
+                _metrics = metrics
+    return _metrics
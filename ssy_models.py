@@ -0,0 +1,115 @@
+"""模型注册表
+
+每个模型声明所属节点系列、支持的请求参数、参考图上限与传递方式、端点和响应格式。
+节点的模型列表、请求体构建、端点选择和响应解码都从这里读取，
+新增模型只需要在MODELS中加一条记录。
+
+注册表在导入时构建完成（按名称、按系列的索引都预先计算好），调用时只做字典查找。
+"""
+
+
+class ModelSpec:
+    """一个模型的能力声明
+
+    Args:
+        name: 模型名（请求体中的model）
+        family: 节点系列：google / doubao / openai / processor
+        params: 请求体支持的可选参数名
+        max_images: 最多发送的参考图数量，0表示不接受参考图
+        image_mode: 参考图的传递方式：
+            inline_data（Gemini的images[].inline_data）、data_uri_list（data URI数组）、
+            data_uri（单个data URI字符串）、binary_base64（火山引擎的binary_data_base64数组）
+        endpoint: 无参考图时的端点
+        image_endpoint: 有参考图时的端点，None表示与endpoint相同
+        response_format: 响应格式名，对应ssy_decode中注册的格式
+        max_input_side: 参考图的有效最大长边（像素），超过的部分服务端也会缩小，
+            上传前按此预缩放；None表示不缩放（如放大/增强模型）
+        tile_side: 分块处理时每块的最大边长，None表示不支持分块
+    """
+
+    __slots__ = ("name", "family", "params", "max_images", "image_mode",
+                 "endpoint", "image_endpoint", "response_format", "max_input_side", "tile_side")
+
+    def __init__(self, name, family, params=(), max_images=0, image_mode="data_uri",
+                 endpoint="generations", image_endpoint=None, response_format=None,
+                 max_input_side=None, tile_side=None):
+        self.name = name
+        self.family = family
+        self.params = frozenset(params)
+        self.max_images = max_images
+        self.image_mode = image_mode
+        self.endpoint = endpoint
+        self.image_endpoint = image_endpoint or endpoint
+        self.response_format = response_format
+        self.max_input_side = max_input_side
+        self.tile_side = tile_side
+
+    def supports(self, param):
+        return param in self.params
+
+    def endpoint_for(self, has_images):
+        return self.image_endpoint if has_images else self.endpoint
+
+
+_GEMINI_PARAMS = ("aspect_ratio", "response_modalities")
+_DOUBAO_PARAMS = ("size", "watermark")
+_OPENAI_PARAMS = ("size", "n", "quality", "background", "output_format",
+                  "output_compression", "moderation")
+_PROCESSOR_PARAMS = ("resolution_boundary", "jpg_quality", "result_format")
+
+# 每个系列内的顺序即节点下拉列表的顺序，第一个为默认值
+MODELS = {spec.name: spec for spec in (
+    ModelSpec("google/gemini-2.5-flash-image-preview", "google", _GEMINI_PARAMS,
+              max_images=12, image_mode="inline_data", response_format="gemini",
+              max_input_side=3072),
+    ModelSpec("google/gemini-3-pro-image-preview", "google", _GEMINI_PARAMS + ("size",),
+              max_images=12, image_mode="inline_data", response_format="gemini",
+              max_input_side=3072),
+    ModelSpec("bytedance/doubao-seedream-4.5", "doubao", _DOUBAO_PARAMS,
+              max_images=10, image_mode="data_uri_list", response_format="data_list",
+              max_input_side=4096),
+    ModelSpec("bytedance/doubao-seedream-4.0", "doubao", _DOUBAO_PARAMS,
+              max_images=10, image_mode="data_uri_list", response_format="data_list",
+              max_input_side=4096),
+    ModelSpec("bytedance/doubao-seedream-3.0-t2i", "doubao", _DOUBAO_PARAMS,
+              max_images=1, image_mode="data_uri", response_format="data_list",
+              max_input_side=4096),
+    ModelSpec("bytedance/doubao-seededit-3-0-i2i", "doubao", _DOUBAO_PARAMS,
+              max_images=1, image_mode="data_uri", response_format="data_list",
+              max_input_side=4096),
+    ModelSpec("openai/gpt-image-1", "openai", _OPENAI_PARAMS,
+              max_images=1, image_mode="data_uri", image_endpoint="edits", response_format="data_list",
+              max_input_side=2048),
+    ModelSpec("bytedance/image_enhance", "processor", _PROCESSOR_PARAMS,
+              max_images=1, image_mode="binary_base64", endpoint="edits", response_format="volcengine",
+              tile_side=2048),
+    ModelSpec("bytedance/image_upscale", "processor", _PROCESSOR_PARAMS + ("model_quality",),
+              max_images=1, image_mode="binary_base64", endpoint="edits", response_format="volcengine",
+              tile_side=2048),
+)}
+
+_BY_FAMILY = {}
+for _spec in MODELS.values():
+    _BY_FAMILY.setdefault(_spec.family, []).append(_spec.name)
+_BY_FAMILY = {family: tuple(names) for family, names in _BY_FAMILY.items()}
+
+
+def get_model(name):
+    """返回模型的ModelSpec，未注册的模型返回None"""
+    return MODELS.get(name)
+
+
+def require_model(name):
+    """返回模型的ModelSpec，未注册时抛出ValueError"""
+    spec = MODELS.get(name)
+    if spec is None:
+        raise ValueError(f"未知的模型: {name}")
+    return spec
+
+
+def model_names(*families):
+    """按注册顺序返回这些系列的模型名列表（用于节点的下拉选项）"""
+    names = []
+    for family in families:
+        names += _BY_FAMILY.get(family, ())
+    return names
@@ -0,0 +1,118 @@
+"""ComfyUI进度上报与异步执行
+
+- ProgressReporter把每个请求的阶段（排队、发送、等待、下载、解码、完成）汇总成节点进度条，
+  并在支持时把当前阶段以文字显示在节点上
+- 支持异步节点的ComfyUI中，节点的FUNCTION是协程：同步的generate/process在线程池中执行，
+  事件循环可以同时执行图中其它节点（包括本地GPU节点），远程调用完成后结果再交给下游
+
+ComfyUI相关模块都是可选导入，单独使用（基准脚本、命令行）时进度上报为空操作。
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .ssy_config import get_setting
+
+try:
+    from comfy.utils import ProgressBar
+except ImportError:
+    ProgressBar = None
+
+try:
+    from server import PromptServer
+except ImportError:
+    PromptServer = None
+
+try:
+    # 与异步节点支持同时加入ComfyUI，用来判断执行器能否await节点函数
+    from comfy_execution.utils import get_executing_context  # noqa: F401
+    ASYNC_SUPPORTED = True
+except ImportError:
+    ASYNC_SUPPORTED = False
+
+ASYNC_EXECUTION = ASYNC_SUPPORTED and get_setting("SSY_ASYNC", True)
+
+# 请求阶段，按顺序推进
+QUEUED, SENDING, WAITING, DOWNLOADING, DECODING, DONE = range(6)
+STAGE_LABELS = ("排队中", "发送请求", "等待生成", "下载结果", "解码图像", "完成")
+
+
+def _make_bar(total, node_id):
+    if ProgressBar is None:
+        return None
+    try:
+        return ProgressBar(total, node_id=node_id)
+    except TypeError:
+        # 旧版ComfyUI的ProgressBar没有node_id参数，按当前执行的节点上报
+        return ProgressBar(total)
+    except Exception:
+        return None
+
+
+class ProgressReporter:
+    """汇总一个节点内所有请求的阶段进度
+
+    Args:
+        node_id: ComfyUI节点的unique_id，None时由ComfyUI按当前执行节点处理
+        total: 请求数量
+    """
+
+    def __init__(self, node_id=None, total=1):
+        self.node_id = node_id
+        self.total = max(1, total)
+        self._stages = [QUEUED] * self.total
+        self._lock = threading.Lock()
+        self._bar = _make_bar(self.total * DONE, node_id)
+
+    def stage(self, index, stage):
+        """第index个请求进入stage阶段（只前进不后退）"""
+        with self._lock:
+            if stage <= self._stages[index]:
+                return
+            self._stages[index] = stage
+            value = sum(self._stages)
+            done = sum(1 for s in self._stages if s == DONE)
+            current = max(s for s in self._stages if s != DONE) if done < self.total else DONE
+        if self._bar is not None:
+            self._bar.update_absolute(value, self.total * DONE)
+        text = STAGE_LABELS[current]
+        if self.total > 1:
+            text = f"{text}（{done}/{self.total}完成）"
+        self._send_text(text)
+
+    def for_request(self, index):
+        """返回第index个请求使用的回调：callback(stage)"""
+        return functools.partial(self.stage, index)
+
+    def _send_text(self, text):
+        if PromptServer is None or self.node_id is None:
+            return
+        server = getattr(PromptServer, "instance", None)
+        send = getattr(server, "send_progress_text", None)
+        if send is None:
+            return
+        try:
+            send(text, self.node_id)
+        except Exception:
+            pass
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=get_setting("SSY_NODE_WORKERS", 16),
+                                               thread_name_prefix="ssy-node")
+    return _executor
+
+
+async def run_in_thread(fn, **kwargs):
+    """在线程池中执行同步的节点函数，不阻塞ComfyUI的事件循环"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(fn, **kwargs))
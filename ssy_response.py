@@ -0,0 +1,246 @@
+"""流式响应解析
+
+逐块读取响应体并增量解析JSON：
+- 图像字段（b64_json、inlineData.data、image、binary_data_base64等）中的长字符串
+  边读边做base64解码，直接写入StreamedImage的字节缓冲区，不生成Python字符串
+- 其余字段正常解析，结果是只含小型元数据的"骨架"dict
+- 诊断摘录由骨架生成，不需要重新序列化整个响应
+"""
+import re
+import json
+import base64
+from io import BytesIO
+
+# 值可能是图像base64的字段名
+IMAGE_KEYS = {"b64_json", "data", "image", "binary_data_base64"}
+
+# 读取响应体的块大小
+CHUNK_SIZE = 256 * 1024
+
+# 字符串超过该长度才切换为流式解码，短字符串按普通值保留
+STREAM_THRESHOLD = 1024
+
+_SPECIAL = re.compile(rb'["\\]')
+_SURROGATE = re.compile("[\ud800-\udfff]")
+_SURROGATE_PAIR = re.compile("[\ud800-\udbff][\udc00-\udfff]")
+_WHITESPACE = b" \t\r\n"
+_TOKEN_END = re.compile(rb'[\s,\]}]')
+_SIMPLE_ESCAPES = {ord('"'): b'"', ord("\\"): b"\\", ord("/"): b"/", ord("b"): b"\b",
+                   ord("f"): b"\f", ord("n"): b"\n", ord("r"): b"\r", ord("t"): b"\t"}
+
+
+class StreamedImage:
+    """响应中以流式解码得到的图像字节"""
+
+    __slots__ = ("buffer", "error", "_pending")
+
+    def __init__(self):
+        self.buffer = BytesIO()
+        self.error = None
+        self._pending = b""
+
+    def write_base64(self, segment):
+        if self.error is not None:
+            return
+        try:
+            data = self._pending + segment.translate(None, _WHITESPACE)
+            cut = len(data) - len(data) % 4
+            self.buffer.write(base64.b64decode(data[:cut]))
+            self._pending = data[cut:]
+        except Exception as e:
+            self.error = e
+
+    def finish(self):
+        if self._pending and self.error is None:
+            self.error = ValueError(f"base64数据长度不完整（剩余{len(self._pending)}字符）")
+        self.buffer.seek(0)
+        return self
+
+    @property
+    def size(self):
+        return self.buffer.getbuffer().nbytes
+
+    def __repr__(self):
+        return f"<image {self.size} bytes>"
+
+
+class _Reader:
+    """按需从chunk迭代器取数据的字节读取器，同时记录开头若干字节供诊断"""
+
+    def __init__(self, chunks, head_size=1000):
+        self._chunks = iter(chunks)
+        self._buf = b""
+        self._pos = 0
+        self.total = 0
+        self.head = b""
+        self._head_size = head_size
+
+    def fill(self):
+        chunk = next(self._chunks, None)
+        while chunk is not None and not chunk:
+            chunk = next(self._chunks, None)
+        if chunk is None:
+            return False
+        self.total += len(chunk)
+        if len(self.head) < self._head_size:
+            self.head += chunk[:self._head_size - len(self.head)]
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self):
+        """跳过空白并返回下一个字节（int），数据结束时返回None"""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self.fill():
+                return None
+
+    def next_byte(self):
+        if self._pos >= len(self._buf) and not self.fill():
+            raise ValueError("响应JSON意外结束")
+        byte = self._buf[self._pos]
+        self._pos += 1
+        return byte
+
+    def expect(self, byte):
+        if self.peek() != byte:
+            raise ValueError(f"响应JSON格式错误：期望'{chr(byte)}'")
+        self._pos += 1
+
+    def token(self):
+        """读取数字/true/false/null等非字符串标量"""
+        while True:
+            match = _TOKEN_END.search(self._buf, self._pos)
+            if match is not None:
+                value = self._buf[self._pos:match.start()]
+                self._pos = match.start()
+                return value
+            if not self.fill():
+                value = self._buf[self._pos:]
+                self._pos = len(self._buf)
+                return value
+
+    def string_segments(self):
+        """产生字符串内容片段（已去除转义），直到结束引号"""
+        while True:
+            match = _SPECIAL.search(self._buf, self._pos)
+            if match is None:
+                if self._pos < len(self._buf):
+                    yield self._buf[self._pos:]
+                self._pos = len(self._buf)
+                if not self.fill():
+                    raise ValueError("响应JSON字符串未结束")
+                continue
+            if match.start() > self._pos:
+                yield self._buf[self._pos:match.start()]
+            self._pos = match.end()
+            if self._buf[match.start()] == ord('"'):
+                return
+            escape = self.next_byte()
+            if escape == ord("u"):
+                code = bytes(self.next_byte() for _ in range(4))
+                yield chr(int(code, 16)).encode("utf-8", "surrogatepass")
+            else:
+                yield _SIMPLE_ESCAPES.get(escape, bytes([escape]))
+
+
+def _parse_string(reader, stream_image):
+    """解析字符串；stream_image为True且长度超过阈值时返回StreamedImage"""
+    reader.expect(ord('"'))
+    collected = []
+    length = 0
+    image = None
+    for segment in reader.string_segments():
+        if image is not None:
+            image.write_base64(segment)
+            continue
+        collected.append(segment)
+        length += len(segment)
+        if stream_image and length > STREAM_THRESHOLD:
+            image = StreamedImage()
+            image.write_base64(b"".join(collected))
+            collected = None
+    if image is not None:
+        return image.finish()
+    text = b"".join(collected).decode("utf-8", "surrogatepass")
+    if _SURROGATE.search(text):
+        # \uXXXX转义的代理对是分别解码的，这里合并成一个字符；孤立代理保持原样（与json.loads一致）
+        text = _SURROGATE_PAIR.sub(
+            lambda m: m.group().encode("utf-16-le", "surrogatepass").decode("utf-16-le"), text)
+    return text
+
+
+def _parse_value(reader, key=None):
+    byte = reader.peek()
+    if byte is None:
+        raise ValueError("响应JSON意外结束")
+    if byte == ord("{"):
+        reader.expect(ord("{"))
+        obj = {}
+        if reader.peek() == ord("}"):
+            reader.expect(ord("}"))
+            return obj
+        while True:
+            name = _parse_string(reader, False)
+            reader.expect(ord(":"))
+            obj[name] = _parse_value(reader, name)
+            if reader.peek() == ord(","):
+                reader.expect(ord(","))
+                continue
+            reader.expect(ord("}"))
+            return obj
+    if byte == ord("["):
+        reader.expect(ord("["))
+        items = []
+        if reader.peek() == ord("]"):
+            reader.expect(ord("]"))
+            return items
+        while True:
+            # 数组元素沿用数组所在字段名，binary_data_base64等字符串数组也能流式解码
+            items.append(_parse_value(reader, key))
+            if reader.peek() == ord(","):
+                reader.expect(ord(","))
+                continue
+            reader.expect(ord("]"))
+            return items
+    if byte == ord('"'):
+        return _parse_string(reader, key in IMAGE_KEYS)
+    return json.loads(reader.token())
+
+
+def parse_stream(chunks):
+    """增量解析响应体
+
+    Returns:
+        (骨架结果, 读取字节数, 响应开头的原始字节)，解析失败时抛出ValueError，
+        异常对象带有head属性
+    """
+    reader = _Reader(chunks)
+    try:
+        result = _parse_value(reader)
+        if reader.peek() is not None:
+            raise ValueError("响应JSON之后存在多余数据")
+    except ValueError as e:
+        # 读完剩余数据，保证连接可以复用，同时统计字节数
+        while reader.fill():
+            pass
+        e.head = reader.head
+        e.total = reader.total
+        raise
+    return result, reader.total, reader.head
+
+
+def describe_response(result):
+    """生成用于日志的响应结构摘要，图像只保留大小"""
+    if isinstance(result, StreamedImage):
+        return repr(result)
+    if isinstance(result, dict):
+        return {key: describe_response(value) for key, value in result.items()}
+    if isinstance(result, list):
+        return [describe_response(value) for value in result]
+    if isinstance(result, str) and len(result) > 200:
+        return f"<{len(result)} chars>"
+    return result
@@ -0,0 +1,307 @@
+"""重试、退避与对冲请求
+
+- 可重试的错误（连接中断、超时、429、5xx）按带随机抖动的指数退避重试，
+  服务端给出Retry-After时至少等待该时长
+- 按模型记录成功请求的延迟直方图
+- 开启对冲时，请求超过该模型的p95延迟仍未返回，就再发一个相同请求，采用先返回的结果
+
+每次尝试都重新提交到请求引擎，退避等待发生在调用方线程中，不占用引擎的在途名额。
+所有尝试共用调用的截止时间，剩余时间不够退避等待时不再重试。
+"""
+import math
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from concurrent.futures import wait, FIRST_COMPLETED
+
+import requests
+
+from .ssy_config import get_setting
+
+# 视为暂时性故障的HTTP状态码
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+# 视为暂时性故障的网络异常
+RETRYABLE_EXCEPTIONS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+class AttemptError(Exception):
+    """一次尝试失败且不应重试（如熔断快速失败）
+
+    Args:
+        log: 这次尝试的日志
+    """
+
+    def __init__(self, log):
+        super().__init__(log.strip())
+        self.log = log
+
+
+class RetryableError(AttemptError):
+    """一次尝试因暂时性故障失败
+
+    Args:
+        log: 这次尝试的日志
+        retry_after: 服务端要求的等待秒数（Retry-After），没有时为None
+        status: HTTP状态码，网络异常时为None
+    """
+
+    def __init__(self, log, retry_after=None, status=None):
+        super().__init__(log)
+        self.retry_after = retry_after
+        self.status = status
+
+
+def parse_retry_after(value):
+    """解析Retry-After头（秒数或HTTP日期），无法解析时返回None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def raise_if_retryable(response, log):
+    """响应状态码属于暂时性故障时抛出RetryableError"""
+    if response.status_code in RETRYABLE_STATUS:
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        raise RetryableError(log, retry_after, response.status_code)
+
+
+class RetryPolicy:
+    """重试与对冲参数
+
+    Args:
+        max_retries: 最多重试次数（不含首次请求）
+        base_delay: 退避基准秒数，第k次重试的上限为base_delay * 2**k
+        max_delay: 单次退避上限；Retry-After超过它时放弃重试
+        hedge: 是否发出对冲请求
+        hedge_quantile: 触发对冲的延迟分位数
+        hedge_min_samples: 模型至少有这么多延迟样本才会对冲
+    """
+
+    def __init__(self, max_retries=2, base_delay=1.0, max_delay=30.0,
+                 hedge=False, hedge_quantile=0.95, hedge_min_samples=20):
+        self.max_retries = max(0, int(max_retries))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+
+    def delay(self, attempt, retry_after=None):
+        """第attempt次重试前的等待秒数（full jitter），应放弃时返回None"""
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is None:
+            return backoff
+        if retry_after > self.max_delay:
+            return None
+        # 多个请求同时收到相同的Retry-After时错开重试时刻
+        return retry_after + random.uniform(0, self.base_delay)
+
+
+class LatencyHistogram:
+    """对数分桶的延迟直方图
+
+    桶边界从min_value起按factor等比增长，样本总数超过max_count时所有计数减半，
+    让分位数跟随最近的延迟变化。
+    """
+
+    def __init__(self, min_value=0.05, factor=1.2, buckets=60, max_count=1000):
+        self.min_value = min_value
+        self.factor = factor
+        self.max_count = max_count
+        self.counts = [0] * buckets
+        self.total = 0
+
+    def _bucket(self, value):
+        if value <= self.min_value:
+            return 0
+        index = int(math.log(value / self.min_value, self.factor)) + 1
+        return min(index, len(self.counts) - 1)
+
+    def observe(self, value):
+        self.counts[self._bucket(value)] += 1
+        self.total += 1
+        if self.total > self.max_count:
+            self.counts = [count // 2 for count in self.counts]
+            self.total = sum(self.counts)
+
+    def quantile(self, q):
+        """返回分位数所在桶的上边界，没有样本时返回None"""
+        if not self.total:
+            return None
+        target = q * self.total
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return self.min_value * self.factor ** i
+        return self.min_value * self.factor ** (len(self.counts) - 1)
+
+
+class LatencyTracker:
+    """按模型汇总的延迟直方图与重试/对冲计数"""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self.counters = {"attempts": 0, "retries": 0, "gave_up": 0, "hedges": 0, "hedge_wins": 0}
+
+    def observe(self, model, seconds):
+        with self._lock:
+            histogram = self._histograms.get(model)
+            if histogram is None:
+                histogram = self._histograms[model] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def quantile(self, model, q, min_samples=1):
+        with self._lock:
+            histogram = self._histograms.get(model)
+            if histogram is None or histogram.total < min_samples:
+                return None
+            return histogram.quantile(q)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def stats(self):
+        with self._lock:
+            models = {model: {"samples": h.total, "p50": h.quantile(0.5), "p95": h.quantile(0.95)}
+                      for model, h in self._histograms.items()}
+            return {"models": models, **self.counters}
+
+
+_policy = None
+_tracker = None
+_lock = threading.Lock()
+
+
+def get_retry_policy():
+    """返回按配置创建的进程级重试策略"""
+    global _policy
+    if _policy is None:
+        with _lock:
+            if _policy is None:
+                _policy = RetryPolicy(
+                    max_retries=get_setting("SSY_RETRIES", 2),
+                    base_delay=get_setting("SSY_RETRY_BASE_DELAY", 1.0),
+                    max_delay=get_setting("SSY_RETRY_MAX_DELAY", 30.0),
+                    hedge=get_setting("SSY_HEDGE", False),
+                    hedge_quantile=get_setting("SSY_HEDGE_QUANTILE", 0.95),
+                    hedge_min_samples=get_setting("SSY_HEDGE_MIN_SAMPLES", 20),
+                )
+    return _policy
+
+
+def get_latency_tracker():
+    """返回进程级共享的延迟统计"""
+    global _tracker
+    if _tracker is None:
+        with _lock:
+            if _tracker is None:
+                _tracker = LatencyTracker()
+    return _tracker
+
+
+def _run_attempt(submit, model, tracker, hedge_after, quantile):
+    """执行一次尝试，超过hedge_after秒（模型延迟的quantile分位数）未返回时发出对冲请求
+
+    Returns:
+        (先完成的Future, 日志)；只有全部请求都失败时才返回失败的Future
+    """
+    started = {}
+    future = submit()
+    started[future] = time.monotonic()
+    pending = {future}
+    hedged = False
+    log = ""
+    while True:
+        timeout = None
+        if hedge_after is not None and not hedged:
+            timeout = max(0.0, started[future] + hedge_after - time.monotonic())
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            hedged = True
+            hedge = submit()
+            started[hedge] = time.monotonic()
+            pending.add(hedge)
+            tracker.count("hedges")
+            log += f"对冲请求: 已超过p{quantile * 100:.0f}延迟{hedge_after:.1f}s，发出第二个请求\n"
+            continue
+        finished = done.pop()
+        pending |= done
+        if finished.exception() is None or not pending:
+            for other in pending:
+                # 还在引擎队列中的请求直接取消，已在途的请求结果被丢弃
+                other.cancel()
+            if finished.exception() is None:
+                tracker.observe(model, time.monotonic() - started[finished])
+                if hedged and finished is not future:
+                    tracker.count("hedge_wins")
+                    log += "对冲请求先返回，采用其结果\n"
+            return finished, log
+        log += f"对冲中的一个请求失败: {str(finished.exception()).splitlines()[-1]}\n"
+
+
+def call_with_retry(submit, model, policy=None, tracker=None, sleep=time.sleep, deadline=None):
+    """带重试与对冲地执行请求
+
+    Args:
+        submit: 提交一次尝试并返回Future的函数；Future的结果为(图像, 日志, 字节数)，
+            暂时性故障以RetryableError表示，其它AttemptError直接结束不再重试
+        model: 模型名，用于延迟统计
+        policy: RetryPolicy，默认使用进程级配置
+        tracker: LatencyTracker，默认使用进程级实例
+        deadline: 整个调用（所有尝试）共用的ssy_deadline.Deadline，None表示不限制
+
+    Returns:
+        (图像张量或None, 日志, 网络传输字节数)
+    """
+    policy = policy or get_retry_policy()
+    tracker = tracker or get_latency_tracker()
+    log = ""
+    for attempt in range(policy.max_retries + 1):
+        hedge_after = None
+        if policy.hedge:
+            hedge_after = tracker.quantile(model, policy.hedge_quantile, policy.hedge_min_samples)
+        tracker.count("attempts")
+        future, attempt_log = _run_attempt(submit, model, tracker, hedge_after,
+                                            policy.hedge_quantile)
+        log += attempt_log
+        try:
+            images, result_log, wire_bytes = future.result()
+            return images, log + result_log, wire_bytes
+        except RetryableError as e:
+            log += e.log
+            if attempt == policy.max_retries:
+                tracker.count("gave_up")
+                log += f"✗ 已重试{attempt}次仍失败，放弃\n"
+                break
+            delay = policy.delay(attempt, e.retry_after)
+            if delay is None:
+                tracker.count("gave_up")
+                log += f"✗ 服务端要求等待{e.retry_after:.0f}秒，超过上限{policy.max_delay:.0f}秒，放弃重试\n"
+                break
+            if deadline is not None and deadline.remaining() <= delay:
+                tracker.count("gave_up")
+                log += f"✗ 截止时间（{deadline.seconds:.0f}秒）内已不够再次尝试，放弃重试\n"
+                break
+            tracker.count("retries")
+            log += f"暂时性错误（第{attempt + 1}次尝试），{delay:.1f}秒后重试\n"
+            sleep(delay)
+        except AttemptError as e:
+            log += e.log
+            break
+    return None, log, 0
@@ -0,0 +1,47 @@
+"""运行状态汇总
+
+collect_status()汇总熔断器、请求引擎、重试统计、截止时间、缓存、在途合并、调用指标和密钥池的当前状态。
+在ComfyUI中运行时注册GET /ssy/status，返回同样内容的JSON（密钥只显示首尾字符）；
+GET /ssy/metrics返回Prometheus文本格式的调用计数和各阶段耗时；
+单独导入（基准脚本、命令行）时不依赖ComfyUI。
+"""
+from .ssy_breaker import get_breakers
+from .ssy_engine import get_engine
+from .ssy_retry import get_latency_tracker
+from .ssy_deadline import get_deadline_estimator
+from .ssy_cache import get_cache
+from .ssy_coalesce import get_single_flight
+from .ssy_encode import get_encode_cache
+from .ssy_metrics import get_metrics
+from .ssy_keys import get_key_pool
+
+try:
+    from server import PromptServer
+    from aiohttp import web
+except ImportError:
+    PromptServer = None
+
+
+def collect_status():
+    """返回可直接JSON序列化的状态字典"""
+    return {
+        "breakers": get_breakers().status(),
+        "engine": get_engine().stats(),
+        "latency": get_latency_tracker().stats(),
+        "deadlines": get_deadline_estimator().stats(),
+        "cache": get_cache().stats(),
+        "coalesce": get_single_flight().stats(),
+        "encode_cache": get_encode_cache().stats(),
+        "metrics": get_metrics().snapshot(),
+        "keys": get_key_pool().stats(),
+    }
+
+
+if PromptServer is not None and getattr(PromptServer, "instance", None) is not None:
+    @PromptServer.instance.routes.get("/ssy/status")
+    async def ssy_status(request):
+        return web.json_response(collect_status())
+
+    @PromptServer.instance.routes.get("/ssy/metrics")
+    async def ssy_metrics(request):
+        return web.Response(text=get_metrics().prometheus(), content_type="text/plain")
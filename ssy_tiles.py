@@ -0,0 +1,86 @@
+"""大图分块处理
+
+放大/增强模型处理超大图像时，把图像切成相同尺寸、相互重叠的块分别请求，
+结果按块的位置拼回整图，重叠区域线性羽化混合以消除接缝。
+
+所有块尺寸相同（靠边的块向内对齐而不是缩小），服务端对每块的缩放比例一致，
+拼接时按第一块结果的比例计算输出尺寸。
+"""
+import torch
+import torch.nn.functional as F
+
+# 块边长下限：更小的块数量随图像面积急剧增加，每块都是一次计费请求
+MIN_TILE_SIDE = 256
+
+
+def _starts(length, tile, overlap):
+    if length <= tile:
+        return [0]
+    step = max(1, tile - overlap)
+    starts = list(range(0, length - tile, step))
+    starts.append(length - tile)
+    return starts
+
+
+def tile_boxes(height, width, tile, overlap=64):
+    """返回覆盖整图的块[(y, x, h, w)]，每块h、w相同且不超过tile
+
+    tile小于MIN_TILE_SIDE或overlap不小于tile的一半时抛出ValueError。
+    """
+    if tile < MIN_TILE_SIDE:
+        raise ValueError(f"块边长{tile}px小于下限{MIN_TILE_SIDE}px")
+    if not 0 <= overlap * 2 < tile:
+        raise ValueError(f"块重叠{overlap}px必须小于块边长{tile}px的一半")
+    tile_h, tile_w = min(tile, height), min(tile, width)
+    return [(y, x, tile_h, tile_w)
+            for y in _starts(height, tile_h, overlap)
+            for x in _starts(width, tile_w, overlap)]
+
+
+def split_tiles(frame, boxes):
+    """把[H,W,C]单帧按boxes切成[T,h,w,C]"""
+    return torch.stack([frame[y:y + h, x:x + w] for y, x, h, w in boxes])
+
+
+def _ramp(length, feather):
+    """长为length的羽化权重：两端在feather像素内从接近0线性升到1"""
+    if feather <= 0:
+        return torch.ones(length)
+    index = torch.arange(length, dtype=torch.float32)
+    distance = torch.minimum(index, length - 1 - index)
+    return ((distance + 1) / (feather + 1)).clamp(max=1.0)
+
+
+def stitch_tiles(tiles, boxes, height, width, overlap=64):
+    """把各块的结果拼回整图
+
+    Args:
+        tiles: 每块的结果张量[1,h',w',C]，顺序与boxes一致
+        boxes: tile_boxes返回的块位置（原图坐标）
+        height, width: 原图尺寸
+        overlap: 分块时的重叠像素（原图坐标）
+
+    Returns:
+        [1,H',W',C]，H'、W'按第一块结果相对原块的比例缩放
+    """
+    _, _, tile_h, tile_w = boxes[0]
+    scale_y = tiles[0].shape[1] / tile_h
+    scale_x = tiles[0].shape[2] / tile_w
+    out_h, out_w = round(height * scale_y), round(width * scale_x)
+    out_tile_h, out_tile_w = round(tile_h * scale_y), round(tile_w * scale_x)
+    channels = tiles[0].shape[3]
+
+    out = torch.zeros((out_h, out_w, channels), dtype=torch.float32)
+    weight = torch.zeros((out_h, out_w, 1), dtype=torch.float32)
+    # 羽化宽度取重叠的一半，块中心区域保持权重1
+    mask = (_ramp(out_tile_h, round(overlap * scale_y / 2))[:, None]
+            * _ramp(out_tile_w, round(overlap * scale_x / 2))[None, :])[..., None]
+    for tile, (y, x, _, _) in zip(tiles, boxes):
+        if tile.shape[1:3] != (out_tile_h, out_tile_w):
+            tile = F.interpolate(tile.movedim(-1, 1), size=(out_tile_h, out_tile_w),
+                                 mode="bilinear", align_corners=False).movedim(1, -1)
+        top = min(round(y * scale_y), out_h - out_tile_h)
+        left = min(round(x * scale_x), out_w - out_tile_w)
+        out[top:top + out_tile_h, left:left + out_tile_w] += tile[0].float() * mask
+        weight[top:top + out_tile_h, left:left + out_tile_w] += mask
+    return out.div_(weight.clamp_(min=1e-6)).unsqueeze(0)
@@ -0,0 +1,176 @@
+"""进程级共享HTTP传输层
+
+所有SSY节点共用同一个SSYTransport实例：每个主机一个Session和连接池，
+长连接复用，避免每次生成都重新进行TCP/TLS握手。
+安装了httpx[http2]时可通过SSY_HTTP2开启HTTP/2。
+"""
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .ssy_config import get_setting
+
+try:
+    import httpx
+    import h2  # noqa: F401  httpx的HTTP/2支持依赖h2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    httpx = None
+    HTTP2_AVAILABLE = False
+
+DEFAULT_API_BASE = "https://router.shengsuanyun.com/api/v1"
+
+
+def get_api_base():
+    """API根地址，可通过SSY_API_BASE指向本地测试服务器"""
+    return get_setting("SSY_API_BASE", DEFAULT_API_BASE).rstrip("/")
+
+
+class _HTTP2Response:
+    """把httpx响应包装成requests.Response的常用接口"""
+
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+
+    @property
+    def content(self):
+        return self._response.read()
+
+    @property
+    def text(self):
+        self._response.read()
+        return self._response.text
+
+    def json(self):
+        self._response.read()
+        return self._response.json()
+
+    def iter_content(self, chunk_size=65536):
+        try:
+            for chunk in self._response.iter_bytes(chunk_size):
+                yield chunk
+        except httpx.HTTPError as e:
+            raise requests.exceptions.ChunkedEncodingError(str(e))
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+    def close(self):
+        self._response.close()
+
+
+class SSYTransport:
+    """按主机划分连接池的共享HTTP客户端
+
+    Args:
+        pool_size: 每个主机保持的最大连接数
+        pool_hosts: 缓存连接池的主机数量
+        http2: 是否使用HTTP/2（需要httpx和h2，不可用时回退到HTTP/1.1）
+    """
+
+    def __init__(self, pool_size=16, pool_hosts=8, http2=False):
+        self.pool_size = pool_size
+        self.pool_hosts = pool_hosts
+        self.http2 = bool(http2) and HTTP2_AVAILABLE
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _host_key(self, url):
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def _new_session(self):
+        if self.http2:
+            limits = httpx.Limits(max_connections=self.pool_size,
+                                  max_keepalive_connections=self.pool_size)
+            return httpx.Client(http2=True, limits=limits, follow_redirects=True)
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_hosts,
+                              pool_maxsize=self.pool_size,
+                              max_retries=0)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers["Connection"] = "keep-alive"
+        return session
+
+    def session_for(self, url):
+        """获取目标主机对应的Session，不存在时创建"""
+        key = self._host_key(url)
+        session = self._sessions.get(key)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(key)
+                if session is None:
+                    session = self._new_session()
+                    self._sessions[key] = session
+        return session
+
+    def request(self, method, url, **kwargs):
+        session = self.session_for(url)
+        if not self.http2:
+            return session.request(method, url, **kwargs)
+
+        stream = kwargs.pop("stream", False)
+        timeout = kwargs.pop("timeout", None)
+        if "data" in kwargs and not isinstance(kwargs["data"], dict):
+            # httpx用content传原始字节或字节迭代器
+            kwargs["content"] = kwargs.pop("data")
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        try:
+            request = session.build_request(method, url, timeout=timeout, **kwargs)
+            response = session.send(request, stream=True)
+            if not stream:
+                response.read()
+            return _HTTP2Response(response)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e))
+        except httpx.HTTPError as e:
+            raise requests.exceptions.ConnectionError(str(e))
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """返回进程级共享的传输层实例（首次调用时按配置创建）"""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = SSYTransport(
+                    pool_size=get_setting("SSY_POOL_SIZE", 16),
+                    pool_hosts=get_setting("SSY_POOL_HOSTS", 8),
+                    http2=get_setting("SSY_HTTP2", False),
+                )
+    return _transport
+
+
+def reset_transport():
+    """关闭并丢弃共享实例，下次get_transport()时按最新配置重建"""
+    global _transport
+    with _transport_lock:
+        if _transport is not None:
+            _transport.close()
+        _transport = None